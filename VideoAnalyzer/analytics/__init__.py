@@ -0,0 +1,6 @@
+from .heatmap import HeatMap
+from .line_zone import LineZone, CROSSING_DTYPE
+from .polygon_zone import PolygonZone, DWELL_DTYPE
+from .speed import SpeedEstimator
+from .track_store import TrackStore
+from .thumbnails import BestFrameSelector
\ No newline at end of file
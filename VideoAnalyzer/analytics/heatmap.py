@@ -0,0 +1,122 @@
+from typing import Optional, Tuple
+import numpy as np
+import cv2
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.annotators.draw.position import Position
+
+
+class HeatMap:
+    """
+    Decaying occupancy map of detection anchors on a downscaled grid.
+
+    Every frame, the anchor point of each detection adds `weight` to the grid
+    cell it falls in, and the whole map is multiplied by `decay`. The decay is
+    applied lazily: the grid stores values divided by the global factor
+    `decay ** frames`, so an update only touches the cells of the detections
+    and costs O(detections) instead of O(cells). The grid is rescaled in one
+    pass when the stored values would leave float32 precision, which happens
+    about every `log(1e6) / -log(decay)` frames.
+
+    With `decay=1` the map accumulates the number of frames spent in each cell.
+    """
+    RESCALE_LIMIT = 1e6
+
+    def __init__(self,
+                 resolution_wh: Tuple[int, int],
+                 cell_size: int = 8,
+                 decay: float = 0.999,
+                 anchor: Position = Position.BOTTOM_CENTER):
+        """
+        Parameters:
+        -----------
+            resolution_wh (Tuple[int, int]):
+                Width and height of the frames.
+            cell_size (int):
+                Side of a grid cell in pixels.
+            decay (float):
+                Factor applied to the whole map every frame, in (0, 1].
+            anchor (Position):
+                Point of each box added to the map.
+        """
+        if not 0 < decay <= 1:
+            raise ValueError(f"decay must be in (0, 1], got {decay}")
+        self.resolution_wh = (int(resolution_wh[0]), int(resolution_wh[1]))
+        self.cell_size = int(cell_size)
+        self.decay = float(decay)
+        self.anchor = anchor
+
+        width, height = self.resolution_wh
+        self.grid_wh = (-(-width // self.cell_size), -(-height // self.cell_size))
+        self._grid = np.zeros((self.grid_wh[1], self.grid_wh[0]), dtype=np.float32)
+        self._inv_scale = 1.0  # 1 / decay ** frames since the last rescale
+        self.frames = 0
+
+    def reset(self) -> None:
+        self._grid[:] = 0
+        self._inv_scale = 1.0
+        self.frames = 0
+
+    def _rescale(self) -> None:
+        self._grid /= self._inv_scale
+        self._inv_scale = 1.0
+
+    def add(self, points: np.ndarray, weight: Optional[np.ndarray] = None) -> None:
+        """
+        Advance one frame and add `(n, 2)` pixel `(x, y)` points to the map,
+        with optional per-point weights (1 by default).
+        """
+        self.frames += 1
+        if self.decay < 1:
+            self._inv_scale /= self.decay
+            if self._inv_scale > self.RESCALE_LIMIT:
+                self._rescale()
+
+        points = np.asarray(points).reshape(-1, 2)
+        if points.shape[0] == 0:
+            return
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        width, height = self.grid_wh
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < width) & (cells[:, 1] >= 0) & (cells[:, 1] < height)
+        cells = cells[inside]
+        values = np.float32(self._inv_scale)
+        if weight is not None:
+            values = np.asarray(weight, dtype=np.float32)[inside] * values
+        np.add.at(self._grid.reshape(-1), cells[:, 1] * width + cells[:, 0], values)
+
+    def update(self, metadatas: MetaDatas, weight: Optional[np.ndarray] = None) -> None:
+        """Advance one frame and add the anchors of `metadatas`."""
+        self.add(metadatas.get_anchors_coordinates(anchor=self.anchor), weight)
+
+    @property
+    def values(self) -> np.ndarray:
+        """The decayed `(grid_h, grid_w)` map, as a new array."""
+        return self._grid / np.float32(self._inv_scale)
+
+    def render(self,
+               colormap: int = cv2.COLORMAP_JET,
+               blur: float = 1.0,
+               size_wh: Optional[Tuple[int, int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Render the map to a colored BGR image.
+
+        Parameters:
+        -----------
+            colormap (int):
+                OpenCV colormap.
+            blur (float):
+                Gaussian sigma in cells applied before coloring, 0 disables it.
+            size_wh (Optional[Tuple[int, int]]):
+                Output size, the frame resolution by default.
+
+        Returns:
+        -----------
+            The `(h, w, 3)` uint8 colored map and its `(h, w)` uint8 intensity.
+        """
+        heat = self.values
+        if blur > 0:
+            heat = cv2.GaussianBlur(heat, (0, 0), blur)
+        peak = heat.max()
+        intensity = (heat * (255.0 / peak)).astype(np.uint8) if peak > 0 else np.zeros(heat.shape, np.uint8)
+        intensity = cv2.resize(intensity, size_wh or self.resolution_wh, interpolation=cv2.INTER_LINEAR)
+        return cv2.applyColorMap(intensity, colormap), intensity
@@ -0,0 +1,176 @@
+from typing import List, Optional, Sequence
+import numpy as np
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.annotators.draw.position import Position, Vector
+from VideoAnalyzer.utils import TrackSlots, grow_array
+
+
+CROSSING_DTYPE = np.dtype([
+    ("frame_id", np.int64),
+    ("line", np.int32),
+    ("track_id", np.int64),
+    ("class_id", np.int64),
+    ("direction", np.int8),  # 1 for in, -1 for out
+])
+
+
+class LineZone:
+    """
+    Counts the tracks crossing a set of lines, per line, direction and class.
+    Tracks with a negative (unknown) class_id only count in the line totals.
+
+    Each line is a `Vector`. The side of a point is the sign of
+    `Vector.cross_product`: positive on the left of `start -> end`. A track
+    crosses "in" when its anchor moves from the left to the right side and "out"
+    the other way, and only if its movement segment actually intersects the line
+    segment. The cross products of all tracks against all lines are computed in
+    one `(tracks, lines)` pass per frame; the previous anchor and side of each
+    track are kept in arrays indexed by `TrackSlots`.
+    """
+
+    def __init__(self,
+                 lines: Sequence[Vector],
+                 anchor: Position = Position.BOTTOM_CENTER,
+                 max_age: int = 30,
+                 capacity: int = 64):
+        """
+        Parameters:
+        -----------
+            lines (Sequence[Vector]):
+                Counting lines.
+            anchor (Position):
+                Point of each box tested against the lines.
+            max_age (int):
+                Number of frames without update before a track is forgotten.
+            capacity (int):
+                Initial number of track slots, grown on demand.
+        """
+        if len(lines) == 0:
+            raise ValueError("LineZone needs at least one line")
+        self.lines: List[Vector] = list(lines)
+        self.anchor = anchor
+        self.max_age = int(max_age)
+        self.frame_id = 0
+
+        self.starts = np.array([[l.start.x, l.start.y] for l in self.lines], dtype=np.float64)
+        self.ends = np.array([[l.end.x, l.end.y] for l in self.lines], dtype=np.float64)
+        self.directions = self.ends - self.starts
+
+        self.slots = TrackSlots(capacity)
+        capacity = self.slots.capacity
+        self.prev_anchor = np.zeros((capacity, 2), dtype=np.float64)
+        self.prev_side = np.zeros((capacity, len(self.lines)), dtype=np.int8)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+
+        # (lines, classes), columns are added as new class ids show up
+        self.in_counts = np.zeros((len(self.lines), 1), dtype=np.int64)
+        self.out_counts = np.zeros((len(self.lines), 1), dtype=np.int64)
+        # crossings of detections without a class (negative class_id), per line
+        self.unknown_in_counts = np.zeros(len(self.lines), dtype=np.int64)
+        self.unknown_out_counts = np.zeros(len(self.lines), dtype=np.int64)
+        self.last_events = np.empty(0, dtype=CROSSING_DTYPE)
+
+    def _grow(self) -> None:
+        capacity = self.slots.capacity
+        if capacity <= self.last_seen.shape[0]:
+            return
+        self.prev_anchor = grow_array(self.prev_anchor, capacity)
+        self.prev_side = grow_array(self.prev_side, capacity)
+        self.last_seen = grow_array(self.last_seen, capacity)
+
+    def _grow_classes(self, num_classes: int) -> None:
+        extra = num_classes - self.in_counts.shape[1]
+        if extra > 0:
+            pad = np.zeros((len(self.lines), extra), dtype=np.int64)
+            self.in_counts = np.hstack([self.in_counts, pad])
+            self.out_counts = np.hstack([self.out_counts, pad])
+
+    def sides(self, points: np.ndarray) -> np.ndarray:
+        """Sign of the cross product of every line with every point, shape `(n, lines)`."""
+        offset = points[:, None, :] - self.starts[None]
+        cross = self.directions[None, :, 0] * offset[..., 1] - self.directions[None, :, 1] * offset[..., 0]
+        return np.sign(cross).astype(np.int8)
+
+    def update(self, metadatas: MetaDatas, frame_id: Optional[int] = None) -> np.ndarray:
+        """
+        Process one frame of tracks.
+
+        Parameters:
+        -----------
+            metadatas, MetaDatas:
+                Tracked detections, `track_id` is required.
+            frame_id, Optional[int]:
+                Index of the frame, defaults to the number of updates so far.
+
+        Returns:
+        -----------
+            The crossings of this frame as a `CROSSING_DTYPE` structured array.
+        """
+        if metadatas.track_id is None:
+            raise ValueError("LineZone requires tracked detections with track_id")
+        self.frame_id = self.frame_id + 1 if frame_id is None else int(frame_id)
+
+        track_id = metadatas.track_id.astype(np.int64)
+        anchors = metadatas.get_anchors_coordinates(anchor=self.anchor).astype(np.float64)
+        slots, created = self.slots.assign(track_id)
+        self._grow()
+
+        sides = self.sides(anchors)
+        prev_sides = self.prev_side[slots]
+        prev_anchors = self.prev_anchor[slots]
+
+        # changed side of the infinite line, then check the movement segment hits the line segment
+        changed = (prev_sides != 0) & (sides != 0) & (sides != prev_sides) & ~created[:, None]
+        rows, lines = np.nonzero(changed)
+        if rows.size:
+            move = anchors[rows] - prev_anchors[rows]
+            to_start = self.starts[lines] - prev_anchors[rows]
+            to_end = self.ends[lines] - prev_anchors[rows]
+            start_side = np.sign(move[:, 0] * to_start[:, 1] - move[:, 1] * to_start[:, 0])
+            end_side = np.sign(move[:, 0] * to_end[:, 1] - move[:, 1] * to_end[:, 0])
+            hit = start_side != end_side
+            rows, lines = rows[hit], lines[hit]
+
+        class_id = (metadatas.class_id.astype(np.int64) if metadatas.class_id is not None
+                    else np.zeros(len(metadatas), dtype=np.int64))
+        events = np.empty(rows.size, dtype=CROSSING_DTYPE)
+        events["frame_id"] = self.frame_id
+        events["line"] = lines
+        events["track_id"] = track_id[rows]
+        events["class_id"] = class_id[rows]
+        events["direction"] = np.where(prev_sides[rows, lines] > 0, 1, -1)
+        if rows.size:
+            # a negative class_id would index the last column, it is counted apart
+            known = events["class_id"] >= 0
+            entering = events["direction"] == 1
+            if known.any():
+                self._grow_classes(int(events["class_id"][known].max()) + 1)
+            np.add.at(self.in_counts, (lines[entering & known], events["class_id"][entering & known]), 1)
+            np.add.at(self.out_counts, (lines[~entering & known], events["class_id"][~entering & known]), 1)
+            np.add.at(self.unknown_in_counts, lines[entering & ~known], 1)
+            np.add.at(self.unknown_out_counts, lines[~entering & ~known], 1)
+
+        # a point on a line keeps the side it came from
+        self.prev_side[slots] = np.where(sides != 0, sides, prev_sides)
+        self.prev_anchor[slots] = anchors
+        self.last_seen[slots] = self.frame_id
+
+        live = self.slots.slots
+        stale = self.frame_id - self.last_seen[live] > self.max_age
+        if stale.any():
+            released = self.slots.release(self.slots.ids[stale])
+            self.prev_side[released] = 0
+
+        self.last_events = events
+        return events
+
+    @property
+    def in_count(self) -> np.ndarray:
+        """Number of "in" crossings of each line, all classes together, unknown included."""
+        return self.in_counts.sum(axis=1) + self.unknown_in_counts
+
+    @property
+    def out_count(self) -> np.ndarray:
+        """Number of "out" crossings of each line, all classes together, unknown included."""
+        return self.out_counts.sum(axis=1) + self.unknown_out_counts
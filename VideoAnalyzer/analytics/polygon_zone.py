@@ -0,0 +1,164 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import cv2
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.annotators.draw.position import Position
+from VideoAnalyzer.utils import TrackSlots, grow_array
+
+
+DWELL_DTYPE = np.dtype([
+    ("track_id", np.int64),
+    ("zone", np.int32),
+    ("enter_frame", np.int64),
+    ("exit_frame", np.int64),
+])
+
+
+class PolygonZone:
+    """
+    Occupancy and dwell time of tracks in a set of polygon zones.
+
+    All zones are rasterized once into a label map at `cell_size` pixels per
+    cell, where each cell holds a bitmask of the zones covering it (zones may
+    overlap), packed in uint64 words. The zones of every anchor of a frame are
+    then found with one gather into the map, instead of a point-in-polygon test
+    per track and zone; precision is that of the grid.
+
+    Dwell timers are kept per track slot and zone: the frame a track entered
+    each zone is stored in a `(tracks, zones)` array indexed by `TrackSlots`,
+    and only the tracks of the current frame are touched on update.
+    """
+
+    def __init__(self,
+                 polygons: Sequence[np.ndarray],
+                 resolution_wh: Tuple[int, int],
+                 cell_size: int = 4,
+                 anchor: Position = Position.BOTTOM_CENTER,
+                 fps: float = 30.0,
+                 max_age: int = 30,
+                 capacity: int = 64):
+        """
+        Parameters:
+        -----------
+            polygons (Sequence[np.ndarray]):
+                Zones as `(k, 2)` arrays of pixel `(x, y)` vertices.
+            resolution_wh (Tuple[int, int]):
+                Width and height of the frames.
+            cell_size (int):
+                Side of a cell of the label map in pixels.
+            anchor (Position):
+                Point of each box tested against the zones.
+            fps (float):
+                Frame rate used to convert dwell frames to seconds.
+            max_age (int):
+                Number of frames without update before a track leaves its zones.
+            capacity (int):
+                Initial number of track slots, grown on demand.
+        """
+        if len(polygons) == 0:
+            raise ValueError("PolygonZone needs at least one polygon")
+        self.polygons: List[np.ndarray] = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polygons]
+        self.num_zones = len(self.polygons)
+        self.resolution_wh = (int(resolution_wh[0]), int(resolution_wh[1]))
+        self.cell_size = int(cell_size)
+        self.anchor = anchor
+        self.fps = float(fps)
+        self.max_age = int(max_age)
+        self.frame_id = 0
+
+        self.label_map = self.rasterize()
+
+        self.slots = TrackSlots(capacity)
+        capacity = self.slots.capacity
+        self.enter_frame = np.full((capacity, self.num_zones), -1, dtype=np.int64)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+
+        self.counts = np.zeros(self.num_zones, dtype=np.int64)
+        self.dwell = np.zeros((0, self.num_zones), dtype=np.float64)
+        self.last_exits = np.empty(0, dtype=DWELL_DTYPE)
+
+    def rasterize(self) -> np.ndarray:
+        """Build the `(grid_h, grid_w, words)` uint64 zone bitmask map."""
+        width, height = self.resolution_wh
+        grid_w, grid_h = -(-width // self.cell_size), -(-height // self.cell_size)
+        words = -(-self.num_zones // 64)
+        label_map = np.zeros((grid_h, grid_w, words), dtype=np.uint64)
+        mask = np.empty((grid_h, grid_w), dtype=np.uint8)
+        for zone, polygon in enumerate(self.polygons):
+            mask[:] = 0
+            # cell (i, j) covers pixels [j * cell, (j + 1) * cell), sample at its center
+            vertices = np.round(polygon / self.cell_size - 0.5).astype(np.int32)
+            cv2.fillPoly(mask, [vertices], 1)
+            label_map[..., zone // 64][mask > 0] |= np.uint64(1 << (zone % 64))
+        return label_map
+
+    def zones_of(self, points: np.ndarray) -> np.ndarray:
+        """Membership of `(n, 2)` pixel points in every zone, shape `(n, zones)`."""
+        points = np.asarray(points).reshape(-1, 2)
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        grid_h, grid_w = self.label_map.shape[:2]
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < grid_w) & (cells[:, 1] >= 0) & (cells[:, 1] < grid_h)
+        bits = np.zeros((len(points), self.label_map.shape[2]), dtype=np.uint64)
+        bits[inside] = self.label_map[cells[inside, 1], cells[inside, 0]]
+        flags = np.unpackbits(bits.view(np.uint8), axis=1, bitorder="little")
+        return flags[:, :self.num_zones].astype(bool)
+
+    def _grow(self) -> None:
+        capacity = self.slots.capacity
+        if capacity <= self.last_seen.shape[0]:
+            return
+        self.enter_frame = grow_array(self.enter_frame, capacity, -1)
+        self.last_seen = grow_array(self.last_seen, capacity)
+
+    def _exits(self, track_id: np.ndarray, enter_frame: np.ndarray, left: np.ndarray, exit_frame) -> np.ndarray:
+        rows, zones = np.nonzero(left)
+        exits = np.empty(rows.size, dtype=DWELL_DTYPE)
+        exits["track_id"] = track_id[rows]
+        exits["zone"] = zones
+        exits["enter_frame"] = enter_frame[rows, zones]
+        exits["exit_frame"] = exit_frame[rows] if isinstance(exit_frame, np.ndarray) else exit_frame
+        return exits
+
+    def update(self, metadatas: MetaDatas, frame_id: Optional[int] = None) -> np.ndarray:
+        """
+        Process one frame of tracks.
+
+        Updates `counts` (tracks in each zone), `dwell` (seconds spent in each
+        zone by the tracks of this frame, 0 outside) and `last_exits` (the zone
+        stays that ended on this frame, including tracks lost for `max_age` frames).
+
+        Returns:
+        -----------
+            The `(n, zones)` boolean membership of the detections.
+        """
+        if metadatas.track_id is None:
+            raise ValueError("PolygonZone requires tracked detections with track_id")
+        self.frame_id = self.frame_id + 1 if frame_id is None else int(frame_id)
+
+        track_id = metadatas.track_id.astype(np.int64)
+        inside = self.zones_of(metadatas.get_anchors_coordinates(anchor=self.anchor))
+        slots, _ = self.slots.assign(track_id)
+        self._grow()
+
+        enter_frame = self.enter_frame[slots]
+        was_inside = enter_frame >= 0
+        exits = [self._exits(track_id, enter_frame, was_inside & ~inside, self.frame_id)]
+        enter_frame = np.where(inside, np.where(was_inside, enter_frame, self.frame_id), -1)
+        self.enter_frame[slots] = enter_frame
+        self.last_seen[slots] = self.frame_id
+
+        live = self.slots.slots
+        stale = self.frame_id - self.last_seen[live] > self.max_age
+        if stale.any():
+            stale_ids, stale_slots = self.slots.ids[stale], live[stale]
+            stale_enter = self.enter_frame[stale_slots]
+            # a lost track left its zones after the last frame it was seen on
+            exits.append(self._exits(stale_ids, stale_enter, stale_enter >= 0, self.last_seen[stale_slots] + 1))
+            self.enter_frame[stale_slots] = -1
+            self.slots.release(stale_ids)
+
+        self.counts = inside.sum(axis=0)
+        self.dwell = np.where(inside, (self.frame_id - enter_frame + 1) / self.fps, 0.0)
+        self.last_exits = np.concatenate(exits)
+        return inside
@@ -0,0 +1,136 @@
+import numpy as np
+import cv2
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.annotators.draw.position import Position
+from VideoAnalyzer.utils import TrackSlots, grow_array
+
+
+class SpeedEstimator:
+    """
+    Real-world speed of tracks from an image-to-ground homography.
+
+    The anchor points of all tracks of a frame are projected to the ground plane
+    in one batched transform and appended to a per-track ring buffer of the last
+    `window` ground positions and timestamps, indexed by `TrackSlots`. The speed
+    of a track is the finite difference between the newest and oldest positions
+    of its window, smoothed over frames with an exponential moving average.
+
+    Ground coordinates are expected in meters, speeds are returned in km/h.
+    """
+
+    def __init__(self,
+                 homography: np.ndarray,
+                 window: int = 10,
+                 smoothing: float = 0.3,
+                 anchor: Position = Position.BOTTOM_CENTER,
+                 max_age: int = 30,
+                 capacity: int = 64):
+        """
+        Parameters:
+        -----------
+            homography (np.ndarray):
+                `(3, 3)` matrix mapping image pixels to ground meters.
+            window (int):
+                Number of ground positions kept per track.
+            smoothing (float):
+                Weight of the new measurement in the moving average, 1 disables smoothing.
+            anchor (Position):
+                Point of each box that touches the ground.
+            max_age (int):
+                Number of frames without update before a track is released.
+            capacity (int):
+                Initial number of track slots, grown on demand.
+        """
+        homography = np.asarray(homography, dtype=np.float64)
+        if homography.shape != (3, 3):
+            raise ValueError(f"Expected a (3, 3) homography, got {homography.shape}")
+        if window < 2:
+            raise ValueError("window must hold at least two positions")
+        self.homography = homography
+        self.window = int(window)
+        self.smoothing = float(smoothing)
+        self.anchor = anchor
+        self.max_age = int(max_age)
+        self.frame_id = 0
+
+        self.slots = TrackSlots(capacity)
+        capacity = self.slots.capacity
+        self.ground = np.zeros((capacity, self.window, 2), dtype=np.float64)
+        self.timestamps = np.zeros((capacity, self.window), dtype=np.float64)
+        self.head = np.zeros(capacity, dtype=np.int64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self.speed = np.full(capacity, np.nan, dtype=np.float64)
+
+    @classmethod
+    def from_points(cls, image_points: np.ndarray, ground_points: np.ndarray, **kwargs):
+        """
+        Calibrate from at least 4 image pixels and their ground positions in meters,
+        e.g. the corners of a lane segment of known length and width.
+        """
+        homography, _ = cv2.findHomography(np.asarray(image_points, dtype=np.float64),
+                                           np.asarray(ground_points, dtype=np.float64))
+        if homography is None:
+            raise ValueError("Could not estimate a homography from the given points")
+        return cls(homography, **kwargs)
+
+    def to_ground(self, points: np.ndarray) -> np.ndarray:
+        """Project `(n, 2)` image points to the ground plane."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        projected = points @ self.homography[:, :2].T + self.homography[:, 2]
+        return projected[:, :2] / projected[:, 2:]
+
+    def _grow(self) -> None:
+        capacity = self.slots.capacity
+        if capacity <= self.head.shape[0]:
+            return
+        self.ground = grow_array(self.ground, capacity)
+        self.timestamps = grow_array(self.timestamps, capacity)
+        self.head = grow_array(self.head, capacity)
+        self.count = grow_array(self.count, capacity)
+        self.last_seen = grow_array(self.last_seen, capacity)
+        self.speed = grow_array(self.speed, capacity, np.nan)
+
+    def update(self, track_id: np.ndarray, xyxy: np.ndarray, timestamp: float) -> np.ndarray:
+        """
+        Append one frame of tracks and return their speed in km/h, shape `(n,)`.
+        Tracks seen on a single timestamp so far get NaN.
+        """
+        self.frame_id += 1
+        track_id = np.asarray(track_id, dtype=np.int64).reshape(-1)
+        speed = np.full(track_id.shape, np.nan, dtype=np.float64)
+        if track_id.size > 0:
+            slots, created = self.slots.assign(track_id)
+            self._grow()
+            new_slots = slots[created]
+            self.head[new_slots] = 0
+            self.count[new_slots] = 0
+            self.speed[new_slots] = np.nan
+
+            anchors = MetaDatas(xyxy=np.asarray(xyxy).reshape(-1, 4)).get_anchors_coordinates(self.anchor)
+            head = self.head[slots]
+            self.ground[slots, head] = self.to_ground(anchors)
+            self.timestamps[slots, head] = timestamp
+            count = np.minimum(self.count[slots] + 1, self.window)
+            self.head[slots] = (head + 1) % self.window
+            self.count[slots] = count
+            self.last_seen[slots] = self.frame_id
+
+            oldest = (head + 1 - count) % self.window
+            dt = timestamp - self.timestamps[slots, oldest]
+            distance = np.linalg.norm(self.ground[slots, head] - self.ground[slots, oldest], axis=1)
+            measured = dt > 0
+            current = np.full(track_id.shape, np.nan)
+            current[measured] = distance[measured] / dt[measured] * 3.6
+
+            previous = self.speed[slots]
+            smoothed = np.where(np.isnan(previous), current,
+                                self.smoothing * current + (1 - self.smoothing) * previous)
+            speed = np.where(measured, smoothed, previous)
+            self.speed[slots] = speed
+
+        stale = self.frame_id - self.last_seen[self.slots.slots] > self.max_age
+        if stale.any():
+            self.slots.release(self.slots.ids[stale])
+        return speed
@@ -0,0 +1,182 @@
+from typing import Dict, Optional, Union
+import os
+import numpy as np
+import cv2
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.utils import TrackSlots, grow_array, get_pylogger
+logger = get_pylogger()
+
+
+def occlusion_ratio(xyxy: np.ndarray) -> np.ndarray:
+    """
+    Fraction of each box covered by the boxes in front of it, shape `(n,)`.
+    A box is in front of another when its bottom edge is lower in the image,
+    i.e. closer to a camera looking down on the scene. Overlaps of several
+    occluders are not merged, the largest single overlap is kept.
+    """
+    n = len(xyxy)
+    if n < 2:
+        return np.zeros(n, dtype=np.float32)
+    x1, y1, x2, y2 = (xyxy[:, i] for i in range(4))
+    w = np.clip(np.minimum(x2[:, None], x2[None]) - np.maximum(x1[:, None], x1[None]), 0, None)
+    h = np.clip(np.minimum(y2[:, None], y2[None]) - np.maximum(y1[:, None], y1[None]), 0, None)
+    area = np.maximum((x2 - x1) * (y2 - y1), 1e-6)
+    covered = w * h / area[:, None]         # [i, j]: part of box i covered by box j
+    covered[~(y2[None] > y2[:, None])] = 0  # only boxes in front occlude
+    return covered.max(axis=1).astype(np.float32)
+
+
+class BestFrameSelector:
+    """
+    Keeps the best frame of every track while tracking, and extracts the crops
+    from the video afterwards.
+
+    Only the frame index, box and quality of the current best candidate are
+    stored per track (arrays indexed by `TrackSlots`), never pixels. The quality
+    of a detection is
+
+        score_weight * log(confidence) + area_weight * log(area)
+                     + occlusion_weight * log(1 - occlusion)
+
+    so that, within a track, confident, large and unoccluded views win.
+    `extract` then visits the needed frames in increasing order, reading forward
+    through small gaps and seeking over large ones, so only those frames and the
+    frames between close candidates are decoded.
+    """
+
+    def __init__(self,
+                 score_weight: float = 1.0,
+                 area_weight: float = 0.5,
+                 occlusion_weight: float = 2.0,
+                 capacity: int = 64):
+        """
+        Parameters:
+        -----------
+            score_weight (float):
+                Weight of the detection confidence.
+            area_weight (float):
+                Weight of the box area.
+            occlusion_weight (float):
+                Weight of the visible part of the box, see `occlusion_ratio`.
+            capacity (int):
+                Initial number of track slots, grown on demand.
+        """
+        self.score_weight = score_weight
+        self.area_weight = area_weight
+        self.occlusion_weight = occlusion_weight
+
+        self.slots = TrackSlots(capacity)
+        capacity = self.slots.capacity
+        self.quality = np.full(capacity, -np.inf, dtype=np.float64)
+        self.frame_id = np.full(capacity, -1, dtype=np.int64)
+        self.xyxy = np.zeros((capacity, 4), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _grow(self) -> None:
+        capacity = self.slots.capacity
+        if capacity <= self.frame_id.shape[0]:
+            return
+        self.quality = grow_array(self.quality, capacity, -np.inf)
+        self.frame_id = grow_array(self.frame_id, capacity, -1)
+        self.xyxy = grow_array(self.xyxy, capacity)
+
+    def score(self, metadatas: MetaDatas) -> np.ndarray:
+        """Quality of each detection of a frame."""
+        xyxy = metadatas.xyxy.astype(np.float32)
+        area = np.maximum((xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1]), 1.0)
+        confidence = (np.maximum(metadatas.confidence, 1e-6) if metadatas.confidence is not None
+                      else np.ones(len(xyxy)))
+        visible = np.maximum(1 - occlusion_ratio(xyxy), 1e-6)
+        return (self.score_weight * np.log(confidence)
+                + self.area_weight * np.log(area)
+                + self.occlusion_weight * np.log(visible))
+
+    def update(self, frame_id: int, metadatas: MetaDatas) -> None:
+        """Consider the detections of frame `frame_id` (0-based index in the video)."""
+        if len(metadatas) == 0:
+            return
+        if metadatas.track_id is None:
+            raise ValueError("BestFrameSelector requires tracked detections with track_id")
+        slots, _ = self.slots.assign(metadatas.track_id.astype(np.int64))
+        self._grow()
+
+        quality = self.score(metadatas)
+        better = quality > self.quality[slots]
+        slots = slots[better]
+        self.quality[slots] = quality[better]
+        self.frame_id[slots] = frame_id
+        self.xyxy[slots] = metadatas.xyxy[better]
+
+    def candidates(self):
+        """`(track_id, frame_id, xyxy)` of the best frame of every track, sorted by frame."""
+        track_id, slots = self.slots.ids, self.slots.slots
+        order = np.argsort(self.frame_id[slots], kind="stable")
+        track_id, slots = track_id[order], slots[order]
+        return track_id, self.frame_id[slots], self.xyxy[slots]
+
+    def extract(self,
+                video: Union[str, cv2.VideoCapture],
+                output_dir: Optional[str] = None,
+                padding: float = 0.1,
+                seek_threshold: int = 30) -> Dict[int, Union[np.ndarray, str]]:
+        """
+        Crop the best frame of every track in one pass over the video.
+
+        Parameters:
+        -----------
+            video (Union[str, cv2.VideoCapture]):
+                The video the tracks come from.
+            output_dir (Optional[str]):
+                Write `<track_id>.jpg` crops there instead of keeping them in memory.
+            padding (float):
+                Margin added around each box, relative to its size.
+            seek_threshold (int):
+                Gaps of up to this many frames are skipped by grabbing frames
+                instead of seeking, which costs a keyframe decode.
+
+        Returns:
+        -----------
+            A dict from track id to its crop, or to the crop's path with `output_dir`.
+        """
+        cap = cv2.VideoCapture(video) if isinstance(video, str) else video
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+        track_id, frame_id, xyxy = self.candidates()
+        crops = {}
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        targets, starts = np.unique(frame_id, return_index=True)
+        ends = np.append(starts[1:], len(frame_id))
+        for target, start, end in zip(targets.tolist(), starts.tolist(), ends.tolist()):
+            gap = target - position
+            if gap < 0 or gap > seek_threshold:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            else:
+                for _ in range(gap):
+                    cap.grab()
+            suc, frame = cap.read()
+            position = target + 1
+            if not suc:
+                logger.warning(f"Could not read frame {target}, skipping its crops")
+                continue
+
+            height, width = frame.shape[:2]
+            for i in range(start, end):
+                x1, y1, x2, y2 = xyxy[i]
+                pad_x, pad_y = (x2 - x1) * padding, (y2 - y1) * padding
+                x1, y1 = max(int(x1 - pad_x), 0), max(int(y1 - pad_y), 0)
+                x2, y2 = min(int(x2 + pad_x), width), min(int(y2 + pad_y), height)
+                crop = frame[y1:y2, x1:x2].copy()
+                if output_dir is None:
+                    crops[int(track_id[i])] = crop
+                elif crop.size:
+                    path = os.path.join(output_dir, f"{int(track_id[i])}.jpg")
+                    cv2.imwrite(path, crop)
+                    crops[int(track_id[i])] = path
+
+        if isinstance(video, str):
+            cap.release()
+        return crops
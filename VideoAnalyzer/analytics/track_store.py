@@ -0,0 +1,237 @@
+from typing import Dict, Optional, Sequence, Tuple, Union
+import json
+import os
+import numpy as np
+
+from VideoAnalyzer.sinks.results import ColumnarSink, load_columns
+from VideoAnalyzer.utils import get_pylogger
+logger = get_pylogger()
+
+
+class TrackStore:
+    """
+    Query index over a columnar results directory written by `ColumnarSink`.
+
+    Rows are stored in frame order, so a time range is a contiguous row range
+    found by binary search on the `frame_id` or `timestamp` column. On top of it
+    the index keeps, in `<directory>/index/`:
+
+        - the rows of each track (rows sorted by track, CSR offsets per track id)
+          with the first/last frame, timestamps, class and box extents of the track,
+        - a uniform spatial grid on box centers: the rows of each cell, in row
+          order, so a region query only visits the cells it overlaps and a binary
+          search restricts each cell to the time range.
+
+    Every array is memory-mapped, queries only read the rows they return.
+    """
+    INDEX_ARRAYS = ("track_ids", "track_offsets", "track_rows", "track_first_frame",
+                    "track_last_frame", "track_first_time", "track_last_time",
+                    "track_class", "track_extent", "cell_offsets", "cell_rows")
+
+    def __init__(self, directory: str, cell_size: int = 64, rebuild: bool = False):
+        """
+        Parameters:
+        -----------
+            directory (str):
+                Columnar results directory.
+            cell_size (int):
+                Side of the spatial grid cells in pixels, used when the index is built.
+            rebuild (bool):
+                Rebuild the index even if one matches the current number of rows.
+        """
+        self.directory = directory
+        self.columns = load_columns(directory)
+        self.num_rows = len(self.columns["frame_id"])
+        index_dir = os.path.join(directory, "index")
+        meta_path = os.path.join(index_dir, "meta.json")
+
+        meta = None
+        if not rebuild and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["rows"] != self.num_rows:
+                meta = None
+        if meta is None:
+            meta = self.build_index(cell_size)
+
+        self.cell_size = meta["cell_size"]
+        self.grid_wh = tuple(meta["grid_wh"])
+        self.index = {name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+                      for name in self.INDEX_ARRAYS}
+        self._timed: Optional[bool] = None
+
+    @staticmethod
+    def writer(directory: str, **kwargs) -> ColumnarSink:
+        """The sink producing a directory this store can index."""
+        return ColumnarSink(directory, **kwargs)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def build_index(self, cell_size: int = 64) -> dict:
+        """Build and save the track and spatial indexes. Returns the index metadata."""
+        columns = self.columns
+        frame_id = np.asarray(columns["frame_id"])
+        if np.any(np.diff(frame_id) < 0):
+            raise ValueError(f"Rows of {self.directory} are not in frame order")
+        track_id = np.asarray(columns["track_id"])
+        timestamp = np.asarray(columns["timestamp"])
+        xyxy = np.asarray(columns["xyxy"])
+        index = {}
+
+        # tracks: rows grouped by track id, each group in time order
+        track_rows = np.argsort(track_id, kind="stable")
+        track_ids, starts, counts = np.unique(track_id[track_rows], return_index=True, return_counts=True)
+        ends = starts + counts - 1
+        index["track_ids"] = track_ids
+        index["track_offsets"] = np.append(starts, len(track_rows)).astype(np.int64)
+        index["track_rows"] = track_rows
+        index["track_first_frame"] = frame_id[track_rows[starts]]
+        index["track_last_frame"] = frame_id[track_rows[ends]]
+        index["track_first_time"] = timestamp[track_rows[starts]]
+        index["track_last_time"] = timestamp[track_rows[ends]]
+        index["track_class"] = np.asarray(columns["class_id"])[track_rows[starts]]
+        if len(track_rows):
+            boxes = xyxy[track_rows]
+            index["track_extent"] = np.column_stack([
+                np.minimum.reduceat(boxes[:, 0], starts), np.minimum.reduceat(boxes[:, 1], starts),
+                np.maximum.reduceat(boxes[:, 2], starts), np.maximum.reduceat(boxes[:, 3], starts),
+            ])
+        else:
+            index["track_extent"] = np.empty((0, 4), dtype=np.float32)
+
+        # spatial grid on box centers, rows of each cell kept in time order
+        cells, grid_wh = self._cells(xyxy, cell_size)
+        index["cell_rows"] = np.argsort(cells, kind="stable")
+        index["cell_offsets"] = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=grid_wh[0] * grid_wh[1]))])
+
+        index_dir = os.path.join(self.directory, "index")
+        os.makedirs(index_dir, exist_ok=True)
+        for name, array in index.items():
+            np.save(os.path.join(index_dir, f"{name}.npy"), array)
+        meta = {"rows": self.num_rows, "cell_size": int(cell_size), "grid_wh": list(grid_wh)}
+        with open(os.path.join(index_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        logger.info(f"Indexed {self.num_rows} rows and {len(track_ids)} tracks of {self.directory}")
+        return meta
+
+    @staticmethod
+    def _cells(xyxy: np.ndarray, cell_size: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+        centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+        cells_xy = np.maximum(np.floor(centers / cell_size), 0).astype(np.int64)
+        grid_w = int(cells_xy[:, 0].max()) + 1 if len(cells_xy) else 1
+        grid_h = int(cells_xy[:, 1].max()) + 1 if len(cells_xy) else 1
+        return cells_xy[:, 1] * grid_w + cells_xy[:, 0], (grid_w, grid_h)
+
+    def _check_by(self, by: str) -> None:
+        """`by="time"` needs a timestamp on every row, sinks write NaN when none was given."""
+        if by == "frame":
+            return
+        if by != "time":
+            logger.error(f"by must be 'frame' or 'time', got {by} !!!")
+            raise ValueError(by)
+        if self._timed is None:
+            self._timed = not np.isnan(np.asarray(self.columns["timestamp"])).any()
+        if not self._timed:
+            logger.error(f"Rows of {self.directory} have no timestamp, query them by frame !!!")
+            raise ValueError(f"{self.directory} has rows without timestamp, by='time' is not supported")
+
+    def _time_range(self, start, end, by: str) -> Tuple[int, int]:
+        self._check_by(by)
+        key = self.columns["frame_id" if by == "frame" else "timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(key, start, side="left"))
+        hi = self.num_rows if end is None else int(np.searchsorted(key, end, side="right"))
+        return lo, hi
+
+    def _track_candidates(self, track_id: Sequence[int], lo: int, hi: int) -> np.ndarray:
+        track_ids, offsets, track_rows = (self.index["track_ids"], self.index["track_offsets"],
+                                          self.index["track_rows"])
+        track_id = np.asarray(track_id, dtype=np.int64).reshape(-1)
+        pos = np.searchsorted(track_ids, track_id)
+        known = pos < len(track_ids)
+        pos, track_id = pos[known], track_id[known]
+        pos = pos[track_ids[pos] == track_id]
+        parts = []
+        for p in pos:
+            rows = track_rows[offsets[p]:offsets[p + 1]]
+            parts.append(rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)])
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def _region_candidates(self, region: Sequence[float], lo: int, hi: int) -> np.ndarray:
+        x1, y1, x2, y2 = region
+        grid_w, grid_h = self.grid_wh
+        cx1, cy1 = max(int(x1 // self.cell_size), 0), max(int(y1 // self.cell_size), 0)
+        cx2, cy2 = min(int(x2 // self.cell_size), grid_w - 1), min(int(y2 // self.cell_size), grid_h - 1)
+        offsets, cell_rows = self.index["cell_offsets"], self.index["cell_rows"]
+        parts = []
+        for cy in range(cy1, cy2 + 1):
+            for cx in range(cx1, cx2 + 1):
+                cell = cy * grid_w + cx
+                rows = cell_rows[offsets[cell]:offsets[cell + 1]]
+                parts.append(rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)])
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def query(self,
+              start: Optional[float] = None,
+              end: Optional[float] = None,
+              region: Optional[Sequence[float]] = None,
+              class_id: Optional[Union[int, Sequence[int]]] = None,
+              track_id: Optional[Union[int, Sequence[int]]] = None,
+              by: str = "frame") -> np.ndarray:
+        """
+        Rows matching every given filter, in time order.
+
+        Parameters:
+        -----------
+            start, end (Optional[float]):
+                Inclusive time range, in frames or seconds depending on `by`.
+            region (Optional[Sequence[float]]):
+                `(x1, y1, x2, y2)` rectangle the box center must lie in.
+            class_id (Optional[Union[int, Sequence[int]]]):
+                Class ids to keep.
+            track_id (Optional[Union[int, Sequence[int]]]):
+                Track ids to keep.
+            by (str):
+                "frame" to compare `start`/`end` with `frame_id`, "time" with `timestamp`.
+        """
+        lo, hi = self._time_range(start, end, by)
+        if track_id is not None:
+            rows = self._track_candidates(track_id, lo, hi)
+        elif region is not None:
+            rows = self._region_candidates(region, lo, hi)
+        else:
+            rows = np.arange(lo, hi)
+
+        if region is not None and len(rows):
+            boxes = self.columns["xyxy"][rows]
+            centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+            inside = ((centers[:, 0] >= region[0]) & (centers[:, 0] <= region[2])
+                      & (centers[:, 1] >= region[1]) & (centers[:, 1] <= region[3]))
+            rows = rows[inside]
+        if class_id is not None and len(rows):
+            rows = rows[np.isin(self.columns["class_id"][rows], np.atleast_1d(class_id))]
+        return rows
+
+    def select(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Gather the columns of `rows`."""
+        return {name: np.asarray(column[rows]) for name, column in self.columns.items()}
+
+    def tracks(self,
+               start: Optional[float] = None,
+               end: Optional[float] = None,
+               class_id: Optional[Union[int, Sequence[int]]] = None,
+               by: str = "frame") -> np.ndarray:
+        """Ids of the tracks alive at some point of the inclusive range, from their intervals."""
+        self._check_by(by)
+        if by == "frame":
+            first, last = self.index["track_first_frame"], self.index["track_last_frame"]
+        else:
+            first, last = self.index["track_first_time"], self.index["track_last_time"]
+        keep = np.ones(len(first), dtype=bool)
+        if start is not None:
+            keep &= last >= start
+        if end is not None:
+            keep &= first <= end
+        if class_id is not None:
+            keep &= np.isin(self.index["track_class"], np.atleast_1d(class_id))
+        return np.asarray(self.index["track_ids"][keep])
@@ -1 +1,3 @@
-from .base import MetaDatas
\ No newline at end of file
+from .base import MetaDatas
+from .batch import BatchMetaDatas
+from .chain import AnnotatorChain
\ No newline at end of file
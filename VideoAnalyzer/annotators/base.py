@@ -5,19 +5,162 @@ import numpy as np
 
 from .draw.position import Position
 from .utils import get_data_item, calculate_masks_centroids
+from .mask import RLEMasks
+
+# Column layout of the packed (N, PACKED_COLUMNS) float32 buffer
+PACKED_XYXY = slice(0, 4)
+PACKED_CONFIDENCE = 4
+PACKED_CLASS_ID = 5
+PACKED_TRACK_ID = 6
+PACKED_COLUMNS = 7
+# float32 holds every integer exactly up to 2**24, the limit of class_id and track_id
+PACKED_MAX_ID = 2 ** 24
+
+
+def check_packed_ids(ids: Optional[np.ndarray], name: str) -> None:
+    if ids is not None and len(ids) > 0 and np.abs(ids).max() > PACKED_MAX_ID:
+        raise ValueError(f"{name} above {PACKED_MAX_ID} cannot be stored exactly in a packed float32 buffer")
 
 @dataclass
 class MetaDatas: 
     """
     The `MetaDatas` allows you to convert results from a variety of object detection
     and segmentation models into a single, unified format.
+
+    A `MetaDatas` can also be backed by one contiguous `(N, PACKED_COLUMNS)` float32
+    buffer (see `from_packed`), in which case `xyxy`, `confidence`, `class_id` and
+    `track_id` are views into its columns and `class_id`/`track_id` are float32,
+    exact up to `PACKED_MAX_ID` (packing larger ids raises a ValueError).
+
+    `mask` is either a dense `(N, H, W)` boolean array or an `RLEMasks`, which is
+    decoded lazily and whose area and centroids are computed from its runs.
     """
     xyxy: np.ndarray = None
-    mask: Optional[np.ndarray] = None
+    mask: Optional[Union[np.ndarray, RLEMasks]] = None
     confidence: Optional[np.ndarray] = None
     class_id: Optional[np.ndarray] = None
     track_id: Optional[np.ndarray] = None
     data: Dict[str, Union[np.ndarray, List]] = field(default_factory=dict)
+    _packed: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_packed(
+        cls,
+        packed: np.ndarray,
+        mask: Optional[Union[np.ndarray, RLEMasks]] = None,
+        data: Optional[Dict[str, Union[np.ndarray, List]]] = None,
+        with_track_id: bool = True,
+    ):
+        """
+        Wrap a `(N, PACKED_COLUMNS)` float32 buffer without copying it.
+
+        Args:
+            packed (np.ndarray): Buffer laid out as `x1, y1, x2, y2, confidence,
+                class_id, track_id`.
+            mask (Optional[np.ndarray]): Masks of the detections.
+            data (Optional[Dict]): Extra per-detection data.
+            with_track_id (bool): Whether the track_id column holds valid ids.
+
+        Returns:
+            MetaDatas: Fields are views into `packed`.
+        """
+        if packed.dtype != np.float32 or packed.ndim != 2 or packed.shape[1] != PACKED_COLUMNS:
+            raise ValueError(
+                f"Expected a (N, {PACKED_COLUMNS}) float32 buffer, "
+                f"got {packed.shape} {packed.dtype}"
+            )
+        metadatas = cls(
+            xyxy=packed[:, PACKED_XYXY],
+            mask=mask,
+            confidence=packed[:, PACKED_CONFIDENCE],
+            class_id=packed[:, PACKED_CLASS_ID],
+            track_id=packed[:, PACKED_TRACK_ID] if with_track_id else None,
+            data=data if data is not None else {},
+        )
+        metadatas._packed = packed
+        return metadatas
+
+    @classmethod
+    def from_arrays(
+        cls,
+        xyxy: np.ndarray,
+        confidence: np.ndarray,
+        class_id: np.ndarray,
+        track_id: Optional[np.ndarray] = None,
+        mask: Optional[Union[np.ndarray, RLEMasks]] = None,
+        data: Optional[Dict[str, Union[np.ndarray, List]]] = None,
+    ):
+        """Pack separate arrays into a single buffer, with one allocation."""
+        check_packed_ids(class_id, "class_id")
+        check_packed_ids(track_id, "track_id")
+        xyxy = np.asarray(xyxy).reshape(-1, 4)
+        packed = np.empty((len(xyxy), PACKED_COLUMNS), dtype=np.float32)
+        packed[:, PACKED_XYXY] = xyxy
+        packed[:, PACKED_CONFIDENCE] = confidence
+        packed[:, PACKED_CLASS_ID] = class_id
+        packed[:, PACKED_TRACK_ID] = track_id if track_id is not None else -1
+        return cls.from_packed(packed, mask=mask, data=data, with_track_id=track_id is not None)
+
+    @classmethod
+    def empty(cls, with_track_id: bool = False):
+        """Returns a packed `MetaDatas` with no detection."""
+        return cls.from_packed(np.empty((0, PACKED_COLUMNS), dtype=np.float32),
+                               with_track_id=with_track_id)
+
+    @classmethod
+    def concat(cls, metadatas_list: List["MetaDatas"]):
+        """
+        Concatenate several `MetaDatas` into one packed `MetaDatas`, with a single
+        buffer allocation.
+        """
+        metadatas_list = [m for m in metadatas_list if len(m) > 0] or metadatas_list[:1]
+        if len(metadatas_list) == 0:
+            return cls.empty()
+
+        packed = np.concatenate([m.pack() for m in metadatas_list])
+        masks = [m.mask for m in metadatas_list]
+        if all(isinstance(m, RLEMasks) for m in masks):
+            mask = RLEMasks.concat(masks)
+        elif all(m is not None for m in masks):
+            mask = np.concatenate([np.asarray(m) for m in masks])
+        else:
+            mask = None
+
+        data = {}
+        for key in metadatas_list[0].data:
+            values = [m.data[key] for m in metadatas_list]
+            if isinstance(values[0], np.ndarray):
+                data[key] = np.concatenate(values)
+            else:
+                data[key] = [v for value in values for v in value]
+
+        with_track_id = all(m.track_id is not None for m in metadatas_list)
+        return cls.from_packed(packed, mask=mask, data=data, with_track_id=with_track_id)
+
+    @property
+    def is_packed(self) -> bool:
+        """Whether every field is still a view into the packed buffer."""
+        if self._packed is None:
+            return False
+        columns = (self.xyxy, self.confidence, self.class_id, self.track_id)
+        return all(np.may_share_memory(c, self._packed) for c in columns if c is not None)
+
+    def pack(self) -> np.ndarray:
+        """
+        Returns the `(N, PACKED_COLUMNS)` float32 buffer of this object, without
+        copying when it is already packed. Missing fields are filled with -1
+        (0 for confidence). Ids above `PACKED_MAX_ID` raise a ValueError.
+        """
+        if self.is_packed:
+            return self._packed
+        check_packed_ids(self.class_id, "class_id")
+        check_packed_ids(self.track_id, "track_id")
+        packed = np.empty((len(self), PACKED_COLUMNS), dtype=np.float32)
+        packed[:, PACKED_XYXY] = self.xyxy.reshape(-1, 4)
+        packed[:, PACKED_CONFIDENCE] = self.confidence if self.confidence is not None else 0
+        packed[:, PACKED_CLASS_ID] = self.class_id if self.class_id is not None else -1
+        packed[:, PACKED_TRACK_ID] = self.track_id if self.track_id is not None else -1
+        return packed
 
     def __len__(self):
         """Returns the number of data in the MetaDatas object.
@@ -39,7 +182,17 @@ class MetaDatas:
             )
     
     def __repr__(self) -> str:
-        pass
+        fields = [f"n={len(self)}"]
+        for name in ("class_id", "track_id", "confidence"):
+            values = getattr(self, name)
+            if values is not None:
+                values = values.astype(int) if name != "confidence" else values
+                fields.append(f"{name}={np.array2string(values, precision=2, threshold=12, separator=',')}")
+        if self.mask is not None:
+            fields.append(f"mask={type(self.mask).__name__}{tuple(self.mask.shape)}")
+        if self.data:
+            fields.append(f"data={list(self.data)}")
+        return f"MetaDatas({', '.join(fields)})"
 
     def __getitem__(
         self, index: Union[int, slice, List[int], np.ndarray, str]
@@ -62,8 +215,21 @@ class MetaDatas:
         """
         if isinstance(index, str):
             return self.data.get(index)
-        if isinstance(index, int):
-            index = [index]
+        if isinstance(index, (int, np.integer)):
+            position = int(index) + len(self) if index < 0 else int(index)
+            if not 0 <= position < len(self):
+                raise IndexError(f"index {index} is out of range for {len(self)} detections")
+            # a one-row slice keeps the result a view
+            index = slice(position, position + 1)
+
+        if self.is_packed:
+            # one gather of the buffer instead of one per field, and none for slices
+            return MetaDatas.from_packed(
+                self._packed[index],
+                mask=self.mask[index] if self.mask is not None else None,
+                data=get_data_item(self.data, index),
+                with_track_id=self.track_id is not None,
+            )
 
         return MetaDatas(
             xyxy=self.xyxy[index],
@@ -74,6 +240,23 @@ class MetaDatas:
             data=get_data_item(self.data, index),
         )
 
+    @property
+    def area(self) -> np.ndarray:
+        """
+        Area of each detection: the mask area when masks are available,
+        the bounding box area otherwise.
+        """
+        if isinstance(self.mask, RLEMasks):
+            return self.mask.area
+        if self.mask is not None:
+            return self.mask.sum(axis=(1, 2))
+        return (self.xyxy[:, 2] - self.xyxy[:, 0]) * (self.xyxy[:, 3] - self.xyxy[:, 1])
+
+    def compress_masks(self) -> None:
+        """Replace dense masks with their run-length encoding, in place."""
+        if self.mask is not None and not isinstance(self.mask, RLEMasks):
+            self.mask = RLEMasks.from_dense(self.mask)
+
     def get_anchors_coordinates(self, anchor: Position) -> np.ndarray:
         """
         Calculates and returns the coordinates of a specific anchor point
@@ -143,7 +326,7 @@ class MetaDatas:
 
 class BaseAnnotator(ABC):
     @abstractmethod
-    def annotate(self, scene: np.ndarray, detections: MetaDatas) -> np.ndarray:
+    def annotate(self, scene: np.ndarray, detections: MetaDatas, context=None) -> np.ndarray:
         raise NotImplementedError
 
 
@@ -0,0 +1,104 @@
+from typing import Iterator, List
+import numpy as np
+
+from .base import MetaDatas, PACKED_COLUMNS, PACKED_TRACK_ID
+
+
+class BatchMetaDatas:
+    """
+    Detections of a whole batch of frames stored in one packed
+    `(total, PACKED_COLUMNS)` float32 buffer, with CSR-style frame offsets:
+    the detections of frame `i` are rows `offsets[i]:offsets[i + 1]`.
+
+    Indexing a frame returns a `MetaDatas` whose fields are views into the
+    shared buffer, so per-frame access costs no copy.
+    """
+
+    def __init__(self, packed: np.ndarray, offsets: np.ndarray, with_track_id: bool = False):
+        """
+        Parameters:
+        -----------
+            packed, ndarray:
+                Buffer of every detection of the batch, see `MetaDatas.from_packed`.
+            offsets, ndarray:
+                `(num_frames + 1,)` row offsets of each frame, starting at 0.
+            with_track_id, bool:
+                Whether the track_id column holds valid ids.
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if offsets.ndim != 1 or offsets[0] != 0 or offsets[-1] != len(packed):
+            raise ValueError("offsets must start at 0 and end at the number of detections")
+        self.packed = packed
+        self.offsets = offsets
+        self.with_track_id = with_track_id
+
+    @classmethod
+    def from_detections(cls, dets: np.ndarray, offsets: np.ndarray):
+        """
+        Build a batch from raw `(total, 6)` detections laid out as
+        `x1, y1, x2, y2, confidence, class_id`, with one allocation.
+        """
+        packed = np.empty((len(dets), PACKED_COLUMNS), dtype=np.float32)
+        packed[:, :6] = dets[:, :6]
+        packed[:, PACKED_TRACK_ID] = -1
+        return cls(packed, offsets, with_track_id=False)
+
+    @classmethod
+    def from_frames(cls, frames: List[MetaDatas]):
+        """Gather per-frame `MetaDatas` into a single batch."""
+        counts = [len(frame) for frame in frames]
+        packed = (np.concatenate([frame.pack() for frame in frames]) if frames
+                  else np.empty((0, PACKED_COLUMNS), dtype=np.float32))
+        with_track_id = len(frames) > 0 and all(frame.track_id is not None for frame in frames)
+        return cls(packed, np.concatenate([[0], np.cumsum(counts)]), with_track_id)
+
+    def __len__(self) -> int:
+        """Returns the number of frames in the batch."""
+        return len(self.offsets) - 1
+
+    @property
+    def num_detections(self) -> int:
+        return len(self.packed)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of detections of each frame."""
+        return np.diff(self.offsets)
+
+    @property
+    def frame_index(self) -> np.ndarray:
+        """Frame of each detection, shape `(total,)`."""
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    def __getitem__(self, index: int) -> MetaDatas:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Frame index {index} is out of range for a batch of {len(self)}")
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return MetaDatas.from_packed(self.packed[start:end], with_track_id=self.with_track_id)
+
+    def __iter__(self) -> Iterator[MetaDatas]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def filter(self, keep: np.ndarray):
+        """
+        Keep the detections selected by the boolean mask `keep` of shape `(total,)`,
+        e.g. `batch.filter(batch.packed[:, PACKED_CONFIDENCE] > 0.5)`.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        counts = np.bincount(self.frame_index[keep], minlength=len(self))
+        return BatchMetaDatas(self.packed[keep],
+                              np.concatenate([[0], np.cumsum(counts)]),
+                              self.with_track_id)
+
+    def save(self, path: str) -> None:
+        """Write the batch to a `.npz` file."""
+        np.savez(path, packed=self.packed, offsets=self.offsets,
+                 with_track_id=np.array(self.with_track_id))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as archive:
+            return cls(archive["packed"], archive["offsets"], bool(archive["with_track_id"]))
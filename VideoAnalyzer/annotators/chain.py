@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+
+from .base import MetaDatas
+from .draw.color import Color, ColorPalette
+from .draw.position import Position
+from .utils import ColorLookup, resolve_color_indices, resolve_colors_bgr
+
+
+class FrameContext:
+    """
+    Per-frame data shared by the annotators of a chain: integer boxes, anchor
+    points, color indices, colors and label strings. Every item is computed on
+    first use and reused by the following annotators.
+    """
+
+    def __init__(self, metadatas: MetaDatas, labels: Optional[List[str]] = None):
+        self.metadatas = metadatas
+        self._labels = labels
+        self._boxes: Optional[np.ndarray] = None
+        self._anchors: Dict[Position, np.ndarray] = {}
+        self._color_indices: Dict[ColorLookup, np.ndarray] = {}
+        self._colors: Dict[tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.metadatas)
+
+    @property
+    def boxes(self) -> np.ndarray:
+        """`(n, 4)` integer `xyxy`."""
+        if self._boxes is None:
+            self._boxes = self.metadatas.xyxy.astype(int)
+        return self._boxes
+
+    def anchors(self, position: Position) -> np.ndarray:
+        """`(n, 2)` integer anchor points at `position`."""
+        if position not in self._anchors:
+            self._anchors[position] = self.metadatas.get_anchors_coordinates(anchor=position).astype(int)
+        return self._anchors[position]
+
+    def color_indices(self, color_lookup: Union[ColorLookup, np.ndarray]) -> np.ndarray:
+        if isinstance(color_lookup, np.ndarray):
+            return resolve_color_indices(self.metadatas, color_lookup)
+        if color_lookup not in self._color_indices:
+            self._color_indices[color_lookup] = resolve_color_indices(self.metadatas, color_lookup)
+        return self._color_indices[color_lookup]
+
+    def colors(self,
+               color: Union[Color, ColorPalette],
+               color_lookup: Union[ColorLookup, np.ndarray] = ColorLookup.CLASS) -> np.ndarray:
+        """`(n, 3)` uint8 BGR color of every detection, see `resolve_colors_bgr`."""
+        key = (id(color), color_lookup if isinstance(color_lookup, ColorLookup) else id(color_lookup))
+        if key not in self._colors:
+            self._colors[key] = resolve_colors_bgr(color, self.metadatas, self.color_indices(color_lookup))
+        return self._colors[key]
+
+    @property
+    def labels(self) -> List[str]:
+        """Label of every detection: the given labels, or `class_id- track_id`."""
+        if self._labels is None:
+            metadatas = self.metadatas
+            if metadatas.class_id is not None:
+                labels = [str(c) for c in metadatas.class_id.astype(int).tolist()]
+                if metadatas.track_id is not None:
+                    labels = [f"{label}- {t}" for label, t in
+                              zip(labels, metadatas.track_id.astype(int).tolist())]
+            else:
+                labels = [str(metadatas)] * len(metadatas)
+            self._labels = labels
+        return self._labels
+
+
+class AnnotatorChain:
+    """
+    Run several annotators on the same detections, sharing one `FrameContext`.
+
+    Every annotator runs on every frame, including frames without detections,
+    and is expected to handle empty `MetaDatas` itself.
+
+    By default the annotations are drawn on a copy of the frame kept in a buffer
+    reused across calls, so the input frame stays clean (e.g. for the detector)
+    without allocating a new image every frame. The returned image is overwritten
+    by the next call.
+    """
+
+    def __init__(self, annotators: Sequence, copy: bool = True):
+        """
+        Parameters:
+        -----------
+            annotators (Sequence):
+                Annotators applied in order, each accepting a `context` keyword.
+            copy (bool):
+                Draw into the reusable buffer instead of the input frame.
+        """
+        self.annotators = list(annotators)
+        self.copy = copy
+        self._buffer: Optional[np.ndarray] = None
+
+    def annotate(self,
+                 scene: np.ndarray,
+                 metadatas: MetaDatas,
+                 labels: Optional[List[str]] = None,
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Parameters:
+        -----------
+            scene, ndarray:
+                The frame to annotate.
+            metadatas, MetaDatas:
+                Detections to annotate.
+            labels, Optional[List[str]]:
+                Custom labels, one per detection.
+            out, Optional[ndarray]:
+                Buffer to draw into, same shape and dtype as `scene`.
+
+        Returns:
+        -----------
+            The annotated image.
+        """
+        if out is None and self.copy:
+            if self._buffer is None or self._buffer.shape != scene.shape or self._buffer.dtype != scene.dtype:
+                self._buffer = np.empty_like(scene)
+            out = self._buffer
+        if out is not None and out is not scene:
+            np.copyto(out, scene)
+        else:
+            out = scene
+
+        # annotators run on empty frames too: stateful ones (e.g. the heatmap) keep
+        # advancing and drawing, the others return early
+        context = FrameContext(metadatas, labels)
+        for annotator in self.annotators:
+            out = annotator.annotate(out, metadatas, context=context)
+        return out
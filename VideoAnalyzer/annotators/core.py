@@ -1,7 +1,9 @@
 from .base import BaseAnnotator, MetaDatas
 from .draw.color import ColorPalette, Color
 from .draw.position import Position
-from .utils import ColorLookup, resolve_color
+from .chain import FrameContext
+from VideoAnalyzer.analytics.heatmap import HeatMap
+from .utils import ColorLookup, LRUCache
 
 from typing import Union, Optional, Tuple
 import cv2
@@ -32,7 +34,8 @@ class BoundingBoxAnnotator(BaseAnnotator):
 
     def annotate(self, 
                  scene, 
-                 metadatas):
+                 metadatas,
+                 context: Optional[FrameContext] = None):
         """Annotates the given scene with bounding boxes based on the provided detections.
 
         Parameters:
@@ -41,23 +44,26 @@ class BoundingBoxAnnotator(BaseAnnotator):
                 The image where bounding boxes will be drawn. 
             meatadatas, MetaDatas:
                 Object detections to annotate.
-            custom_color_lookup, Optional[np.ndarray]:
-                Custom color lookup array.
-                Allows to override the default color mapping strategy.
+            context, Optional[FrameContext]:
+                Per-frame data shared with other annotators, see `AnnotatorChain`.
 
         Returns:
         -----------
             The annotated image, matching the type of `scene`
         """
-        for data_idx in range(len(metadatas)):
-            x1, y1, x2, y2 = metadatas.xyxy[data_idx].astype(int)
-            color = resolve_color(
-                color=self.color,
-                metadatas=metadatas,
-                data_idx=data_idx,
-                color_lookup=self.color_lookup
-            )
-            cv2.rectangle(scene, (x1, y1), (x2, y2), color=color.as_bgr(), thickness=self.thickness)
+        if len(metadatas) == 0:
+            return scene
+
+        if context is None:
+            context = FrameContext(metadatas)
+
+        # resolve everything in bulk, the loop only hands plain Python values to OpenCV
+        boxes = context.boxes.tolist()
+        colors = context.colors(self.color, self.color_lookup).tolist()
+
+        rectangle, thickness = cv2.rectangle, self.thickness
+        for (x1, y1, x2, y2), color in zip(boxes, colors):
+            rectangle(scene, (x1, y1), (x2, y2), color, thickness)
         return scene
 
 
@@ -76,7 +82,8 @@ class LabelAnnotator:
         text_position: Position = Position.TOP_LEFT,
         color_lookup: ColorLookup = ColorLookup.CLASS,
         border_radius: int = 0,
-        CLASS_NAME_DATA_FIELD=""
+        CLASS_NAME_DATA_FIELD="",
+        sprite_cache_size: int = 1024,
     ):
         """
         Parameters:
@@ -93,6 +100,8 @@ class LabelAnnotator:
                 Options are `INDEX`, `CLASS`, `TRACK`.
             border_radius (int): The radius to apply round edges. If the selected
                 value is higher than the lower dimension, width or height, is clipped.
+            sprite_cache_size (int): Number of rendered labels kept for reuse across
+                frames. 0 renders every label every time.
         """
         self.border_radius: int = border_radius
         self.color: Union[Color, ColorPalette] = color
@@ -102,6 +111,7 @@ class LabelAnnotator:
         self.text_padding: int = text_padding
         self.text_anchor: Position = text_position
         self.color_lookup: ColorLookup = color_lookup
+        self.sprite_cache = LRUCache(sprite_cache_size)
 
     @staticmethod
     def resolve_text_background_xyxy(
@@ -198,66 +208,154 @@ class LabelAnnotator:
                 thickness=-1,
             )
         return scene    
-    
-    def annotate(self, scene, metadatas, labels=None):
-        if metadatas.xyxy.size == 0:
-            return scene
-        
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        anchors_coordinates = metadatas.get_anchors_coordinates(
-            anchor=self.text_anchor
-        ).astype(int)
-
-        for data_idx, center_coordinates in enumerate(anchors_coordinates):
-            color = resolve_color(
-                color=self.color,
-                metadatas=metadatas,
-                data_idx=data_idx,
-                color_lookup=self.color_lookup
-            )
 
-            if labels is not None:
-                text = labels[data_idx]
-            elif metadatas.class_id is not None:
-                text = str(metadatas.class_id[data_idx])
-                if metadatas.track_id is not None:
-                    text += f"- {metadatas.track_id[data_idx]}"
-            else:
-                text = str(metadatas)
-
-            text_w, text_h = cv2.getTextSize(
-                text=text,
-                fontFace=font,
-                fontScale=self.text_scale,
-                thickness=self.text_thickness,
-            )[0]
-            text_w_padded = text_w + 2 * self.text_padding
-            text_h_padded = text_h + 2 * self.text_padding
-            text_background_xyxy = self.resolve_text_background_xyxy(
-                center_coordinates=tuple(center_coordinates),
-                text_wh=(text_w_padded, text_h_padded),
-                position=self.text_anchor,
-            )
+    def get_sprite(self, text: str, color: Tuple[int, int, int]):
+        """
+        Returns the rendered label `(sprite, alpha, offset)`: the BGR background
+        with its text, a uint8 mask of its opaque pixels (None when fully
+        opaque) and the `(dx, dy)` of its top left corner from the anchor point.
+        Sprites are cached by text, colors and style.
+        """
+        key = (text, color, self.text_color.as_bgr(), self.text_scale, self.text_thickness,
+               self.text_padding, self.border_radius, self.text_anchor)
+        cached = self.sprite_cache.get(key)
+        if cached is not None:
+            return cached
 
-            text_x = text_background_xyxy[0] + self.text_padding
-            text_y = text_background_xyxy[1] + self.text_padding + text_h
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        text_w, text_h = cv2.getTextSize(
+            text=text,
+            fontFace=font,
+            fontScale=self.text_scale,
+            thickness=self.text_thickness,
+        )[0]
+        x1, y1, x2, y2 = self.resolve_text_background_xyxy(
+            center_coordinates=(0, 0),
+            text_wh=(text_w + 2 * self.text_padding, text_h + 2 * self.text_padding),
+            position=self.text_anchor,
+        )
+        width, height = x2 - x1 + 1, y2 - y1 + 1
 
+        sprite = np.empty((height, width, 3), dtype=np.uint8)
+        sprite[:] = color
+        alpha = None
+        if self.border_radius > 0:
+            alpha = np.zeros((height, width), dtype=np.uint8)
             self.draw_rounded_rectangle(
-                scene=scene,
-                xyxy=text_background_xyxy,
-                color=color.as_bgr(),
+                scene=alpha,
+                xyxy=(0, 0, width - 1, height - 1),
+                color=255,
                 border_radius=self.border_radius,
             )
 
-            cv2.putText(
-                img=scene,
-                text=text,
-                org=(text_x, text_y),
-                fontFace=font,
-                fontScale=self.text_scale,
-                color=self.text_color.as_rgb(),
-                thickness=self.text_thickness,
-                lineType=cv2.LINE_AA,
-            )
+        cv2.putText(
+            img=sprite,
+            text=text,
+            org=(self.text_padding, self.text_padding + text_h),
+            fontFace=font,
+            fontScale=self.text_scale,
+            color=self.text_color.as_bgr(),
+            thickness=self.text_thickness,
+            lineType=cv2.LINE_AA,
+        )
+
+        entry = (sprite, alpha, (x1, y1))
+        self.sprite_cache.put(key, entry)
+        return entry
+
+    @staticmethod
+    def blit(scene: np.ndarray, sprite: np.ndarray, alpha: Optional[np.ndarray], x: int, y: int) -> None:
+        """Copy `sprite` into `scene` with its top left corner at `(x, y)`, clipped to the scene."""
+        height, width = scene.shape[:2]
+        sx1, sy1 = max(0, -x), max(0, -y)
+        sx2 = min(sprite.shape[1], width - x)
+        sy2 = min(sprite.shape[0], height - y)
+        if sx2 <= sx1 or sy2 <= sy1:
+            return
+        region = scene[y + sy1:y + sy2, x + sx1:x + sx2]
+        if alpha is None:
+            region[:] = sprite[sy1:sy2, sx1:sx2]
+        else:
+            cv2.copyTo(sprite[sy1:sy2, sx1:sx2], alpha[sy1:sy2, sx1:sx2], region)
+    
+    def annotate(self, scene, metadatas, labels=None, context: Optional[FrameContext] = None):
+        """
+        Annotates the given scene with one label per detection. Labels default
+        to `class_id- track_id`; `labels` overrides them unless a `context`
+        already carries labels.
+        """
+        if metadatas.xyxy.size == 0:
+            return scene
+        if context is None:
+            context = FrameContext(metadatas, labels)
+
+        anchors_coordinates = context.anchors(self.text_anchor).tolist()
+        colors = context.colors(self.color, self.color_lookup).tolist()
+
+        for text, color, (anchor_x, anchor_y) in zip(context.labels, colors, anchors_coordinates):
+            sprite, alpha, (dx, dy) = self.get_sprite(text, tuple(color))
+            self.blit(scene, sprite, alpha, anchor_x + dx, anchor_y + dy)
+
+        return scene
+
+
+class HeatMapAnnotator:
+    """
+    Accumulate detection anchors into a `HeatMap` and overlay it on the scene.
+    """
+
+    def __init__(
+        self,
+        cell_size: int = 8,
+        decay: float = 0.999,
+        position: Position = Position.BOTTOM_CENTER,
+        opacity: float = 0.5,
+        colormap: int = cv2.COLORMAP_JET,
+        blur: float = 1.0,
+        render_interval: int = 10,
+        min_intensity: int = 8,
+    ):
+        """
+        Parameters:
+        -----------
+            cell_size (int): Side of a heatmap cell in pixels.
+            decay (float): Factor applied to the heatmap every frame, 1 never forgets.
+            position (Position): Point of each box added to the heatmap.
+            opacity (float): Opacity of the overlay.
+            colormap (int): OpenCV colormap of the overlay.
+            blur (float): Gaussian sigma in cells applied when rendering.
+            render_interval (int): Number of frames between two renderings of
+                the overlay, the heatmap itself is updated every frame.
+            min_intensity (int): Pixels below this intensity (0-255) are left untouched.
+        """
+        self.cell_size: int = cell_size
+        self.decay: float = decay
+        self.position: Position = position
+        self.opacity: float = opacity
+        self.colormap: int = colormap
+        self.blur: float = blur
+        self.render_interval: int = render_interval
+        self.min_intensity: int = min_intensity
+        self.heatmap: Optional[HeatMap] = None
+        self._overlay: Optional[np.ndarray] = None
+        self._overlay_mask: Optional[np.ndarray] = None
+
+    def annotate(self, scene, metadatas, context: Optional[FrameContext] = None):
+        height, width = scene.shape[:2]
+        if self.heatmap is None or self.heatmap.resolution_wh != (width, height):
+            self.heatmap = HeatMap((width, height), self.cell_size, self.decay, self.position)
+            self._overlay = None
+
+        if context is not None:
+            self.heatmap.add(context.anchors(self.position))
+        else:
+            self.heatmap.update(metadatas)
+
+        if self._overlay is None or self.heatmap.frames % self.render_interval == 0:
+            colored, intensity = self.heatmap.render(colormap=self.colormap, blur=self.blur)
+            self._overlay_mask = (intensity >= self.min_intensity).astype(np.uint8)
+            self._overlay = colored
 
+        blended = cv2.addWeighted(scene, 1 - self.opacity, self._overlay, self.opacity, 0)
+        cv2.copyTo(blended, self._overlay_mask, scene)
         return scene
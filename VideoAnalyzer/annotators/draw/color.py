@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from typing import List, Tuple
+import numpy as np
 
 DEFAULT_COLOR_PALETTE = [
     "A351FB",
@@ -154,3 +155,14 @@ class ColorPalette:
             raise ValueError("idx argument should not be negative")
         idx = idx % len(self.colors)
         return self.colors[idx]
+
+    def as_bgr_lut(self) -> np.ndarray:
+        """
+        Returns the palette as a `(K, 3)` uint8 lookup table in BGR order.
+        The table is built once and rebuilt only if `colors` changes length.
+        """
+        lut = self.__dict__.get("_bgr_lut")
+        if lut is None or len(lut) != len(self.colors):
+            lut = np.array([color.as_bgr() for color in self.colors], dtype=np.uint8).reshape(-1, 3)
+            self.__dict__["_bgr_lut"] = lut
+        return lut
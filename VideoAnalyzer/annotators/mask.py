@@ -0,0 +1,116 @@
+from typing import List, Tuple, Union
+import numpy as np
+
+
+class RLEMasks:
+    """
+    Compact storage for `N` binary masks of size `(H, W)`.
+
+    Every mask is a list of horizontal runs `(row, start, end)` covering the
+    pixels `start <= x < end` of `row`. The runs of all masks are kept in flat
+    arrays with CSR-style offsets: the runs of mask `i` are
+    `offsets[i]:offsets[i + 1]`. Area and centroid are computed directly from
+    the runs; dense masks are only decoded when indexed with an integer or
+    through `decode()`.
+    """
+
+    def __init__(self,
+                 image_shape: Tuple[int, int],
+                 offsets: np.ndarray,
+                 rows: np.ndarray,
+                 starts: np.ndarray,
+                 ends: np.ndarray):
+        self.image_shape: Tuple[int, int] = (int(image_shape[0]), int(image_shape[1]))
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.ends = np.asarray(ends, dtype=np.int32)
+
+    @classmethod
+    def from_dense(cls, masks: np.ndarray):
+        """Encode a `(N, H, W)` boolean array."""
+        num_masks, height, width = masks.shape
+        flat = masks.reshape(num_masks * height, width).astype(np.int8)
+        edges = np.diff(flat, axis=1, prepend=0, append=0)
+        start_line, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+
+        counts = np.bincount(start_line // height, minlength=num_masks)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return cls((height, width), offsets, start_line % height, starts, ends)
+
+    @classmethod
+    def empty(cls, image_shape: Tuple[int, int]):
+        return cls(image_shape, np.zeros(1), np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def concat(cls, masks_list: List["RLEMasks"]):
+        shape = masks_list[0].image_shape
+        if any(m.image_shape != shape for m in masks_list):
+            raise ValueError("Cannot concatenate masks of different image shapes")
+        counts = np.concatenate([np.diff(m.offsets) for m in masks_list])
+        return cls(shape,
+                   np.concatenate([[0], np.cumsum(counts)]),
+                   np.concatenate([m.rows for m in masks_list]),
+                   np.concatenate([m.starts for m in masks_list]),
+                   np.concatenate([m.ends for m in masks_list]))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """Shape of the decoded masks, `(N, H, W)`."""
+        return (len(self),) + self.image_shape
+
+    @property
+    def mask_index(self) -> np.ndarray:
+        """Mask of every run."""
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    @property
+    def area(self) -> np.ndarray:
+        """Number of pixels of each mask, shape `(N,)`."""
+        lengths = self.ends - self.starts
+        return np.bincount(self.mask_index, weights=lengths, minlength=len(self)).astype(np.int64)
+
+    def centroids(self) -> np.ndarray:
+        """
+        Centroid of each mask computed from its runs, with the same convention
+        as `calculate_masks_centroids`: `(N, 2)` integer `(x, y)` of pixel centers.
+        """
+        index = self.mask_index
+        lengths = (self.ends - self.starts).astype(np.float64)
+        area = np.bincount(index, weights=lengths, minlength=len(self))
+        # sum over a run of (x + 0.5) for x in [start, end) is length * (start + end) / 2
+        sum_x = np.bincount(index, weights=lengths * (self.starts + self.ends) / 2, minlength=len(self))
+        sum_y = np.bincount(index, weights=lengths * (self.rows + 0.5), minlength=len(self))
+        area[area == 0] = 1
+        return np.column_stack((sum_x / area, sum_y / area)).astype(int)
+
+    def __getitem__(self, index: Union[int, slice, List[int], np.ndarray]):
+        """
+        An integer returns the decoded `(H, W)` mask, any other index returns an
+        `RLEMasks` holding the selected masks.
+        """
+        if isinstance(index, (int, np.integer)):
+            return self[[index]].decode()[0]
+
+        selected = np.arange(len(self))[index]
+        counts = np.diff(self.offsets)[selected]
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        runs = np.repeat(self.offsets[selected] - offsets[:-1], counts) + np.arange(offsets[-1])
+        return RLEMasks(self.image_shape, offsets, self.rows[runs], self.starts[runs], self.ends[runs])
+
+    def decode(self) -> np.ndarray:
+        """Decode every mask into a dense `(N, H, W)` boolean array."""
+        height, width = self.image_shape
+        line = self.mask_index * height + self.rows
+        edges = np.zeros((len(self) * height, width + 1), dtype=np.int8)
+        np.add.at(edges, (line, self.starts), 1)
+        np.add.at(edges, (line, self.ends), -1)
+        return (np.cumsum(edges, axis=1)[:, :width] > 0).reshape(len(self), height, width)
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.decode()
+        return dense if dtype is None else dense.astype(dtype)
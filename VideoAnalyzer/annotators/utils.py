@@ -1,8 +1,10 @@
 import numpy as np
-from typing import Dict, Union, List
+from typing import Any, Dict, Hashable, Optional, Union, List
+from collections import OrderedDict
 from enum import Enum
 
 from .draw.color import Color, ColorPalette
+from .mask import RLEMasks
 
 def get_data_item(
     data: Dict[str, Union[np.ndarray, List]],
@@ -30,7 +32,10 @@ def get_data_item(
             if isinstance(index, slice):
                 subset_data[key] = value[index]
             elif isinstance(index, (list, np.ndarray)):
-                subset_data[key] = [value[i] for i in index]
+                index = np.asarray(index)
+                if index.dtype == bool:
+                    index = np.flatnonzero(index)
+                subset_data[key] = [value[i] for i in index.tolist()]
             elif isinstance(index, int):
                 subset_data[key] = [value[index]]
             else:
@@ -42,6 +47,37 @@ def get_data_item(
     return subset_data
 
 
+class LRUCache:
+    """
+    Least recently used cache with a fixed number of entries.
+    A `max_size` of 0 disables caching.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size: int = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
 class ColorLookup(Enum):
     """
     Enumeration class to define strategies for mapping colors to annotations.
@@ -78,7 +114,7 @@ def resolve_color_idx(
                 f"Length of color lookup {len(color_lookup)}"
                 f"does not match length of detections {len(meatadatas)}"
             )
-        return color_lookup[data_idx]
+        return int(color_lookup[data_idx])
     
     elif color_lookup == ColorLookup.INDEX:
         return data_idx
@@ -89,15 +125,74 @@ def resolve_color_idx(
                 "Could not resolve color by class because"
                 "Detections do not have class_id"
             )
-        return meatadatas.class_id[data_idx]
+        return int(meatadatas.class_id[data_idx])
     
     elif color_lookup == ColorLookup.TRACK:
-        if meatadatas.tracker_id is None:
+        if meatadatas.track_id is None:
             raise ValueError(
                 "Could not resolve color by track because"
-                "Detections do not have tracker_id"
+                "Detections do not have track_id"
             )
-        return meatadatas.tracker_id[data_idx]
+        return int(meatadatas.track_id[data_idx])
+
+
+def resolve_color_indices(
+    metadatas,
+    color_lookup: Union[ColorLookup, np.ndarray] = ColorLookup.CLASS,
+) -> np.ndarray:
+    """
+    Vectorized `resolve_color_idx`: the color index of every detection at once.
+
+    Returns:
+        np.ndarray: `(n,)` int64 array of color indices.
+    """
+    if isinstance(color_lookup, np.ndarray):
+        if len(color_lookup) != len(metadatas):
+            raise ValueError(
+                f"Length of color lookup {len(color_lookup)}"
+                f"does not match length of detections {len(metadatas)}"
+            )
+        indices = color_lookup
+    elif color_lookup == ColorLookup.INDEX:
+        indices = np.arange(len(metadatas))
+    elif color_lookup == ColorLookup.CLASS:
+        if metadatas.class_id is None:
+            raise ValueError(
+                "Could not resolve color by class because"
+                "Detections do not have class_id"
+            )
+        indices = metadatas.class_id
+    elif color_lookup == ColorLookup.TRACK:
+        if metadatas.track_id is None:
+            raise ValueError(
+                "Could not resolve color by track because"
+                "Detections do not have track_id"
+            )
+        indices = metadatas.track_id
+    else:
+        raise ValueError(f"{color_lookup} is not supported.")
+    return np.asarray(indices).astype(np.int64, copy=False)
+
+
+def resolve_colors_bgr(
+    color: Union[Color, ColorPalette],
+    metadatas,
+    color_lookup: Union[ColorLookup, np.ndarray] = ColorLookup.CLASS,
+) -> np.ndarray:
+    """
+    Resolve the BGR color of every detection in one lookup-table gather.
+
+    Returns:
+        np.ndarray: `(n, 3)` uint8 array of BGR colors.
+    """
+    if isinstance(color, Color):
+        return np.tile(np.array(color.as_bgr(), dtype=np.uint8), (len(metadatas), 1))
+
+    indices = resolve_color_indices(metadatas, color_lookup)
+    if indices.size > 0 and indices.min() < 0:
+        raise ValueError("idx argument should not be negative")
+    lut = color.as_bgr_lut()
+    return lut[indices % len(lut)]
 
 
 def get_color_by_index(color: Union[Color, ColorPalette], idx: int) -> Color:
@@ -119,31 +214,33 @@ def resolve_color(
     )
     return get_color_by_index(color=color, idx=idx)
 
-def calculate_masks_centroids(masks: np.ndarray) -> np.ndarray:
+def calculate_masks_centroids(masks: Union[np.ndarray, RLEMasks]) -> np.ndarray:
     """
     Calculate the centroids of binary masks in a tensor.
 
     Parameters:
-        masks (np.ndarray): A 3D NumPy array of shape (num_masks, height, width).
-            Each 2D array in the tensor represents a binary mask.
+        masks (Union[np.ndarray, RLEMasks]): A 3D NumPy array of shape
+            (num_masks, height, width), each 2D array being a binary mask,
+            or the same masks run-length encoded.
 
     Returns:
         A 2D NumPy array of shape (num_masks, 2), where each row contains the x and y
             coordinates (in that order) of the centroid of the corresponding mask.
     """
+    if isinstance(masks, RLEMasks):
+        return masks.centroids()
+
     num_masks, height, width = masks.shape
     total_pixels = masks.sum(axis=(1, 2))
 
     # offset for 1-based indexing
-    vertical_indices, horizontal_indices = np.indices((height, width)) + 0.5
+    vertical_indices = np.arange(height) + 0.5
+    horizontal_indices = np.arange(width) + 0.5
     # avoid division by zero for empty masks
     total_pixels[total_pixels == 0] = 1
 
-    def sum_over_mask(indices: np.ndarray, axis: tuple) -> np.ndarray:
-        return np.tensordot(masks, indices, axes=axis)
-
-    aggregation_axis = ([1, 2], [0, 1])
-    centroid_x = sum_over_mask(horizontal_indices, aggregation_axis) / total_pixels
-    centroid_y = sum_over_mask(vertical_indices, aggregation_axis) / total_pixels
+    # project the masks on each axis first instead of weighting full index grids
+    centroid_x = masks.sum(axis=1, dtype=np.int64) @ horizontal_indices / total_pixels
+    centroid_y = masks.sum(axis=2, dtype=np.int64) @ vertical_indices / total_pixels
 
     return np.column_stack((centroid_x, centroid_y)).astype(int)
\ No newline at end of file
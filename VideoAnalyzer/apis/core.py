@@ -1,18 +1,36 @@
 from omegaconf import DictConfig, OmegaConf
-from typing import Union
+from typing import Optional, Union
 import os
 import numpy as np
 import cv2
 
-from VideoAnalyzer.annotators import MetaDatas
+from VideoAnalyzer.annotators import MetaDatas, AnnotatorChain
+from VideoAnalyzer.annotators.core import BoundingBoxAnnotator, LabelAnnotator
 from VideoAnalyzer.detection.core import Detectors
 from VideoAnalyzer.track.core import Trackers
-from VideoAnalyzer.utils import get_pylogger
+from VideoAnalyzer.sinks import AsyncVideoWriter, sink_zoo
+from VideoAnalyzer.analytics import BestFrameSelector
+from VideoAnalyzer.utils import apply_resources, get_pylogger
+from VideoAnalyzer.utils.realtime import RealtimeSource
 logger = get_pylogger()
 
 class Analyzer:
-    def __init__(self, config: Union[DictConfig, str] = "configs/default.yaml"):
+    def __init__(self,
+                 config: Union[DictConfig, str] = "configs/default.yaml",
+                 worker_index: Optional[int] = None,
+                 num_workers: int = 1):
+        """
+        Parameters:
+        -----------
+            config (Union[DictConfig, str]):
+                Config or path to a yaml file.
+            worker_index, num_workers:
+                Position of this process among the workers sharing the machine,
+                used to split CPUs with `resources.cpu_affinity: auto`.
+        """
         self.cfg = self.load_config(config)
+        # thread pools must be capped before the models start them
+        apply_resources(self.cfg.get("resources"), worker_index, num_workers)
         self.configure_modules()
     
 
@@ -41,8 +59,24 @@ class Analyzer:
                 "show" : self.cfg.annotation.show,
                 "print": self.cfg.annotation.print
             }
+            self.writer = None
+            if self.verbose_action["show"]:
+                self.annotator = AnnotatorChain([BoundingBoxAnnotator(), LabelAnnotator()])
             self.supported_mode.append("annotation")
 
+        self.sinks = []
+        for sink_cfg in self.cfg.get("sinks") or []:
+            if sink_cfg.type not in sink_zoo:
+                logger.error(f"Sink type {sink_cfg.type} is not supported !!!")
+                raise ValueError(sink_cfg.type)
+            logger.info(f"Writing results to <{sink_cfg.path}> as {sink_cfg.type}")
+            kwargs = {k: v for k, v in sink_cfg.items() if k != "type"}
+            self.sinks.append(sink_zoo[sink_cfg.type](**kwargs))
+
+        self.thumbnails = None
+        if self.cfg.get("thumbnails") is not None:
+            self.thumbnails = BestFrameSelector()
+
         if "detection" in self.cfg:
             logger.info(f"Initiating <{self.cfg.detection.model}> detection module")
             self.detector = Detectors(self.cfg.detection)
@@ -53,18 +87,35 @@ class Analyzer:
             self.tracker = Trackers(self.cfg.track)
             self.supported_mode.append("track")
 
+            cascade = getattr(getattr(self, "detector", None), "cascade", None)
+            if cascade is not None and cascade.ambiguous_range is None:
+                # scores that neither start a track (det_thresh) nor are dropped (track_thresh)
+                track_thresh = self.cfg.track.kwargs.args.track_thresh
+                cascade.ambiguous_range = (track_thresh, track_thresh + 0.1)
+
+
+    def reset(self):
+        """Start a new video: fresh tracker and detector state, models are kept."""
+        self.close()
+        if "detection" in self.supported_mode:
+            self.detector.reset()
+        if "track" in self.supported_mode:
+            self.tracker = Trackers(self.cfg.track)
+        if self.thumbnails is not None:
+            self.thumbnails = BestFrameSelector()
+
 
     def do_detect(self, scene):
         if not ("detection" in self.supported_mode):
             logger.warning(f"Detection config is not found !!!. \
                            Please add the detection field to config to continue...")
-            return MetaDatas(xyxy=np.array([]))
+            return [MetaDatas.empty()]
         
         det_result = self.detector.do_detect(scene) # list of metadata
         return det_result
 
 
-    def do_track(self, metadata=None, scene=None):
+    def do_track(self, metadata=None, scene=None, timestamp=None):
         if not ("track" in self.supported_mode):
             logger.warning(f"Detection config is not found !!!. \
                            Please add the track field to config to continue...")
@@ -74,7 +125,9 @@ class Analyzer:
             assert scene is not None, f"Expected scene input"
             metadata = self.do_detect(scene)[0]
         
-        tracklet = self.tracker.do_track(metadata) # metadata
+        tracklet = self.tracker.do_track(metadata, scene=scene, timestamp=timestamp) # metadata
+        if scene is not None and "detection" in self.supported_mode:
+            self.detector.observe(tracklet)
         return tracklet
     
 
@@ -88,23 +141,121 @@ class Analyzer:
                 cap = cv2.VideoCapture(video)
             elif isinstance(video, cv2.VideoCapture):
                 cap = video
+            if not cap.isOpened():
+                logger.error(f"Cannot open video <{video}> !!!")
+                raise IOError(f"Cannot open video {video}")
             
             logger.info("Start tracking. Press Esc to stop!")
-            while True:
-                suc, frame = cap.read()
-                if not suc:
-                    logger.info(f"Done processing.")
-                    break
-                self.do_track(scene=frame)
+            realtime = self.cfg.get("realtime")
+            if realtime is not None:
+                # frames that cannot meet the latency budget are dropped, the
+                # tracker is given the source timestamps to bridge the gaps
+                frames = RealtimeSource(cap, **realtime)
+            else:
+                frames = self.read_frames(cap)
+            for frame_id, timestamp, frame in frames:
+                tracklet = self.do_track(scene=frame, timestamp=timestamp if realtime is not None else None)
+                self.write_results(frame_id, tracklet, timestamp)
+                if self.thumbnails is not None:
+                    self.thumbnails.update(frame_id, tracklet)
+                if "annotation" in self.supported_mode:
+                    if self.verbose_action["save"] and self.writer is None:
+                        self.open_writer(fps=cap.get(cv2.CAP_PROP_FPS) or None)
+                    if self.verbose(scene=frame, metadata=tracklet):
+                        logger.info("Stopped by user.")
+                        break
+            else:
+                logger.info(f"Done processing.")
+            if realtime is not None:
+                frames.close()
+            self.close()
+            if self.thumbnails is not None and isinstance(video, str):
+                self.extract_thumbnails(video)
         else:
-            for metadata in metadata_list:
-                self.do_track(metadata=metadata)
+            for frame_id, metadata in enumerate(metadata_list):
+                tracklet = self.do_track(metadata=metadata)
+                self.write_results(frame_id, tracklet)
+                if "annotation" in self.supported_mode:
+                    self.verbose(metadata=tracklet)
+            self.close()
+
+
+    @staticmethod
+    def read_frames(cap):
+        """Yield `(frame_id, timestamp, frame)` for every frame of `cap`, timestamps in seconds."""
+        frame_id = 0
+        while True:
+            suc, frame = cap.read()
+            if not suc:
+                return
+            yield frame_id, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000, frame
+            frame_id += 1
+
+
+    def extract_thumbnails(self, video):
+        """Save the best crop of every track of `video`, see `BestFrameSelector`."""
+        cfg = self.cfg.thumbnails
+        crops = self.thumbnails.extract(video,
+                                        output_dir=cfg.get("output_dir", "outputs/thumbnails"),
+                                        padding=cfg.get("padding", 0.1))
+        logger.info(f"Saved {len(crops)} track thumbnails")
+        return crops
+
+
+    def write_results(self, frame_id, metadata, timestamp=None):
+        """Hand the results of a frame to every configured sink."""
+        for sink in self.sinks:
+            sink.write(frame_id, metadata, timestamp)
+
+
+    def open_writer(self, fps=None):
+        """Start the background writer of annotated frames, see `AsyncVideoWriter`."""
+        cfg = self.cfg.annotation
+        if fps is None:
+            fps = self.cfg.track.kwargs.frame_rate if "track" in self.cfg else 30
+        self.writer = AsyncVideoWriter(
+            path=cfg.get("save_path", "outputs/result.mp4"),
+            fps=fps,
+            fourcc=cfg.get("fourcc", "mp4v"),
+            queue_size=cfg.get("queue_size", 32),
+            policy=cfg.get("policy", "block"),
+            annotator=AnnotatorChain([BoundingBoxAnnotator(), LabelAnnotator()], copy=False),
+        )
+        return self.writer
 
 
     def verbose(self, scene=None, metadata=None):
+        """
+        Print, show and/or save the frame and its metadata, as enabled in the
+        annotation config. Returns True when the user pressed Esc on the window.
+        """
+        stop = False
         if self.verbose_action["print"]:
             logger.info(metadata)
-        elif self.verbose_action["show"]:
-            pass # TODO: do_show
-        elif self.verbose_action["save"]:
-            pass # TODO: do_save
\ No newline at end of file
+        if scene is None:
+            return stop
+
+        # show first: the writer thread annotates the frame in place once it is queued
+        if self.verbose_action["show"]:
+            frame = self.annotator.annotate(scene, metadata) if metadata is not None else scene
+            cv2.imshow("VideoAnalyzer", frame)
+            stop = cv2.waitKey(1) & 0xff == 27
+        if self.verbose_action["save"]:
+            if self.writer is None:
+                self.open_writer()
+            self.writer.write(scene, metadata)
+        return stop
+
+
+    def close(self):
+        """Flush and release the video writer, the result sinks and the tracker's threads."""
+        if getattr(self, "tracker", None) is not None:
+            self.tracker.close()
+        for sink in getattr(self, "sinks", []):
+            sink.close()
+        self.sinks = []
+        if getattr(self, "writer", None) is not None:
+            self.writer.close()
+            self.writer = None
+        if getattr(self, "verbose_action", {}).get("show"):
+            cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+    Process a directory or glob of videos with `Analyzer` in a process pool.
+
+    python -m VideoAnalyzer.cli videos/ "archive/**/*.mp4" --output outputs/batch --workers 4 --threads 2
+
+    Results of each video are written through a result sink (see `sinks.sink_zoo`)
+    to `<output>/<video name>-<path hash>.<ext>`. Every finished or failed video
+    is appended to `<output>/manifest.jsonl`; running the same command again skips
+    the videos recorded as done (unless they changed since) and retries the others.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+
+from VideoAnalyzer.utils import blas_environ, get_pylogger
+logger = get_pylogger()
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".mpg", ".mpeg", ".ts", ".webm")
+SINK_EXTENSIONS = {"jsonl": ".jsonl", "mot": ".txt", "columnar": ""}
+
+
+def find_videos(inputs: Iterable[str]) -> List[str]:
+    """Expand files, directories (recursively) and glob patterns into sorted absolute video paths."""
+    videos = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = glob.glob(os.path.join(item, "**", "*"), recursive=True)
+        else:
+            candidates = glob.glob(item, recursive=True)
+        videos.update(os.path.abspath(c) for c in candidates
+                      if os.path.isfile(c) and c.lower().endswith(VIDEO_EXTENSIONS))
+    return sorted(videos)
+
+
+def output_path(video: str, output_dir: str, sink: str) -> str:
+    digest = hashlib.sha1(video.encode()).hexdigest()[:8]
+    name = os.path.splitext(os.path.basename(video))[0]
+    return os.path.join(output_dir, f"{name}-{digest}{SINK_EXTENSIONS[sink]}")
+
+
+def file_signature(video: str) -> Dict[str, float]:
+    stat = os.stat(video)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+class Manifest:
+    """Append-only JSON Lines record of processed videos, the last record of a video wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # truncated last line of an interrupted run
+                    self.records[record["video"]] = record
+
+    def is_done(self, video: str) -> bool:
+        record = self.records.get(video)
+        return (record is not None and record["status"] == "done"
+                and record.get("signature") == file_signature(video))
+
+    def append(self, record: dict) -> None:
+        self.records[record["video"]] = record
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+@contextmanager
+def environ(env: Dict[str, str]):
+    """Set environment variables for the processes started in the block, restored after it."""
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+# one Analyzer per worker process, built once and reused for every video
+_analyzer = None
+
+
+def _init_worker(config: str, num_threads: int, counter, num_workers: int) -> None:
+    global _analyzer
+    from omegaconf import OmegaConf
+    from VideoAnalyzer.apis import Analyzer
+
+    with counter.get_lock():
+        worker_index = counter.value
+        counter.value += 1
+
+    cfg = OmegaConf.load(config)
+    if num_threads > 0:
+        resources = cfg.get("resources") or {}
+        cfg.resources = {**resources,
+                         "torch_threads": num_threads, "torch_interop_threads": 1,
+                         "cv2_threads": num_threads, "blas_threads": num_threads}
+    # outputs shared by every video of a worker are disabled, each video gets its own sink
+    if "annotation" in cfg:
+        cfg.annotation.show = False
+        cfg.annotation.save = False
+    cfg.sinks = None
+    cfg.thumbnails = None
+    _analyzer = Analyzer(cfg, worker_index=worker_index, num_workers=num_workers)
+
+
+def process_video(video: str, output: str, sink: str) -> dict:
+    """Track one video into `output`, written under a temporary name and renamed when complete."""
+    from VideoAnalyzer.sinks import sink_zoo
+
+    partial = output + ".partial"
+    if os.path.isdir(partial):
+        shutil.rmtree(partial)
+    elif os.path.exists(partial):
+        os.remove(partial)
+
+    start = time.perf_counter()
+    _analyzer.reset()
+    _analyzer.sinks = [sink_zoo[sink](partial)]
+    _analyzer.do_track_video(video)
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.replace(partial, output)
+    return {"seconds": round(time.perf_counter() - start, 3)}
+
+
+def run(videos: List[str],
+        config: str,
+        output_dir: str,
+        sink: str = "columnar",
+        workers: int = 1,
+        threads: int = 1) -> int:
+    """Process `videos`, skipping those already done. Returns the number of failures."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(output_dir, "manifest.jsonl"))
+    todo = [v for v in videos if not manifest.is_done(v)]
+    logger.info(f"{len(videos)} videos found, {len(videos) - len(todo)} already done, {len(todo)} to process")
+    if not todo:
+        return 0
+
+    # BLAS reads its thread limit when numpy loads, which happens as soon as a
+    # spawned worker imports VideoAnalyzer: it must be in the environment it starts with
+    if threads > 0:
+        blas_threads = threads
+    else:
+        from omegaconf import OmegaConf
+        blas_threads = (OmegaConf.load(config).get("resources") or {}).get("blas_threads")
+    env = blas_environ(blas_threads) if blas_threads is not None else {}
+
+    failures = 0
+    # spawn: workers must not inherit CUDA or thread pools initialized in this process
+    ctx = mp.get_context("spawn")
+    counter = ctx.Value("i", 0)
+    with environ(env), ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=ctx,
+                                           initializer=_init_worker,
+                                           initargs=(config, threads, counter, workers)) as pool:
+        futures = {}
+        for video in todo:
+            output = output_path(video, output_dir, sink)
+            futures[pool.submit(process_video, video, output, sink)] = (video, output)
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                video, output = futures[future]
+                record = {"video": video, "output": output, "signature": file_signature(video)}
+                try:
+                    record.update(status="done", **future.result())
+                    logger.info(f"[{done}/{len(todo)}] {video} done in {record['seconds']}s")
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    failures += 1
+                    record.update(status="failed", error=f"{type(e).__name__}: {e}")
+                    logger.error(f"[{done}/{len(todo)}] {video} failed: {record['error']}")
+                manifest.append(record)
+        except (KeyboardInterrupt, BrokenProcessPool) as e:
+            logger.error(f"Stopping ({type(e).__name__}), run the same command again to resume")
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return failures
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Batch tracking of video files.")
+    parser.add_argument("inputs", nargs="+", help="video files, directories or glob patterns")
+    parser.add_argument("--config", default="configs/default.yaml")
+    parser.add_argument("--output", default="outputs/batch", help="results and manifest directory")
+    parser.add_argument("--sink", default="columnar", choices=sorted(SINK_EXTENSIONS))
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--threads", type=int, default=1,
+                        help="threads per worker for torch / OpenCV / BLAS, 0 keeps the resources config")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    videos = find_videos(args.inputs)
+    if not videos:
+        logger.error(f"No video found in {args.inputs}")
+        return 1
+    failures = run(videos, args.config, args.output, args.sink, args.workers, args.threads)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
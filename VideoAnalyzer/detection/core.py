@@ -1,10 +1,15 @@
+import time
+import numpy as np
 import torch
 from ultralytics import YOLO
-from typing import Any, List
+from typing import Any, Callable, List, Optional, Tuple
 from omegaconf import OmegaConf, DictConfig
 
 from .utils.model_zoo import detector_zoo
-from VideoAnalyzer.annotators import MetaDatas
+from .utils.resolution import ResolutionController
+from .utils.roi import RegionOfInterest
+from .utils.cascade import CascadePolicy, merge_detections
+from VideoAnalyzer.annotators import MetaDatas, BatchMetaDatas
 from VideoAnalyzer.utils import get_pylogger
 logger = get_pylogger()
 
@@ -15,39 +20,130 @@ class Detectors:
     def load_configurations(self, config: DictConfig) -> None:
         self.cfg = OmegaConf.to_object(config)
 
-        model = self.cfg["model"]
-        weight = self.cfg["weight"]
-
-        if model in ["yolov5", "yolov8"]:
-            if model == "yolov5":
-                self.model = torch.hub.load('ultralytics/yolov5', 'custom', path=weight)
-            elif model == "yolov8":
-                self.model = YOLO(weight)
-
-            self.kwargs_ = {
-                "imgsz"  : self.cfg["imgsz"],
-                "conf"   : self.cfg["conf"],
-                "classes": self.cfg["classes"],
-                "verbose": self.cfg["verbose"],
-                "device" : self.cfg["device"],
-            }
+        self.model, self.__detect = self.load_backend(self.cfg["model"], self.cfg["weight"])
+        self.kwargs_ = {
+            "imgsz"  : self.cfg["imgsz"],
+            "conf"   : self.cfg["conf"],
+            "classes": self.cfg["classes"],
+            "verbose": self.cfg["verbose"],
+            "device" : self.cfg["device"],
+        }
+
+        # strong model run on the frames the cascade policy escalates
+        self.cascade: Optional[CascadePolicy] = None
+        cascade = self.cfg.get("cascade")
+        if cascade is not None:
+            logger.info(f"Initiating <{cascade['model']}> cascade detector from <{cascade['weight']}>")
+            self.strong_model, self.__detect_strong = self.load_backend(cascade["model"], cascade["weight"])
+            self.strong_kwargs_ = {**self.kwargs_,
+                                   "imgsz": cascade.get("imgsz", self.kwargs_["imgsz"]),
+                                   "conf" : cascade.get("conf", self.kwargs_["conf"])}
+            self.merge_iou = cascade.get("merge_iou", 0.5)
+            self.cascade = self.build_cascade_policy()
+
+        # the input size is a per call argument, switching it does not reload the model
+        self.resolution: Optional[ResolutionController] = None
+        if self.cfg.get("adaptive_imgsz") is not None:
+            self.resolution = ResolutionController(**self.cfg["adaptive_imgsz"])
+            logger.info(f"Adaptive input size over {self.resolution.ladder.tolist()}")
+
+        self.roi: Optional[RegionOfInterest] = None
+        if self.cfg.get("roi") is not None:
+            self.roi = RegionOfInterest(**self.cfg["roi"])
+            logger.info(f"Detecting in the region of interest {self.roi.bounds}")
+
+
+    def build_cascade_policy(self) -> CascadePolicy:
+        return CascadePolicy(**{k: v for k, v in self.cfg["cascade"].items()
+                                if k in ("period", "low_confidence", "ambiguous",
+                                         "ambiguous_range", "new_tracks")})
+
+
+    def reset(self) -> None:
+        """Start a new stream: fresh cascade and adaptive input size state, models are kept."""
+        if self.cascade is not None:
+            # a fresh policy restarts the per-video counters and the new_tracks reference
+            # (whether or not the tracker restarts its ids); the range may come from the tracker thresholds
+            ambiguous_range = self.cascade.ambiguous_range
+            self.cascade = self.build_cascade_policy()
+            self.cascade.ambiguous_range = ambiguous_range
+        if self.resolution is not None:
+            self.resolution = ResolutionController(**self.cfg["adaptive_imgsz"])
+
+
+    @staticmethod
+    def load_backend(model: str, weight: str) -> Tuple[Any, Callable]:
+        """Load the weights of a `detector_zoo` model, returns `(model, detect function)`."""
+        if model == "yolov5":
+            net = torch.hub.load('ultralytics/yolov5', 'custom', path=weight)
+        elif model == "yolov8":
+            net = YOLO(weight)
         else:
             logger.error(f"Model type {model} is not supported !!!")
-            raise
-
-        self.__detect = detector_zoo[model]
+            raise ValueError(model)
+        return net, detector_zoo[model]
 
     
     def do_detect(self, batch: Any) -> List[MetaDatas]:
+        return list(self.do_detect_batch(batch)) # per image views of one buffer
+    
+
+    def do_detect_batch(self, batch: Any) -> BatchMetaDatas:
         batch = self._validate_batch(batch)
-        det_objects_ = []
-        dets = self.__detect(self.model, batch, **self.kwargs_)
-
-        for det in dets:
-            det_objects_.append(MetaDatas(xyxy=det[:, :4], 
-                                          class_id=det[:, -1].astype("int"),
-                                          confidence=det[:, -2]))
-        return det_objects_
+        if self.roi is not None:
+            shapes = [frame.shape for frame in batch]
+            batch, origins = self.roi.crop(batch)
+
+        kwargs = self.kwargs_
+        if self.resolution is not None:
+            self.resolution.select()
+            kwargs = {**kwargs, "imgsz": self.resolution.shape(kwargs["imgsz"])}
+        # long side of the image the objects are measured against, the crop with a ROI
+        frame_size = max(batch[0].shape[:2])
+        if self.roi is not None and self.roi.keep_scale:
+            # imgsz (configured or adaptive) stands for the full frame, the crop
+            # runs at the same object scale
+            kwargs = {**kwargs, "imgsz": self.roi.input_size(kwargs["imgsz"], shapes[0])}
+            frame_size = max(shapes[0][:2])
+
+        start = time.perf_counter()
+        dets, offsets = self.__detect(self.model, batch, **kwargs)
+        if self.resolution is not None:
+            self.resolution.update_latency(time.perf_counter() - start, frame_size=frame_size)
+
+        if self.cascade is not None:
+            dets, offsets = self._escalate(batch, dets, offsets, shapes if self.roi is not None else None)
+        if self.roi is not None:
+            dets, offsets = self.roi.restore(dets, offsets, origins, shapes)
+        return BatchMetaDatas.from_detections(dets, offsets)
+
+
+    def _escalate(self, batch, dets, offsets, shapes=None):
+        """Run the strong model on the frames the cascade policy picks and merge its detections."""
+        escalated = [i for i in range(len(batch))
+                     if self.cascade.decide(dets[offsets[i]:offsets[i + 1], 4]) is not None]
+        if not escalated:
+            return dets, offsets
+
+        kwargs = self.strong_kwargs_
+        if shapes is not None and self.roi.keep_scale:
+            kwargs = {**kwargs, "imgsz": self.roi.input_size(kwargs["imgsz"], shapes[0])}
+        strong, strong_offsets = self.__detect_strong(self.strong_model, [batch[i] for i in escalated], **kwargs)
+
+        frames = [dets[offsets[i]:offsets[i + 1]] for i in range(len(batch))]
+        for j, i in enumerate(escalated):
+            frames[i] = merge_detections(frames[i], strong[strong_offsets[j]:strong_offsets[j + 1]], self.merge_iou)
+        offsets = np.concatenate([[0], np.cumsum([len(f) for f in frames])]).astype(np.int64)
+        dets = np.concatenate(frames) if offsets[-1] else np.empty((0, 6), dtype=np.float32)
+        return dets, offsets
+
+
+    def observe(self, metadatas: MetaDatas) -> None:
+        """Report the tracks of the last frame to the adaptive input size and the cascade, if enabled."""
+        if self.resolution is not None:
+            self.resolution.update_boxes(metadatas.xyxy)
+        if self.cascade is not None:
+            self.cascade.observe(metadatas.track_id)
     
 
     def _validate_batch(self, batch: Any):
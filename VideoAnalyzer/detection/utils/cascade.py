@@ -0,0 +1,105 @@
+"""
+    Cheap detector on every frame, strong detector on demand.
+
+    `CascadePolicy` decides, from the cheap detections of a frame and the tracks
+    of the previous ones, whether the frame is escalated to the strong model:
+
+        - period: every `period` frames, so the strong model regularly corrects
+          what the cheap one misses altogether,
+        - low_confidence: the mean score of the cheap detections is below it,
+        - ambiguous: at least this fraction of the detections score within
+          `ambiguous_range`, by default the band between the tracker's
+          `track_thresh` and `det_thresh` where detections neither start tracks
+          nor are ignored,
+        - new_tracks: a track id not seen before appeared on the previous frame.
+
+    The detections of both models are then merged with `merge_detections`.
+"""
+from collections import Counter
+from typing import Optional, Sequence, Tuple
+import numpy as np
+
+from .nms import box_non_max_suppression
+
+
+def merge_detections(cheap: np.ndarray, strong: np.ndarray, iou_threshold: float = 0.5) -> np.ndarray:
+    """
+    Union of two `(n, 6)` `(xyxy, conf, cls)` detection sets of one frame, where
+    boxes of the same class overlapping by more than `iou_threshold` are
+    resolved by class-aware NMS in favour of the higher score.
+    """
+    if len(cheap) == 0:
+        return strong
+    if len(strong) == 0:
+        return cheap
+    dets = np.concatenate([strong, cheap]).astype(np.float32, copy=False)
+    return dets[box_non_max_suppression(dets, iou_threshold)]
+
+
+class CascadePolicy:
+    def __init__(self,
+                 period: Optional[int] = 30,
+                 low_confidence: Optional[float] = 0.5,
+                 ambiguous: Optional[float] = 0.3,
+                 ambiguous_range: Optional[Sequence[float]] = None,
+                 new_tracks: bool = True):
+        """
+        Parameters:
+        -----------
+            period (Optional[int]):
+                Escalate every `period` frames, None to disable.
+            low_confidence (Optional[float]):
+                Escalate when the mean cheap score is below it, None to disable.
+            ambiguous (Optional[float]):
+                Escalate when at least this fraction of the cheap detections score
+                within `ambiguous_range`, None to disable.
+            ambiguous_range (Optional[Sequence[float]]):
+                `(low, high)` scores, set from the tracker thresholds when None.
+            new_tracks (bool):
+                Escalate the frame following the appearance of a new track id.
+        """
+        self.period = period
+        self.low_confidence = low_confidence
+        self.ambiguous = ambiguous
+        self.ambiguous_range: Optional[Tuple[float, float]] = (
+            tuple(ambiguous_range) if ambiguous_range is not None else None)
+        self.new_tracks = new_tracks
+
+        self.frames = 0
+        self.escalations = Counter()  # reason -> frames
+        self._max_track_id = 0
+        self._new_track = False
+
+    def decide(self, scores: np.ndarray) -> Optional[str]:
+        """The reason to escalate a frame given its cheap detection scores, or None."""
+        self.frames += 1
+        reason = None
+        if self.period and (self.frames - 1) % self.period == 0:
+            reason = "period"
+        elif self.new_tracks and self._new_track:
+            reason = "new_tracks"
+        elif len(scores) > 0:
+            if self.low_confidence is not None and scores.mean() < self.low_confidence:
+                reason = "low_confidence"
+            elif self.ambiguous is not None and self.ambiguous_range is not None:
+                low, high = self.ambiguous_range
+                if np.mean((scores >= low) & (scores < high)) >= self.ambiguous:
+                    reason = "ambiguous"
+        self._new_track = False
+        if reason is not None:
+            self.escalations[reason] += 1
+        return reason
+
+    def observe(self, track_id: Optional[np.ndarray]) -> None:
+        """Report the track ids output for the last frame, ids are assumed to increase."""
+        if track_id is None or len(track_id) == 0:
+            return
+        newest = int(np.max(track_id))
+        if newest > self._max_track_id:
+            self._max_track_id = newest
+            self._new_track = True
+
+    @property
+    def rate(self) -> float:
+        """Fraction of the frames escalated so far."""
+        return sum(self.escalations.values()) / max(self.frames, 1)
@@ -1,7 +1,20 @@
 """
     This module contains detect function of detectors
-    Return List[(xyxy, conf, cls)]
+    Return (dets, offsets): dets of the whole batch as one (total, 6) array of 
+    (xyxy, conf, cls), the detections of image i are dets[offsets[i]:offsets[i + 1]]
 """
+import numpy as np
+import torch
+
+def _gather(boxes):
+    """Concatenate per-image tensors on device and transfer them to host once"""
+    counts = [len(b) for b in boxes]
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    if len(boxes) == 0:
+        return np.empty((0, 6), dtype=np.float32), offsets
+    data = torch.cat([b[:, [0, 1, 2, 3, -2, -1]] for b in boxes]).cpu().numpy()
+    return data, offsets
+
 
 def do_detect_yolov8(v8_model=None, 
                      batch=None,
@@ -18,8 +31,7 @@ def do_detect_yolov8(v8_model=None,
                             classes=classes, 
                             verbose=verbose, 
                             device=device, )   
-    results = [pred.boxes.data.cpu().numpy() for pred in v8_preds]
-    return results
+    return _gather([pred.boxes.data for pred in v8_preds])
 
 
 def do_detect_yolov5(v5_model=None, 
@@ -34,15 +46,14 @@ def do_detect_yolov5(v5_model=None,
         v5_model.conf = conf
         v5_model.classes = classes
         v5_model.verbose = verbose
-        model = model.to(device)
+        v5_model = v5_model.to(device)
 
         batch = [im[..., ::-1] for im in batch] # yolov5 expects RGB input
-        v5_preds = model(batch, size=imgsz)
-    results = [pred.cpu().numpy() for pred in v5_preds.xyxy]
-    return results
+        v5_preds = v5_model(batch, size=imgsz)
+    return _gather(list(v5_preds.xyxy))
 
 
 detector_zoo = {
     "yolov8": do_detect_yolov8,
     "yolov5": do_detect_yolov5
-}
\ No newline at end of file
+}
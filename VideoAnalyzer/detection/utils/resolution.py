@@ -0,0 +1,154 @@
+"""
+    Adaptive detector input size.
+
+    `ResolutionController` picks the input size of each detector call from a
+    ladder of sizes (long side, pixels), from two signals:
+
+        - latency: a moving average of the detector time of every size, sizes
+          not measured recently are estimated from the current one, scaled by
+          the ratio of input areas. The largest size expected to meet
+          `target_latency` is allowed.
+        - object scale: the small tracked boxes (`box_percentile` of their
+          shorter side), which must stay at least `min_object_size` pixels at the
+          detector input. The smallest size keeping them so is needed.
+
+    The controller runs the needed size, capped by the allowed one: when both
+    cannot be met the latency target wins. A switch needs `margin` of headroom
+    on the signal allowing it (latency to go up, object size to go down) and
+    the same decision for `patience` consecutive calls, so the size does not
+    flap around a boundary.
+"""
+from typing import Optional, Sequence, Tuple, Union
+import numpy as np
+
+
+class ResolutionController:
+    def __init__(self,
+                 ladder: Sequence[int] = (320, 416, 512, 640),
+                 target_latency: float = 0.05,
+                 min_object_size: float = 24,
+                 box_percentile: float = 10,
+                 margin: float = 0.2,
+                 patience: int = 5,
+                 smoothing: float = 0.2,
+                 stale_after: int = 300,
+                 start: Optional[int] = None):
+        """
+        Parameters:
+        -----------
+            ladder (Sequence[int]):
+                Allowed input sizes, long side in pixels.
+            target_latency (float):
+                Seconds per detector call to stay under.
+            min_object_size (float):
+                Shorter side in pixels, at the detector input, below which objects are
+                considered too small to be detected reliably.
+            box_percentile (float):
+                Percentile of the tracked boxes' shorter side taken as the object scale.
+            margin (float):
+                Relative headroom required to switch: on latency to go up, on object size to go down.
+            patience (int):
+                Consecutive calls agreeing on a new size before switching to it.
+            smoothing (float):
+                Weight of the newest sample in the latency moving averages.
+            stale_after (int):
+                Calls after which the latency measured for a size is not trusted anymore.
+            start (Optional[int]):
+                Initial size, the largest of the ladder by default.
+        """
+        self.ladder = np.array(sorted(set(int(s) for s in ladder)), dtype=np.int64)
+        self.target_latency = float(target_latency)
+        self.min_object_size = float(min_object_size)
+        self.box_percentile = float(box_percentile)
+        self.margin = float(margin)
+        self.patience = max(int(patience), 1)
+        self.smoothing = float(smoothing)
+        self.stale_after = int(stale_after)
+
+        n = len(self.ladder)
+        self.index = n - 1 if start is None else int(np.searchsorted(self.ladder, start).clip(0, n - 1))
+        self.latency = np.full(n, np.nan)
+        self.measured_at = np.full(n, -np.inf)
+        self.object_size: Optional[float] = None  # in source pixels
+        self.frame_size: Optional[int] = None     # long side of the source frames
+        self.calls = 0
+        self.switches = 0
+        self._pending: Optional[int] = None
+        self._pending_count = 0
+
+    @property
+    def imgsz(self) -> int:
+        return int(self.ladder[self.index])
+
+    def shape(self, base: Union[int, Sequence[int]], stride: int = 32) -> Union[int, Tuple[int, int]]:
+        """The current size in the format of `base` (the configured `imgsz`), sides rounded up to `stride`."""
+        if isinstance(base, int):
+            return self.imgsz
+        h, w = base
+        scale = self.imgsz / max(h, w)
+        return (int(np.ceil(h * scale / stride) * stride), int(np.ceil(w * scale / stride) * stride))
+
+    def update_latency(self, seconds: float, frame_size: Optional[int] = None) -> None:
+        """Record the duration of a detector call run at the current size."""
+        i = self.index
+        if np.isnan(self.latency[i]) or self.calls - self.measured_at[i] > self.stale_after:
+            self.latency[i] = seconds
+        else:
+            self.latency[i] += self.smoothing * (seconds - self.latency[i])
+        self.measured_at[i] = self.calls
+        if frame_size is not None:
+            self.frame_size = int(frame_size)
+
+    def update_boxes(self, xyxy: np.ndarray, frame_size: Optional[int] = None) -> None:
+        """Record the tracked boxes of the last frame, in source pixels."""
+        if frame_size is not None:
+            self.frame_size = int(frame_size)
+        if len(xyxy) == 0:
+            self.object_size = None
+            return
+        xyxy = np.asarray(xyxy, dtype=np.float32)
+        sides = np.minimum(xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1])
+        self.object_size = float(np.percentile(sides, self.box_percentile))
+
+    def estimates(self) -> np.ndarray:
+        """Expected latency of every size."""
+        current = self.latency[self.index]
+        if np.isnan(current):
+            return np.zeros(len(self.ladder))
+        scaled = current * (self.ladder / self.imgsz) ** 2
+        fresh = ~np.isnan(self.latency) & (self.calls - self.measured_at <= self.stale_after)
+        return np.where(fresh, self.latency, scaled)
+
+    def desired(self) -> int:
+        """Index of the size the signals ask for, before patience."""
+        up = np.arange(len(self.ladder)) > self.index
+        headroom = np.where(up, 1 + self.margin, 1.0)
+
+        meets = self.estimates() * headroom <= self.target_latency
+        allowed = int(np.flatnonzero(meets).max()) if meets.any() else 0
+
+        if self.object_size is None or not self.frame_size:
+            # nothing tracked: objects may enter at any size
+            needed = len(self.ladder) - 1
+        else:
+            at_input = self.object_size * self.ladder / self.frame_size
+            big_enough = at_input >= self.min_object_size * np.where(up, 1.0, 1 + self.margin)
+            big_enough[self.index] = at_input[self.index] >= self.min_object_size
+            needed = int(np.flatnonzero(big_enough).min()) if big_enough.any() else len(self.ladder) - 1
+        return min(needed, allowed)
+
+    def select(self) -> int:
+        """Decide the size of the next detector call and return it."""
+        self.calls += 1
+        desired = self.desired()
+        if desired == self.index:
+            self._pending, self._pending_count = None, 0
+        elif desired == self._pending:
+            self._pending_count += 1
+        else:
+            self._pending, self._pending_count = desired, 1
+        if self._pending is not None and self._pending_count >= self.patience:
+            self.index = self._pending
+            self._pending, self._pending_count = None, 0
+            self.switches += 1
+        return self.imgsz
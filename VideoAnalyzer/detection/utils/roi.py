@@ -0,0 +1,126 @@
+"""
+    Region of interest of a stream.
+
+    The detector only sees the bounding rectangle of the regions (plus
+    `padding`), a view into the frame. The letterbox brings its long side to
+    `imgsz` like that of a full frame, so at the same `imgsz` objects are
+    larger at the detector input (better small-object recall) for about the
+    same detector cost. With `keep_scale` the crop is instead run at the input
+    size that keeps the object scale of the full frame, i.e. the same objects
+    for a fraction of the pixels. Boxes are shifted back to frame coordinates
+    and the detections whose anchor falls outside every region are dropped.
+    Regions far apart still share one rectangle.
+"""
+from typing import List, Sequence, Tuple, Union
+import numpy as np
+import cv2
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.annotators.draw.position import Position
+from VideoAnalyzer.utils import get_pylogger
+logger = get_pylogger()
+
+
+class RegionOfInterest:
+    def __init__(self,
+                 polygons: Sequence[Sequence[Sequence[float]]] = (),
+                 rects: Sequence[Sequence[float]] = (),
+                 anchor: Union[Position, str] = Position.CENTER,
+                 padding: int = 16,
+                 keep_scale: bool = False):
+        """
+        Parameters:
+        -----------
+            polygons (Sequence):
+                Regions as lists of pixel `(x, y)` vertices.
+            rects (Sequence):
+                Regions as pixel `(x1, y1, x2, y2)` rectangles.
+            anchor (Union[Position, str]):
+                Point of each box that must lie in a region for the detection to be kept.
+            padding (int):
+                Margin in pixels around the regions' bounding rectangle, so objects
+                crossing its border are not cut.
+            keep_scale (bool):
+                Shrink the detector input so objects keep the size they would have
+                with the full frame at the configured `imgsz`, see `input_size`.
+        """
+        self.polygons: List[np.ndarray] = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polygons]
+        for x1, y1, x2, y2 in rects:
+            self.polygons.append(np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float64))
+        if len(self.polygons) == 0:
+            raise ValueError("RegionOfInterest needs at least one polygon or rect")
+        self.anchor = Position(anchor) if isinstance(anchor, str) else anchor
+        self.keep_scale = keep_scale
+
+        points = np.concatenate(self.polygons)
+        self.bounds = (int(np.floor(points[:, 0].min())) - padding, int(np.floor(points[:, 1].min())) - padding,
+                       int(np.ceil(points[:, 0].max())) + padding, int(np.ceil(points[:, 1].max())) + padding)
+        self._shape = None
+        self._mask = None
+
+    def window(self, shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        """`(x1, y1, x2, y2)` of the crop in a frame of `shape`, which must overlap the regions."""
+        height, width = shape[:2]
+        x1, y1, x2, y2 = self.bounds
+        x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, width), min(y2, height)
+        if x2 <= x1 or y2 <= y1:
+            # e.g. regions drawn for another resolution of the stream
+            logger.error(f"Region of interest {self.bounds} is outside the {width}x{height} frame !!!")
+            raise ValueError(f"Region of interest {self.bounds} is outside the frame of shape {tuple(shape)}")
+        return x1, y1, x2, y2
+
+    def input_size(self, imgsz: Union[int, Sequence[int]], shape: Tuple[int, ...], stride: int = 32) -> int:
+        """Long side of the crop's input at the scale a full frame of `shape` gets at `imgsz`."""
+        x1, y1, x2, y2 = self.window(shape)
+        scale = (imgsz if isinstance(imgsz, int) else max(imgsz)) / max(shape[:2])
+        return max(int(np.ceil(max(x2 - x1, y2 - y1) * scale / stride)) * stride, stride)
+
+    def mask(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """`(h, w)` uint8 mask of the regions, rasterized once per frame size."""
+        if self._shape != shape[:2]:
+            self._shape = shape[:2]
+            self._mask = np.zeros(shape[:2], dtype=np.uint8)
+            cv2.fillPoly(self._mask, [np.round(p).astype(np.int32) for p in self.polygons], 1)
+        return self._mask
+
+    def contains(self, points: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+        """Whether each `(x, y)` pixel point lies in a region."""
+        mask = self.mask(shape)
+        xy = np.floor(points).astype(np.int64)
+        inside = (xy[:, 0] >= 0) & (xy[:, 0] < mask.shape[1]) & (xy[:, 1] >= 0) & (xy[:, 1] < mask.shape[0])
+        inside[inside] = mask[xy[inside, 1], xy[inside, 0]] > 0
+        return inside
+
+    def crop(self, batch: List[np.ndarray]) -> Tuple[List[np.ndarray], np.ndarray]:
+        """Views of the crops of a batch and the `(x, y)` origin of each crop."""
+        crops, origins = [], np.empty((len(batch), 2), dtype=np.float32)
+        for i, frame in enumerate(batch):
+            x1, y1, x2, y2 = self.window(frame.shape)
+            crops.append(frame[y1:y2, x1:x2])
+            origins[i] = x1, y1
+        return crops, origins
+
+    def restore(self,
+                dets: np.ndarray,
+                offsets: np.ndarray,
+                origins: np.ndarray,
+                shapes: Sequence[Tuple[int, ...]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Shift `(total, 6)` detections of the crops back to frame coordinates and
+        drop those outside the regions. Returns the new `(dets, offsets)`.
+        """
+        if len(dets) == 0:
+            return dets, offsets
+        counts = np.diff(offsets)
+        shift = np.repeat(origins, counts, axis=0)
+        dets = dets.copy()
+        dets[:, [0, 2]] += shift[:, :1]
+        dets[:, [1, 3]] += shift[:, 1:]
+
+        anchors = MetaDatas.from_arrays(xyxy=dets[:, :4], confidence=dets[:, 4],
+                                        class_id=dets[:, 5]).get_anchors_coordinates(self.anchor)
+        keep = np.empty(len(dets), dtype=bool)
+        for i, shape in enumerate(shapes):
+            keep[offsets[i]:offsets[i + 1]] = self.contains(anchors[offsets[i]:offsets[i + 1]], shape)
+        kept = np.bincount(np.repeat(np.arange(len(counts)), counts)[keep], minlength=len(counts))
+        return dets[keep], np.concatenate([[0], np.cumsum(kept)]).astype(np.int64)
@@ -0,0 +1,2 @@
+from .video import AsyncVideoWriter
+from .results import ResultSink, JsonLinesSink, MOTChallengeSink, ColumnarSink, load_columns, sink_zoo
\ No newline at end of file
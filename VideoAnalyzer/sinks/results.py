@@ -0,0 +1,252 @@
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import threading
+import numpy as np
+
+from VideoAnalyzer.annotators.base import (MetaDatas, PACKED_COLUMNS, PACKED_XYXY,
+                                           PACKED_CONFIDENCE, PACKED_CLASS_ID, PACKED_TRACK_ID)
+from VideoAnalyzer.utils import get_pylogger
+logger = get_pylogger()
+
+
+class ResultSink:
+    """
+    Base class of the sinks writing tracking results to disk.
+
+    `write` only copies the packed buffer of the frame into a pending list, a
+    background thread gathers the pending frames into one `(rows, PACKED_COLUMNS)`
+    batch and hands it to `write_batch` every `flush_interval` seconds, or as soon
+    as `batch_size` rows are pending. Subclasses implement `open`, `write_batch`
+    and `close_file`, which all run on the background thread.
+    """
+
+    def __init__(self, path: str, batch_size: int = 4096, flush_interval: float = 1.0):
+        """
+        Parameters:
+        -----------
+            path (str):
+                Output file, or directory for the columnar sink.
+            batch_size (int):
+                Number of pending detections that triggers a write.
+            flush_interval (float):
+                Maximum number of seconds a result waits before being written.
+        """
+        self.path = path
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.frames_written = 0
+
+        self._pending: List[Tuple[int, float, np.ndarray]] = []
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, frame_id: int, metadatas: MetaDatas, timestamp: Optional[float] = None) -> None:
+        """Queue the results of one frame."""
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise RuntimeError(f"Writing to a closed {type(self).__name__}")
+        packed = np.array(metadatas.pack(), copy=True)
+        if metadatas.track_id is None:
+            packed[:, PACKED_TRACK_ID] = -1
+        with self._lock:
+            self._pending.append((frame_id, np.nan if timestamp is None else timestamp, packed))
+            self._pending_rows += len(packed)
+            full = self._pending_rows >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def close(self) -> None:
+        """Write the pending results and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        logger.info(f"Saved results of {self.frames_written} frames to {self.path}")
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending, self._pending_rows = self._pending, [], 0
+        if not pending:
+            return None
+        counts = np.array([len(rows) for _, _, rows in pending])
+        frame_id = np.repeat(np.array([f for f, _, _ in pending], dtype=np.int64), counts)
+        timestamp = np.repeat(np.array([t for _, t, _ in pending], dtype=np.float64), counts)
+        rows = (np.concatenate([rows for _, _, rows in pending]) if counts.sum()
+                else np.empty((0, PACKED_COLUMNS), dtype=np.float32))
+        return pending, frame_id, timestamp, rows
+
+    def _run(self) -> None:
+        try:
+            self.open()
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                closing = self._closed  # read before taking, so nothing written before close() is left behind
+                batch = self._take()
+                if batch is not None:
+                    self.write_batch(*batch)
+                    self.frames_written += len(batch[0])
+                if closing:
+                    break
+        except Exception as e:
+            logger.error(f"{type(self).__name__} failed: {e}")
+            self._error = e
+        finally:
+            self.close_file()
+
+    def open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "w")
+
+    def write_batch(self,
+                    frames: List[Tuple[int, float, np.ndarray]],
+                    frame_id: np.ndarray,
+                    timestamp: np.ndarray,
+                    rows: np.ndarray) -> None:
+        """
+        Write one batch: `frames` holds the `(frame_id, timestamp, packed)` of each
+        frame, `frame_id`, `timestamp` and `rows` the same data flattened per detection.
+        """
+        raise NotImplementedError
+
+    def close_file(self) -> None:
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+            self._file = None
+
+
+class JsonLinesSink(ResultSink):
+    """One JSON object per frame: `{"frame_id", "timestamp", "detections": [...]}`."""
+
+    def write_batch(self, frames, frame_id, timestamp, rows):
+        lines = []
+        for fid, ts, packed in frames:
+            lines.append(json.dumps({
+                "frame_id": fid,
+                "timestamp": None if np.isnan(ts) else ts,
+                "detections": [
+                    {"xyxy": box, "confidence": conf, "class_id": int(cls), "track_id": int(tid)}
+                    for box, conf, cls, tid in zip(packed[:, PACKED_XYXY].astype(np.float64).round(2).tolist(),
+                                                   packed[:, PACKED_CONFIDENCE].astype(np.float64).round(4).tolist(),
+                                                   packed[:, PACKED_CLASS_ID].tolist(),
+                                                   packed[:, PACKED_TRACK_ID].tolist())
+                ],
+            }))
+        lines.append("")
+        self._file.write("\n".join(lines))
+
+
+class MOTChallengeSink(ResultSink):
+    """
+    MOTChallenge txt: `frame, id, bb_left, bb_top, bb_width, bb_height, conf, -1, -1, -1`,
+    with 1-based frames (`frame_id + 1`).
+    """
+
+    def write_batch(self, frames, frame_id, timestamp, rows):
+        if len(rows) == 0:
+            return
+        xyxy = rows[:, PACKED_XYXY]
+        table = np.column_stack([
+            frame_id + 1,
+            rows[:, PACKED_TRACK_ID],
+            xyxy[:, 0], xyxy[:, 1], xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1],
+            rows[:, PACKED_CONFIDENCE],
+        ])
+        np.savetxt(self._file, table, fmt="%d,%d,%.2f,%.2f,%.2f,%.2f,%.4f,-1,-1,-1")
+
+
+# name -> (dtype, row shape) of the files of a columnar results directory
+COLUMNS: Dict[str, Tuple[np.dtype, Tuple[int, ...]]] = {
+    "frame_id"  : (np.dtype(np.int64), ()),
+    "timestamp" : (np.dtype(np.float64), ()),
+    "track_id"  : (np.dtype(np.int64), ()),
+    "class_id"  : (np.dtype(np.int32), ()),
+    "confidence": (np.dtype(np.float32), ()),
+    "xyxy"      : (np.dtype(np.float32), (4,)),
+}
+
+
+def split_columns(frame_id: np.ndarray, timestamp: np.ndarray, rows: np.ndarray) -> Dict[str, np.ndarray]:
+    """Turn flattened packed rows into the arrays of `COLUMNS`."""
+    return {
+        "frame_id"  : frame_id,
+        "timestamp" : timestamp,
+        "track_id"  : rows[:, PACKED_TRACK_ID],
+        "class_id"  : rows[:, PACKED_CLASS_ID],
+        "confidence": rows[:, PACKED_CONFIDENCE],
+        "xyxy"      : rows[:, PACKED_XYXY],
+    }
+
+
+def load_columns(directory: str, mmap_mode: str = "r") -> Dict[str, np.ndarray]:
+    """Memory-map the columns written by `ColumnarSink`."""
+    with open(os.path.join(directory, "meta.json")) as f:
+        rows = json.load(f)["rows"]
+    columns = {}
+    for name, (dtype, shape) in COLUMNS.items():
+        if rows == 0:
+            columns[name] = np.empty((0,) + shape, dtype=dtype)
+            continue
+        columns[name] = np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype.newbyteorder("<"),
+                                  mode=mmap_mode, shape=(rows,) + shape)
+    return columns
+
+
+class ColumnarSink(ResultSink):
+    """
+    A directory with one raw little-endian file per column of `COLUMNS`, one row
+    per detection, appended batch by batch, and a `meta.json` with the number of
+    rows. Read it back with `load_columns`.
+    """
+
+    def open(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        self.rows = 0
+        self._files = {name: open(os.path.join(self.path, f"{name}.bin"), "wb") for name in COLUMNS}
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        meta = {"rows": self.rows,
+                "columns": {name: [dtype.str, list(shape)] for name, (dtype, shape) in COLUMNS.items()}}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def write_batch(self, frames, frame_id, timestamp, rows):
+        for name, values in split_columns(frame_id, timestamp, rows).items():
+            dtype = COLUMNS[name][0].newbyteorder("<")
+            self._files[name].write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        self.rows += len(rows)
+        # the row count is published after the data so readers never see partial rows
+        for f in self._files.values():
+            f.flush()
+        self._write_meta()
+
+    def close_file(self) -> None:
+        for f in getattr(self, "_files", {}).values():
+            f.close()
+        self._files = {}
+
+
+sink_zoo = {
+    "jsonl"   : JsonLinesSink,
+    "mot"     : MOTChallengeSink,
+    "columnar": ColumnarSink,
+}
@@ -0,0 +1,170 @@
+from typing import Optional
+import os
+import queue
+import threading
+import numpy as np
+import cv2
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.utils import get_pylogger
+logger = get_pylogger()
+
+
+class AsyncVideoWriter:
+    """
+    Annotate and encode frames on a background thread.
+
+    `write` only enqueues the frame and its MetaDatas into a bounded queue; the
+    annotation and the `cv2.VideoWriter` encoding run on the writer thread, so
+    the caller never waits on the encoder unless `policy="block"`. What happens
+    when the encoder falls behind and the queue is full depends on `policy`:
+
+        block          : `write` waits for a free place, no frame is lost.
+        drop_oldest    : the oldest queued frame is discarded.
+        reduce_quality : once the backlog reaches 3/4 of the queue, frames are
+                         written without annotation and with `low_quality`
+                         encoder quality (honored by MJPG) until it falls back
+                         under 1/4; the oldest frame is dropped if it still fills up.
+
+    The writer thread owns the frames it receives: they are annotated in place,
+    so a frame must not be modified by the caller after `write`.
+    """
+    POLICIES = ("block", "drop_oldest", "reduce_quality")
+
+    def __init__(self,
+                 path: str,
+                 fps: float = 30.0,
+                 fourcc: str = "mp4v",
+                 queue_size: int = 32,
+                 policy: str = "block",
+                 annotator=None,
+                 low_quality: int = 50):
+        """
+        Parameters:
+        -----------
+            path (str):
+                Output video file.
+            fps (float):
+                Frame rate of the output video.
+            fourcc (str):
+                Four character code of the codec, e.g. "mp4v", "MJPG".
+            queue_size (int):
+                Number of frames waiting for the encoder.
+            policy (str):
+                `block`, `drop_oldest` or `reduce_quality`.
+            annotator:
+                Drawing applied to each frame before encoding, e.g. an
+                `AnnotatorChain` with `copy=False`. None writes raw frames.
+            low_quality (int):
+                Encoder quality (0-100) used by `reduce_quality` under backlog.
+        """
+        if policy not in self.POLICIES:
+            logger.error(f"Writer policy {policy} is not supported, expected one of {self.POLICIES} !!!")
+            raise ValueError(policy)
+
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.policy = policy
+        self.annotator = annotator
+        self.low_quality = low_quality
+
+        self.written = 0
+        self.dropped = 0
+        self.degraded = False
+        self._high_watermark = max(1, queue_size * 3 // 4)
+        self._low_watermark = queue_size // 4
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._error: Optional[Exception] = None
+        self._closed = False
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="AsyncVideoWriter", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, frame: np.ndarray, metadatas: Optional[MetaDatas] = None) -> None:
+        """Enqueue `frame` and its detections, to be annotated and encoded."""
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise RuntimeError("Writing to a closed AsyncVideoWriter")
+
+        item = (frame, metadatas)
+        if self.policy == "block":
+            self._queue.put(item)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    @property
+    def backlog(self) -> int:
+        """Number of frames waiting for the encoder."""
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """Encode the remaining frames and release the video file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if self._writer is not None:
+            self._writer.release()
+        if self.dropped:
+            logger.warning(f"{self.dropped} frames were dropped while writing {self.path}")
+        logger.info(f"Saved {self.written} frames to {self.path}")
+
+    def _open(self, frame: np.ndarray) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        height, width = frame.shape[:2]
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                       self.fps, (width, height))
+        if not self._writer.isOpened():
+            raise IOError(f"Cannot open video writer for {self.path} with fourcc {self.fourcc}")
+
+    def _update_quality(self) -> None:
+        backlog = self._queue.qsize()
+        if not self.degraded and backlog >= self._high_watermark:
+            self.degraded = True
+            self._writer.set(cv2.VIDEOWRITER_PROP_QUALITY, self.low_quality)
+        elif self.degraded and backlog <= self._low_watermark:
+            self.degraded = False
+            self._writer.set(cv2.VIDEOWRITER_PROP_QUALITY, 100)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue  # drain the queue so a blocked producer can reach close()
+
+            frame, metadatas = item
+            try:
+                if self._writer is None:
+                    self._open(frame)
+                if self.policy == "reduce_quality":
+                    self._update_quality()
+                if self.annotator is not None and metadatas is not None and not self.degraded:
+                    frame = self.annotator.annotate(frame, metadatas)
+                self._writer.write(frame)
+                self.written += 1
+            except Exception as e:
+                logger.error(f"Video writer failed: {e}")
+                self._error = e
@@ -1,5 +1,5 @@
 from omegaconf import OmegaConf, DictConfig
-from typing import Any, List
+from typing import Any, List, Optional
 
 from third_parties.byte_track.byte_tracker import BYTETracker
 from VideoAnalyzer.annotators.base import MetaDatas
@@ -7,6 +7,10 @@ from VideoAnalyzer.utils import get_pylogger
 logger = get_pylogger()
 
 from .utils.model_zoo import tracker_zoo
+from .utils.trajectory import TrajectoryStore
+from .utils.reid import ReIDEmbedder, FeatureBank
+from .utils.light_trackers import IOUTracker, SORTTracker
+from VideoAnalyzer.analytics.speed import SpeedEstimator
 
 class Trackers:
     def __init__(self, config) -> None:
@@ -17,19 +21,77 @@ class Trackers:
 
         model = self.cfg.model
         if model == "byte_track":
-            self.tracker = BYTETracker(self.cfg.kwargs.args, self.cfg.kwargs.frame_rate)
+            embedder, feature_bank = self.load_reid(self.cfg.kwargs.get("reid"))
+            self.tracker = BYTETracker(self.cfg.kwargs.args, self.cfg.kwargs.frame_rate,
+                                       embedder=embedder, feature_bank=feature_bank)
+            self.kwargs_ = {}
+        elif model == "iou":
+            self.tracker = IOUTracker(self.cfg.kwargs.args, self.cfg.kwargs.frame_rate)
+            self.kwargs_ = {}
+        elif model == "sort":
+            self.tracker = SORTTracker(self.cfg.kwargs.args, self.cfg.kwargs.frame_rate)
             self.kwargs_ = {}
         else:
             logger.error(f"Model type {model} is not supported !!!")
             raise
 
         self.__track = tracker_zoo[model]
+
+        self.frame_id = 0
+        self.trajectories: Optional[TrajectoryStore] = None
+        if self.cfg.get("trajectory") is not None:
+            self.trajectories = TrajectoryStore(**self.cfg.trajectory)
+        self.speed_estimator: Optional[SpeedEstimator] = self.load_speed(self.cfg.get("speed"))
     
-    def do_track(self, metadata: MetaDatas) -> MetaDatas:
-        tracklets = self.__track(self.tracker, metadata, **self.kwargs_) # xyxy, score, track_id
+    def load_reid(self, config: Optional[DictConfig]):
+        if config is None:
+            return None, None
+        logger.info(f"Initiating Re-ID stage from <{config.weight}>")
+        embedder = ReIDEmbedder(weight=config.weight,
+                                input_size=config.get("input_size", (128, 256)),
+                                num_threads=config.get("num_threads"))
+        feature_bank = FeatureBank(alpha=config.get("alpha", 0.9),
+                                   refresh_interval=config.get("refresh_interval", 10))
+        return embedder, feature_bank
+
+    def load_speed(self, config: Optional[DictConfig]):
+        if config is None:
+            return None
+        kwargs = dict(window=config.get("window", 10), smoothing=config.get("smoothing", 0.3))
+        if config.get("homography") is not None:
+            return SpeedEstimator(homography=OmegaConf.to_object(config.homography), **kwargs)
+        if config.get("image_points") is None or config.get("ground_points") is None:
+            logger.error(f"Speed estimation needs a homography or image_points and ground_points !!!")
+            raise ValueError("speed calibration is missing")
+        return SpeedEstimator.from_points(OmegaConf.to_object(config.image_points),
+                                          OmegaConf.to_object(config.ground_points), **kwargs)
+
+    def close(self) -> None:
+        """Release the resources held by the tracker (e.g. BYTETracker's association threads)."""
+        close = getattr(self.tracker, "close", None)
+        if close is not None:
+            close()
+
+    def do_track(self, 
+                 metadata: MetaDatas, 
+                 scene: Optional[Any] = None, 
+                 timestamp: Optional[float] = None) -> MetaDatas:
+        # the source timestamp, when given, lets the tracker bridge dropped frames
+        tracklets = self.__track(self.tracker, metadata, scene=scene, timestamp=timestamp, **self.kwargs_) # xyxy, score, track_id
         xyxy, score, cls_id, track_id = tracklets
+
+        self.frame_id += 1
+        if timestamp is None:
+            timestamp = self.frame_id / self.cfg.kwargs.frame_rate
+        if self.trajectories is not None:
+            self.trajectories.update(track_id, xyxy, score, timestamp)
+
+        data = {}
+        if self.speed_estimator is not None:
+            data["speed"] = self.speed_estimator.update(track_id, xyxy, timestamp) # km/h
         
-        return MetaDatas(xyxy=xyxy,
-                         confidence=score,
-                         class_id=cls_id,
-                         track_id=track_id)
\ No newline at end of file
+        return MetaDatas.from_arrays(xyxy=xyxy,
+                                     confidence=score,
+                                     class_id=cls_id,
+                                     track_id=track_id,
+                                     data=data)
@@ -0,0 +1,183 @@
+"""
+    Lightweight array-backed trackers for high frame rate, low compute settings.
+    Every track attribute lives in one NumPy array, association is a single
+    IoU stage solved greedily or with Jonker-Volgenant (`matching.linear_assignment`).
+    `update` returns the `(xyxy, score, cls_id, track_id)` tuple used by `Trackers`.
+"""
+import numpy as np
+
+from third_parties.byte_track import matching
+from third_parties.byte_track.basetrack import elapsed_frames
+
+
+class IOUTracker:
+    """
+    IoU tracker: a detection continues the track whose last box it overlaps the
+    most. No motion model, so it is only suited to high frame rates.
+    """
+    _fields = ("xyxy", "score", "class_id", "track_id", "hits", "last_frame")
+
+    def __init__(self, args, frame_rate=30):
+        self.args = args
+        self.track_thresh = args.track_thresh
+        self.det_thresh = args.track_thresh + 0.1
+        self.match_thresh = args.match_thresh
+        self.frame_rate = frame_rate
+        self.max_time_lost = int(frame_rate / 30.0 * args.track_buffer)
+        self.min_hits = getattr(args, "min_hits", 1)
+        self.class_aware = getattr(args, "class_aware", True)
+        if getattr(args, "matching", "greedy") == "greedy":
+            self.assign = matching.greedy_assignment
+        else:
+            self.assign = matching.linear_assignment
+
+        self.frame_id = 0
+        self.last_timestamp = None
+        self._count = 0
+        self.xyxy = np.empty((0, 4), dtype=np.float32)
+        self.score = np.empty(0, dtype=np.float32)
+        self.class_id = np.empty(0, dtype=np.int64)
+        self.track_id = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int64)
+        self.last_frame = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.track_id)
+
+    def _predict(self, dt=1.):
+        """Boxes the tracks are expected at on the current frame, `dt` frames after the previous one."""
+        return self.xyxy
+
+    def _correct(self, index, boxes):
+        self.xyxy[index] = boxes
+
+    def _spawn(self, boxes, scores, class_ids):
+        n = len(boxes)
+        self.xyxy = np.concatenate([self.xyxy, boxes])
+        self.score = np.concatenate([self.score, scores])
+        self.class_id = np.concatenate([self.class_id, class_ids])
+        self.track_id = np.concatenate([self.track_id, np.arange(self._count + 1, self._count + n + 1)])
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int64)])
+        self.last_frame = np.concatenate([self.last_frame, np.full(n, self.frame_id, dtype=np.int64)])
+        self._count += n
+
+    def _keep(self, mask):
+        for name in self._fields:
+            setattr(self, name, getattr(self, name)[mask])
+
+    def update(self, output_results, img=None, timestamp=None):
+        """
+        Parameters:
+        -----------
+            output_results, ndarray:
+                Detections of shape `(n, 6)` as `(x1, y1, x2, y2, score, class_id)`.
+            timestamp, Optional[float]:
+                Time of the frame in seconds. When frames are dropped upstream,
+                tracks age and move by the time elapsed instead of one frame.
+
+        Returns:
+        -----------
+            Tuple of `(xyxy, score, cls_id, track_id)` for the tracks updated on this frame.
+        """
+        dt, step, self.last_timestamp = elapsed_frames(timestamp, self.last_timestamp, self.frame_rate)
+        self.frame_id += step
+        output_results = np.asarray(output_results, dtype=np.float32).reshape(-1, 6)
+        dets = output_results[output_results[:, 4] > self.track_thresh]
+        boxes = dets[:, :4]
+        scores = dets[:, 4]
+        class_ids = dets[:, 5].astype(np.int64)
+
+        predicted = self._predict(dt)
+        dists = 1 - matching.ious(predicted, boxes)
+        if self.class_aware and dists.size > 0:
+            dists[self.class_id[:, None] != class_ids[None, :]] = 1.0
+        matches, _, u_detection = self.assign(dists, thresh=self.match_thresh)
+
+        if len(matches) > 0:
+            itracked, idet = matches[:, 0], matches[:, 1]
+            self._correct(itracked, boxes[idet])
+            self.score[itracked] = scores[idet]
+            self.hits[itracked] += 1
+            self.last_frame[itracked] = self.frame_id
+
+        u_detection = np.asarray(u_detection, dtype=np.int64)
+        u_detection = u_detection[scores[u_detection] >= self.det_thresh]
+        if len(u_detection) > 0:
+            self._spawn(boxes[u_detection], scores[u_detection], class_ids[u_detection])
+
+        self._keep(self.frame_id - self.last_frame <= self.max_time_lost)
+
+        out = (self.last_frame == self.frame_id) & ((self.hits >= self.min_hits) | (self.frame_id <= self.min_hits))
+        return (self.xyxy[out].astype("int"),
+                self.score[out],
+                self.class_id[out],
+                self.track_id[out])
+
+
+class SORTTracker(IOUTracker):
+    """
+    SORT: IoU association against boxes predicted by a constant velocity Kalman
+    filter on `(cx, cy, area, ratio)`. The filter of all tracks runs as batched
+    array operations.
+    """
+    _fields = IOUTracker._fields + ("mean", "covariance")
+
+    def __init__(self, args, frame_rate=30):
+        super().__init__(args, frame_rate)
+        if not hasattr(args, "matching"):
+            self.assign = matching.linear_assignment
+
+        self._motion_mat = np.eye(7, dtype=np.float32)
+        self._motion_mat[[0, 1, 2], [4, 5, 6]] = 1.0
+        self._update_mat = np.eye(4, 7, dtype=np.float32)
+        self._motion_cov = np.diag([1, 1, 1, 1, 1e-2, 1e-2, 1e-4]).astype(np.float32)
+        self._innovation_cov = np.diag([1, 1, 10, 10]).astype(np.float32)
+        self._initial_cov = np.diag([10, 10, 10, 10, 1e4, 1e4, 1e4]).astype(np.float32)
+
+        self.mean = np.empty((0, 7), dtype=np.float32)
+        self.covariance = np.empty((0, 7, 7), dtype=np.float32)
+
+    @staticmethod
+    def xyxy_to_z(xyxy):
+        w = xyxy[:, 2] - xyxy[:, 0]
+        h = xyxy[:, 3] - xyxy[:, 1]
+        return np.stack([xyxy[:, 0] + w / 2, xyxy[:, 1] + h / 2, w * h, w / np.maximum(h, 1e-6)], axis=1)
+
+    @staticmethod
+    def z_to_xyxy(z):
+        w = np.sqrt(np.maximum(z[:, 2] * z[:, 3], 0))
+        h = z[:, 2] / np.maximum(w, 1e-6)
+        return np.stack([z[:, 0] - w / 2, z[:, 1] - h / 2, z[:, 0] + w / 2, z[:, 1] + h / 2], axis=1)
+
+    def _predict(self, dt=1.):
+        if len(self) == 0:
+            return self.xyxy
+        motion_mat, motion_cov = self._motion_mat, self._motion_cov
+        if dt != 1.:
+            motion_mat = motion_mat.copy()
+            motion_mat[[0, 1, 2], [4, 5, 6]] = dt
+            motion_cov = motion_cov * np.float32(dt)
+        shrinking = self.mean[:, 2] + dt * self.mean[:, 6] <= 0
+        self.mean[shrinking, 6] = 0
+        self.mean = self.mean @ motion_mat.T
+        self.covariance = motion_mat @ self.covariance @ motion_mat.T + motion_cov
+        self.xyxy = self.z_to_xyxy(self.mean).astype(np.float32)
+        return self.xyxy
+
+    def _correct(self, index, boxes):
+        mean, cov = self.mean[index], self.covariance[index]
+        H = self._update_mat
+        S = H @ cov @ H.T + self._innovation_cov
+        gain = cov @ H.T @ np.linalg.inv(S)
+        innovation = self.xyxy_to_z(boxes) - mean @ H.T
+        self.mean[index] = mean + np.einsum("nij,nj->ni", gain, innovation)
+        self.covariance[index] = cov - gain @ H @ cov
+        self.xyxy[index] = self.z_to_xyxy(self.mean[index])
+
+    def _spawn(self, boxes, scores, class_ids):
+        n = len(boxes)
+        mean = np.zeros((n, 7), dtype=np.float32)
+        mean[:, :4] = self.xyxy_to_z(boxes)
+        self.mean = np.concatenate([self.mean, mean])
+        self.covariance = np.concatenate([self.covariance, np.broadcast_to(self._initial_cov, (n, 7, 7))])
+        super()._spawn(boxes, scores, class_ids)
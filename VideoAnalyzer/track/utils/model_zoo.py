@@ -3,16 +3,21 @@ from third_parties.byte_track.byte_tracker import STrack
 
 def do_track_byte_track(byte_tracker, 
                         batch_metadatas,
+                        scene=None,
+                        timestamp=None,
                         img_info=None, # img_info, (height, width, frame_id, video_id, file_name)
                         img_size=None):
     """
+    scene is the frame the detections come from, it is only used by the Re-ID stage.
+    timestamp (seconds) lets the tracker account for dropped frames.
     img_info and img_size are specified if needed only, 
     in update function the two arguments are used to define box scale
     """
     dets = np.concatenate([batch_metadatas.xyxy, 
                            batch_metadatas.confidence[..., None],
                            batch_metadatas.class_id[..., None]], axis=1)
-    tracked_stracks = byte_tracker.update(dets, img_info, img_size)
+    tracked_stracks = byte_tracker.update(dets, img=scene, img_info=img_info, img_size=img_size,
+                                          timestamp=timestamp)
 
     xyxy     = np.array([STrack.tlwh_to_tlbr(strack.tlwh) for strack in tracked_stracks]).astype("int")
     score    = np.array([strack.score for strack in tracked_stracks])
@@ -21,7 +26,23 @@ def do_track_byte_track(byte_tracker,
     return (xyxy, score, cls_id, track_id)
 
 
+def do_track_light(light_tracker,
+                   batch_metadatas,
+                   scene=None,
+                   timestamp=None):
+    """
+    Shared by the array-backed IOUTracker and SORTTracker, 
+    their update function already returns (xyxy, score, cls_id, track_id)
+    """
+    dets = np.concatenate([batch_metadatas.xyxy, 
+                           batch_metadatas.confidence[..., None],
+                           batch_metadatas.class_id[..., None]], axis=1)
+    return light_tracker.update(dets, timestamp=timestamp)
+
+
 # Tracker zoo
 tracker_zoo = {
-    "byte_track": do_track_byte_track
+    "byte_track": do_track_byte_track,
+    "iou"       : do_track_light,
+    "sort"      : do_track_light,
 }
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+    Appearance (Re-ID) stage for the trackers.
+    `ReIDEmbedder` embeds a batch of detection crops with an ONNX model on CPU,
+    `FeatureBank` keeps one smoothed feature per track in a contiguous array.
+"""
+from typing import Optional, Sequence
+import numpy as np
+import cv2
+
+from VideoAnalyzer.utils import TrackSlots, grow_array
+from VideoAnalyzer.utils import get_pylogger
+logger = get_pylogger()
+
+
+class ReIDEmbedder:
+    """
+    Runs a Re-ID model exported to ONNX (e.g. OSNet x0.25) on all crops of a
+    frame in a single batch and returns L2-normalized embeddings.
+    """
+
+    def __init__(self,
+                 weight: str,
+                 input_size: Sequence[int] = (128, 256),
+                 mean: Sequence[float] = (0.485, 0.456, 0.406),
+                 std: Sequence[float] = (0.229, 0.224, 0.225),
+                 num_threads: Optional[int] = None):
+        """
+        Parameters:
+        -----------
+            weight (str):
+                Path to the ONNX model, expecting NCHW RGB float input.
+            input_size (Sequence[int]):
+                Crop size as (width, height).
+            mean, std (Sequence[float]):
+                Normalization applied to RGB values scaled to [0, 1].
+            num_threads (int):
+                Intra-op threads of the ONNX runtime session.
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            logger.error("onnxruntime is required for the Re-ID stage !!!")
+            raise
+
+        options = ort.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(weight, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.max_batch = batch_dim if isinstance(batch_dim, int) else None
+
+        self.width, self.height = int(input_size[0]), int(input_size[1])
+        self.mean = np.asarray(mean, dtype=np.float32).reshape(1, 3, 1, 1) * 255.0
+        self.std = np.asarray(std, dtype=np.float32).reshape(1, 3, 1, 1) * 255.0
+
+    def crop(self, scene: np.ndarray, xyxy: np.ndarray) -> np.ndarray:
+        """Crop and resize all boxes into one `(n, height, width, 3)` uint8 batch."""
+        height, width = scene.shape[:2]
+        boxes = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        boxes = np.clip(np.round(boxes), 0, [width, height, width, height]).astype(int)
+
+        crops = np.zeros((len(boxes), self.height, self.width, 3), dtype=np.uint8)
+        for i, (x1, y1, x2, y2) in enumerate(boxes.tolist()):
+            if x2 - x1 < 1 or y2 - y1 < 1:
+                continue
+            cv2.resize(scene[y1:y2, x1:x2], (self.width, self.height), dst=crops[i])
+        return crops
+
+    def __call__(self, scene: np.ndarray, xyxy: np.ndarray) -> np.ndarray:
+        """Returns `(n, D)` float32 unit-norm embeddings of the boxes in `scene` (BGR)."""
+        if len(xyxy) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        crops = self.crop(scene, xyxy)
+        blob = crops[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32)
+        blob = (blob - self.mean) / self.std
+
+        step = self.max_batch or len(blob)
+        feats = np.concatenate([
+            self.session.run(None, {self.input_name: blob[i:i + step]})[0]
+            for i in range(0, len(blob), step)
+        ]).reshape(len(blob), -1).astype(np.float32)
+        feats /= np.maximum(np.linalg.norm(feats, axis=1, keepdims=True), 1e-12)
+        return feats
+
+
+class FeatureBank:
+    """
+    Exponentially smoothed appearance feature of every track, stored as rows of
+    one contiguous `(capacity, D)` float32 array.
+    """
+
+    def __init__(self, alpha: float = 0.9, refresh_interval: int = 10, capacity: int = 64):
+        """
+        Parameters:
+        -----------
+            alpha (float):
+                Weight of the previous feature in the moving average.
+            refresh_interval (int):
+                Number of frames after which a track feature is considered stale
+                and is re-embedded even if IoU matching is unambiguous.
+        """
+        self.alpha: float = alpha
+        self.refresh_interval: int = refresh_interval
+        self.slots = TrackSlots(capacity)
+        self.features: Optional[np.ndarray] = None
+        self.updated_at = np.full(self.slots.capacity, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _grow(self, dim: int) -> None:
+        capacity = self.slots.capacity
+        if self.features is None:
+            self.features = np.zeros((capacity, dim), dtype=np.float32)
+        self.features = grow_array(self.features, capacity)
+        self.updated_at = grow_array(self.updated_at, capacity, -1)
+
+    def update(self, track_ids: Sequence[int], features: np.ndarray, frame_id: int) -> None:
+        """Blend `features` into the smoothed feature of each track."""
+        if len(track_ids) == 0:
+            return
+        features = np.asarray(features, dtype=np.float32)
+        slots, created = self.slots.assign(track_ids)
+        self._grow(features.shape[1])
+
+        smoothed = self.alpha * self.features[slots] + (1 - self.alpha) * features
+        smoothed[created] = features[created]
+        smoothed /= np.maximum(np.linalg.norm(smoothed, axis=1, keepdims=True), 1e-12)
+        self.features[slots] = smoothed
+        self.updated_at[slots] = frame_id
+
+    def stale(self, track_ids: Sequence[int], frame_id: int) -> np.ndarray:
+        """Boolean mask of the tracks without a feature or with an outdated one."""
+        slots = self.slots.lookup(track_ids)
+        age = frame_id - self.updated_at[np.maximum(slots, 0)]
+        return (slots < 0) | (age >= self.refresh_interval)
+
+    def distance(self, track_ids: Sequence[int], features: np.ndarray) -> np.ndarray:
+        """
+        Cosine distance between the smoothed features of `track_ids` and the
+        detection `features`. Tracks without a feature get the maximal distance 1.
+        """
+        cost = np.ones((len(track_ids), len(features)), dtype=np.float32)
+        if cost.size == 0 or self.features is None:
+            return cost
+        slots = self.slots.lookup(track_ids)
+        known = slots >= 0
+        cost[known] = 1.0 - self.features[slots[known]] @ np.asarray(features, dtype=np.float32).T
+        return np.clip(cost, 0.0, 2.0)
+
+    def retain(self, track_ids: Sequence[int]) -> None:
+        """Drop the features of all tracks not in `track_ids`."""
+        gone = np.setdiff1d(self.slots.ids, np.asarray(track_ids, dtype=np.int64))
+        released = self.slots.release(gone)
+        self.updated_at[released] = -1
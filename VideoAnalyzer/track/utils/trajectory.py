@@ -0,0 +1,195 @@
+from typing import Optional, Tuple
+import numpy as np
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.annotators.draw.position import Position
+from VideoAnalyzer.utils import TrackSlots, grow_array
+
+
+class TrajectoryStore:
+    """
+    Keeps the last `length` boxes, timestamps and scores of every live track in
+    preallocated ring buffers of shape `(capacity, length, ...)`.
+
+    Each track owns one slot (row) of the buffers. A track that has not been
+    updated for more than `max_age` frames, or that is removed explicitly, gives
+    its slot back so it can be reused by a new track.
+    """
+
+    def __init__(self, length: int = 30, max_age: int = 30, capacity: int = 64):
+        """
+        Parameters:
+        -----------
+            length (int):
+                Number of past positions kept per track.
+            max_age (int):
+                Number of frames without update before a track is released.
+            capacity (int):
+                Initial number of slots, grown on demand.
+        """
+        self.length: int = int(length)
+        self.max_age: int = int(max_age)
+        self.frame_id: int = 0
+
+        self.slots = TrackSlots(capacity)
+        capacity = self.slots.capacity
+        self.xyxy = np.full((capacity, self.length, 4), np.nan, dtype=np.float32)
+        self.scores = np.zeros((capacity, self.length), dtype=np.float32)
+        self.timestamps = np.zeros((capacity, self.length), dtype=np.float64)
+        self.head = np.zeros(capacity, dtype=np.int64)  # next write position
+        self.count = np.zeros(capacity, dtype=np.int64) # number of valid entries
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, track_id: int) -> bool:
+        return bool(self.slots.lookup([track_id])[0] >= 0)
+
+    @property
+    def active_ids(self) -> np.ndarray:
+        """Ids of the tracks updated on the last frame."""
+        live = self.slots.slots
+        return self.slots.ids[self.last_seen[live] == self.frame_id]
+
+    def _grow(self) -> None:
+        capacity = self.slots.capacity
+        if capacity <= self.head.shape[0]:
+            return
+        self.xyxy = grow_array(self.xyxy, capacity, np.nan)
+        self.scores = grow_array(self.scores, capacity)
+        self.timestamps = grow_array(self.timestamps, capacity)
+        self.head = grow_array(self.head, capacity)
+        self.count = grow_array(self.count, capacity)
+        self.last_seen = grow_array(self.last_seen, capacity)
+
+    def update(self,
+               track_id: np.ndarray,
+               xyxy: np.ndarray,
+               score: Optional[np.ndarray] = None,
+               timestamp: Optional[float] = None) -> None:
+        """Append one frame of tracking results and release stale tracks.
+
+        Parameters:
+        -----------
+            track_id, ndarray:
+                Ids of the tracks present on the frame, shape `(n,)`.
+            xyxy, ndarray:
+                Their boxes, shape `(n, 4)`.
+            score, ndarray:
+                Their confidences, shape `(n,)`.
+            timestamp, float:
+                Time of the frame in seconds. Defaults to the frame index.
+        """
+        self.frame_id += 1
+        if timestamp is None:
+            timestamp = float(self.frame_id)
+
+        track_id = np.asarray(track_id, dtype=np.int64).reshape(-1)
+        if track_id.size > 0:
+            slots, created = self.slots.assign(track_id)
+            self._grow()
+
+            new_slots = slots[created]
+            self.head[new_slots] = 0
+            self.count[new_slots] = 0
+            self.xyxy[new_slots] = np.nan
+
+            pos = self.head[slots]
+            self.xyxy[slots, pos] = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+            if score is not None:
+                self.scores[slots, pos] = score
+            self.timestamps[slots, pos] = timestamp
+            self.head[slots] = (pos + 1) % self.length
+            self.count[slots] = np.minimum(self.count[slots] + 1, self.length)
+            self.last_seen[slots] = self.frame_id
+
+        stale = self.frame_id - self.last_seen[self.slots.slots] > self.max_age
+        if stale.any():
+            self.remove(self.slots.ids[stale])
+
+    def remove(self, track_id: np.ndarray) -> None:
+        """Release the slots of the given tracks."""
+        released = self.slots.release(track_id)
+        self.count[released] = 0
+
+    def _resolve(self, track_id: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if track_id is None:
+            track_id = self.active_ids
+        track_id = np.asarray(track_id, dtype=np.int64).reshape(-1)
+        slots = self.slots.lookup(track_id)
+        keep = slots >= 0
+        return track_id[keep], slots[keep]
+
+    def _ordered_index(self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Ring positions of each slot ordered oldest to newest, and their validity."""
+        steps = np.arange(self.length)
+        start = self.head[slots] - self.count[slots]
+        index = (start[:, None] + steps[None, :]) % self.length
+        valid = steps[None, :] < self.count[slots][:, None]
+        return index, valid
+
+    def history(self, track_id: Optional[np.ndarray] = None):
+        """
+        Returns the raw history of the given tracks, or of the active tracks when
+        `track_id` is None.
+
+        Returns:
+            Tuple: `(track_id, xyxy, score, timestamp, valid)` with shapes `(m,)`,
+                `(m, length, 4)`, `(m, length)`, `(m, length)` and `(m, length)`.
+                Entries are ordered oldest to newest and left-aligned; invalid
+                entries are NaN for `xyxy`.
+        """
+        track_id, slots = self._resolve(track_id)
+        index, valid = self._ordered_index(slots)
+        rows = slots[:, None]
+        xyxy = self.xyxy[rows, index]
+        xyxy[~valid] = np.nan
+        return track_id, xyxy, self.scores[rows, index], self.timestamps[rows, index], valid
+
+    def _anchors(self, xyxy: np.ndarray, anchor: Position) -> np.ndarray:
+        points = MetaDatas(xyxy=xyxy.reshape(-1, 4)).get_anchors_coordinates(anchor)
+        return points.reshape(xyxy.shape[0], self.length, 2)
+
+    def trails(self,
+               track_id: Optional[np.ndarray] = None,
+               anchor: Position = Position.CENTER) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the trail of anchor points of each track.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: track ids `(m,)`, points
+                `(m, length, 2)` ordered oldest to newest (NaN padded) and the
+                number of valid points of each trail `(m,)`.
+        """
+        track_id, xyxy, _, _, valid = self.history(track_id)
+        return track_id, self._anchors(xyxy, anchor), valid.sum(axis=1)
+
+    def velocities(self,
+                   track_id: Optional[np.ndarray] = None,
+                   anchor: Position = Position.CENTER) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the average velocity of each track over its stored window, in
+        pixels per timestamp unit. Tracks with less than two points get zero.
+        """
+        track_id, xyxy, _, timestamps, valid = self.history(track_id)
+        points = self._anchors(xyxy, anchor)
+        n = valid.sum(axis=1)
+
+        rows = np.arange(len(track_id))
+        last = np.maximum(n - 1, 0)
+        dt = timestamps[rows, last] - timestamps[rows, 0]
+        dxy = points[rows, last] - points[rows, 0]
+        moving = (n > 1) & (dt > 0)
+
+        velocity = np.zeros((len(track_id), 2), dtype=np.float32)
+        velocity[moving] = dxy[moving] / dt[moving, None]
+        return track_id, velocity
+
+    def path_lengths(self,
+                     track_id: Optional[np.ndarray] = None,
+                     anchor: Position = Position.CENTER) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the length of each track's stored path, in pixels."""
+        track_id, points, _ = self.trails(track_id, anchor)
+        steps = np.linalg.norm(np.diff(points, axis=1), axis=2)
+        return track_id, np.nansum(steps, axis=1)
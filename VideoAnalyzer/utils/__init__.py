@@ -1 +1,3 @@
-from .pylogger import get_pylogger
\ No newline at end of file
+from .pylogger import get_pylogger
+from .slots import TrackSlots, grow_array
+from .governor import apply_resources, blas_environ
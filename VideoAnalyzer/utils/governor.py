@@ -0,0 +1,129 @@
+"""
+    Per-process CPU resource limits.
+
+    Every process running an `Analyzer` starts its own torch, OpenCV and BLAS
+    thread pools, each sized to the number of cores by default. With several
+    processes on one machine this oversubscribes the CPUs. `apply_resources`
+    caps those pools and can pin the process to a set of CPUs, from the
+    `resources` section of the config:
+
+        resources:
+          torch_threads        : 2
+          torch_interop_threads: 1
+          cv2_threads          : 1
+          blas_threads         : 1
+          cpu_affinity         : auto # null, "auto" (split the CPUs among workers) or [[0, 1], [2, 3], ...]
+
+    It must run before the models are loaded. BLAS libraries read the
+    environment variables only when they are loaded, and importing this module
+    already loads numpy: the BLAS limit of the running process goes through
+    `threadpoolctl`, the variables only reach child processes. Launchers
+    spawning workers should set them beforehand with `blas_environ`.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import os
+
+from .pylogger import get_pylogger
+logger = get_pylogger()
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                 "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+def blas_environ(threads: int) -> Dict[str, str]:
+    """Environment variables limiting the BLAS thread pools of processes started with them."""
+    return {var: str(int(threads)) for var in BLAS_ENV_VARS}
+
+
+def split_cpus(cpus: Sequence[int], worker_index: int, num_workers: int) -> List[int]:
+    """The `worker_index`-th of `num_workers` contiguous, near-equal chunks of `cpus`."""
+    cpus = sorted(cpus)
+    if num_workers >= len(cpus):
+        return [cpus[worker_index % len(cpus)]]
+    start = worker_index * len(cpus) // num_workers
+    end = (worker_index + 1) * len(cpus) // num_workers
+    return cpus[start:end]
+
+
+def resolve_affinity(affinity: Any, worker_index: Optional[int], num_workers: int) -> Optional[List[int]]:
+    if affinity is None or (affinity == "auto" and worker_index is None):
+        return None
+    if affinity == "auto":
+        return split_cpus(os.sched_getaffinity(0), worker_index, num_workers)
+    affinity = [list(cpus) for cpus in affinity]
+    if affinity and all(isinstance(cpus, list) for cpus in affinity):
+        return affinity[(worker_index or 0) % len(affinity)]
+    logger.error(f"cpu_affinity must be null, 'auto' or a list of CPU lists, got {affinity}")
+    raise ValueError(affinity)
+
+
+def apply_resources(config: Any = None, worker_index: Optional[int] = None, num_workers: int = 1) -> dict:
+    """
+    Apply the limits of a `resources` config in the current process.
+
+    Parameters:
+    -----------
+        config (DictConfig | dict | None):
+            The `resources` section, None leaves every library untouched.
+        worker_index (Optional[int]):
+            Index of this worker among `num_workers`, used by `cpu_affinity`.
+        num_workers (int):
+            Number of workers sharing the machine.
+
+    Returns:
+    -----------
+        The limits actually applied.
+    """
+    if config is None:
+        return {}
+    get = config.get
+    applied = {}
+
+    blas_threads = get("blas_threads")
+    if blas_threads is not None:
+        # libraries loaded from now on and child processes
+        os.environ.update(blas_environ(blas_threads))
+        if threadpool_limits is not None:
+            threadpool_limits(limits=int(blas_threads))
+            applied["blas_threads"] = int(blas_threads)
+        else:
+            logger.warning("threadpoolctl is not installed, blas_threads is ignored in this process "
+                           "(numpy is already loaded), set it in the environment before starting it")
+
+    cv2_threads = get("cv2_threads")
+    if cv2_threads is not None:
+        import cv2
+        cv2.setNumThreads(int(cv2_threads))
+        applied["cv2_threads"] = int(cv2_threads)
+
+    torch_threads, interop_threads = get("torch_threads"), get("torch_interop_threads")
+    if torch_threads is not None or interop_threads is not None:
+        try:
+            import torch
+            if torch_threads is not None:
+                torch.set_num_threads(int(torch_threads))
+                applied["torch_threads"] = int(torch_threads)
+            if interop_threads is not None:
+                # only allowed once per process, before any parallel work
+                torch.set_num_interop_threads(int(interop_threads))
+                applied["torch_interop_threads"] = int(interop_threads)
+        except ImportError:
+            logger.warning("torch is not installed, torch thread limits are ignored")
+        except RuntimeError as e:
+            logger.warning(f"Could not set torch inter-op threads: {e}")
+
+    cpus = resolve_affinity(get("cpu_affinity"), worker_index, num_workers)
+    if cpus is not None:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+            applied["cpu_affinity"] = cpus
+        else:
+            logger.warning("CPU affinity is not supported on this platform")
+
+    logger.info(f"Resource limits: {applied}")
+    return applied
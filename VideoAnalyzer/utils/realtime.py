@@ -0,0 +1,151 @@
+"""
+    Real-time frame source with a latency budget.
+
+    A background thread reads the capture as fast as the source delivers and
+    stamps every frame with the moment it was read. The consumer iterates over
+    the source; frames it cannot finish within `latency_budget` seconds of
+    their capture, given the running estimate of its processing time, are
+    dropped before any work is spent on them. The buffer between the two is
+    bounded, so a slow consumer loses frames instead of accumulating delay.
+
+        source = RealtimeSource(cv2.VideoCapture("rtsp://..."), latency_budget=0.2)
+        for frame_id, timestamp, frame in source:
+            ...  # frame_id / timestamp are those of the source, with gaps where frames were dropped
+"""
+from collections import deque
+from typing import Any, Iterator, Optional, Tuple
+import threading
+import time
+import numpy as np
+import cv2
+
+from .pylogger import get_pylogger
+logger = get_pylogger()
+
+
+class RealtimeSource:
+    def __init__(self,
+                 capture: Any,
+                 latency_budget: float = 0.2,
+                 buffer_size: int = 4,
+                 pace: Optional[bool] = None,
+                 smoothing: float = 0.1,
+                 history: int = 1000):
+        """
+        Parameters:
+        -----------
+            capture (Any):
+                A `cv2.VideoCapture`, or any object with the same `read` and `get`.
+            latency_budget (float):
+                Maximum seconds between the capture of a frame and the end of its processing.
+            buffer_size (int):
+                Frames waiting for the consumer, the oldest is dropped when it is full.
+            pace (Optional[bool]):
+                Release the frames of a file at its frame rate, replaying it as a
+                live stream (the default). Live sources are never paced.
+            smoothing (float):
+                Weight of the newest sample in the moving average of the processing time.
+            history (int):
+                Number of latencies kept for `stats`.
+        """
+        self.capture = capture
+        self.latency_budget = float(latency_budget)
+        self.smoothing = float(smoothing)
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        # only files know their length, their frames are timed by the frame rate,
+        # live frames by the clock when they are read
+        self.live = not capture.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+        self.pace = not self.live and (pace is None or bool(pace))
+
+        self.service_time = 0.0  # moving average of the consumer's time per frame
+        self.processed = 0
+        self.dropped_buffer = 0  # evicted by the reader, the consumer was too slow
+        self.dropped_late = 0    # skipped by the consumer, they could not meet the budget
+        self.latencies = deque(maxlen=history)
+
+        self._buffer = deque()
+        self._buffer_size = max(int(buffer_size), 1)
+        self._cond = threading.Condition()
+        self._finished = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._read, name="RealtimeSource", daemon=True)
+        self._thread.start()
+
+    def _read(self) -> None:
+        frame_id = 0
+        start = time.monotonic()
+        while not self._stopped:
+            suc, frame = self.capture.read()
+            if not suc:
+                break
+            now = time.monotonic()
+            timestamp = now - start if self.live else frame_id / self.fps
+            if self.pace:
+                delay = start + timestamp - now
+                if delay > 0:
+                    time.sleep(delay)
+                    now = time.monotonic()
+            with self._cond:
+                if len(self._buffer) >= self._buffer_size:
+                    self._buffer.popleft()
+                    self.dropped_buffer += 1
+                self._buffer.append((frame_id, timestamp, now, frame))
+                self._cond.notify()
+            frame_id += 1
+        with self._cond:
+            self._finished = True
+            self._cond.notify()
+
+    def _next(self) -> Optional[Tuple[int, float, float, np.ndarray]]:
+        """The oldest buffered frame that can still meet the budget, or the newest one."""
+        with self._cond:
+            while not self._buffer and not self._finished:
+                self._cond.wait()
+            if not self._buffer:
+                return None
+            now = time.monotonic()
+            while len(self._buffer) > 1 and now - self._buffer[0][2] + self.service_time > self.latency_budget:
+                self._buffer.popleft()
+                self.dropped_late += 1
+            return self._buffer.popleft()
+
+    def __iter__(self) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Yield `(frame_id, timestamp, frame)`, timestamps in seconds since the first frame."""
+        try:
+            while True:
+                item = self._next()
+                if item is None:
+                    break
+                frame_id, timestamp, captured, frame = item
+                started = time.monotonic()
+                yield frame_id, timestamp, frame
+                done = time.monotonic()
+                self.service_time += self.smoothing * (done - started - self.service_time)
+                self.latencies.append(done - captured)
+                self.processed += 1
+        finally:
+            self.close()
+
+    @property
+    def dropped(self) -> int:
+        return self.dropped_buffer + self.dropped_late
+
+    def stats(self) -> dict:
+        """Counters and latency percentiles (seconds) of the recent frames."""
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "late": int((latencies > self.latency_budget).sum()),
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p95": float(np.percentile(latencies, 95)),
+            "latency_max": float(latencies.max()),
+        }
+
+    def close(self) -> None:
+        """Stop the reader thread. The capture is left open, it belongs to the caller."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._thread.join()
+        logger.info(f"Real-time source: {self.stats()}")
@@ -0,0 +1,96 @@
+from typing import List, Tuple
+import numpy as np
+
+
+def grow_array(array: np.ndarray, capacity: int, fill=0) -> np.ndarray:
+    """Return `array` enlarged along its first axis to `capacity` rows.
+
+    New rows are set to `fill`, existing rows are copied over. Used by the
+    owners of `TrackSlots` to keep their per-track arrays in sync with it.
+    """
+    if array.shape[0] >= capacity:
+        return array
+    grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:array.shape[0]] = array
+    return grown
+
+
+class TrackSlots:
+    """
+    Maps arbitrary integer track ids to rows ("slots") of preallocated arrays.
+
+    Lookups are vectorized with a sorted key array and `np.searchsorted`, so
+    resolving the slots of every track in a frame costs no Python loop.
+    Released slots are recycled for new tracks, which keeps the backing
+    arrays bounded by the peak number of live tracks.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity: int = max(int(capacity), 1)
+        self._keys = np.empty(0, dtype=np.int64)   # sorted live track ids
+        self._values = np.empty(0, dtype=np.int64) # slot of each key
+        self._free: List[int] = list(range(self.capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return self._keys.shape[0]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Sorted ids of all live tracks."""
+        return self._keys
+
+    @property
+    def slots(self) -> np.ndarray:
+        """Slots of all live tracks, aligned with `ids`."""
+        return self._values
+
+    def lookup(self, ids: np.ndarray) -> np.ndarray:
+        """Return the slot of each id, or -1 for ids that have no slot."""
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if self._keys.size == 0 or ids.size == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.searchsorted(self._keys, ids)
+        pos = np.minimum(pos, self._keys.size - 1)
+        found = self._keys[pos] == ids
+        return np.where(found, self._values[pos], -1)
+
+    def assign(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the slots of `ids`, allocating slots for unseen ids.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: the slot of each id and a boolean mask
+                of the ids that just received a new slot. `capacity` may have
+                grown, in which case callers must grow their arrays.
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        slots = self.lookup(ids)
+        created = slots < 0
+        if not created.any():
+            return slots, created
+
+        new_ids = np.unique(ids[created])
+        if len(new_ids) > len(self._free):
+            extra = max(self.capacity, len(new_ids) - len(self._free))
+            self._free = list(range(self.capacity + extra - 1, self.capacity - 1, -1)) + self._free
+            self.capacity += extra
+        new_slots = np.array([self._free.pop() for _ in range(len(new_ids))], dtype=np.int64)
+
+        keys = np.concatenate([self._keys, new_ids])
+        values = np.concatenate([self._values, new_slots])
+        order = np.argsort(keys, kind="stable")
+        self._keys, self._values = keys[order], values[order]
+
+        slots[created] = new_slots[np.searchsorted(new_ids, ids[created])]
+        return slots, created
+
+    def release(self, ids: np.ndarray) -> np.ndarray:
+        """Free the slots of `ids`. Returns the released slots."""
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if ids.size == 0 or self._keys.size == 0:
+            return np.empty(0, dtype=np.int64)
+        drop = np.isin(self._keys, ids)
+        released = self._values[drop]
+        self._free.extend(released.tolist())
+        self._keys, self._values = self._keys[~drop], self._values[~drop]
+        return released
@@ -0,0 +1,173 @@
+"""
+    Zero-copy transport of frames and MetaDatas between processes.
+
+    A `SharedFrameRing` is a ring of fixed-size slots in one shared memory block.
+    Each slot holds a frame, its frame id and timestamp, and the packed buffer of
+    its MetaDatas (see `MetaDatas.from_packed`). Slots move through a fixed chain
+    of stages, e.g. decoder (0) -> detector (1) -> tracker (2): a stage `acquire`s
+    the oldest slot handed to it, owns it exclusively while working on it in place,
+    then `commit`s it to the next stage. The last stage's commit frees the slot.
+    Each stage is expected to be served by a single process.
+"""
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+import multiprocessing as mp
+import numpy as np
+
+from VideoAnalyzer.annotators.base import MetaDatas, PACKED_COLUMNS
+
+
+class FrameSlot:
+    """A slot owned by one stage. All attributes are views into shared memory."""
+
+    def __init__(self, ring: "SharedFrameRing", index: int, stage: int):
+        self.ring = ring
+        self.index = index
+        self.stage = stage
+        self.frame: np.ndarray = ring._frames[index]
+
+    @property
+    def frame_id(self) -> int:
+        return int(self.ring._header["frame_id"][self.index])
+
+    @frame_id.setter
+    def frame_id(self, value: int) -> None:
+        self.ring._header["frame_id"][self.index] = value
+
+    @property
+    def timestamp(self) -> float:
+        return float(self.ring._header["timestamp"][self.index])
+
+    @timestamp.setter
+    def timestamp(self, value: float) -> None:
+        self.ring._header["timestamp"][self.index] = value
+
+    @property
+    def metadatas(self) -> MetaDatas:
+        """The MetaDatas of the slot, as views into shared memory."""
+        header = self.ring._header[self.index]
+        packed = self.ring._packed[self.index, :header["num_dets"]]
+        return MetaDatas.from_packed(packed, with_track_id=bool(header["with_track_id"]))
+
+    @metadatas.setter
+    def metadatas(self, metadatas: MetaDatas) -> None:
+        n = len(metadatas)
+        if n > self.ring.max_detections:
+            raise ValueError(f"{n} detections do not fit a slot of {self.ring.max_detections}")
+        self.ring._packed[self.index, :n] = metadatas.pack()
+        self.ring._header["num_dets"][self.index] = n
+        self.ring._header["with_track_id"][self.index] = metadatas.track_id is not None
+
+
+class SharedFrameRing:
+    HEADER_DTYPE = np.dtype([
+        ("stage", np.int32),
+        ("num_dets", np.int32),
+        ("with_track_id", np.int32),
+        ("frame_id", np.int64),
+        ("timestamp", np.float64),
+    ])
+
+    def __init__(self,
+                 frame_shape: Tuple[int, ...],
+                 num_slots: int = 8,
+                 max_detections: int = 256,
+                 num_stages: int = 2,
+                 frame_dtype=np.uint8):
+        """
+        Parameters:
+        -----------
+            frame_shape (Tuple[int, ...]):
+                Shape of every frame, e.g. (1080, 1920, 3).
+            num_slots (int):
+                Number of frames in flight.
+            max_detections (int):
+                Capacity of the MetaDatas buffer of a slot.
+            num_stages (int):
+                Number of pipeline stages, including the producer (stage 0).
+        """
+        self.frame_shape = tuple(frame_shape)
+        self.num_slots = num_slots
+        self.max_detections = max_detections
+        self.num_stages = num_stages
+        self.frame_dtype = np.dtype(frame_dtype)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=self._nbytes())
+        self._attach()
+        self._header[:] = 0
+        self._cursors[:] = 0
+
+        ctx = mp.get_context()
+        self._lock = ctx.Lock()
+        # _ready[k] counts the slots waiting for stage k, stage 0 waits for free slots
+        self._ready = [ctx.Semaphore(num_slots if k == 0 else 0) for k in range(num_stages)]
+        self._owner = True
+
+    def _nbytes(self) -> int:
+        return (self.num_slots * self.HEADER_DTYPE.itemsize
+                + self.num_stages * 8
+                + self.num_slots * int(np.prod(self.frame_shape)) * self.frame_dtype.itemsize
+                + self.num_slots * self.max_detections * PACKED_COLUMNS * 4)
+
+    def _attach(self) -> None:
+        buf, offset = self.shm.buf, 0
+
+        def take(dtype, shape):
+            nonlocal offset
+            array = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self._header = take(self.HEADER_DTYPE, (self.num_slots,))
+        self._cursors = take(np.int64, (self.num_stages,))
+        self._packed = take(np.float32, (self.num_slots, self.max_detections, PACKED_COLUMNS))
+        self._frames = take(self.frame_dtype, (self.num_slots,) + self.frame_shape)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ("shm", "_header", "_cursors", "_packed", "_frames"):
+            del state[key]
+        state["shm_name"] = self.shm.name
+        return state
+
+    def __setstate__(self, state):
+        name = state.pop("shm_name")
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=name)
+        self._owner = False
+        self._attach()
+
+    def acquire(self, stage: int = 0, timeout: Optional[float] = None) -> Optional[FrameSlot]:
+        """
+        Take ownership of the oldest slot handed to `stage`.
+        Returns None if no slot became available within `timeout` seconds.
+        """
+        if not self._ready[stage].acquire(timeout=timeout):
+            return None
+        with self._lock:
+            index = int(self._cursors[stage])
+            self._cursors[stage] = (index + 1) % self.num_slots
+        if self._header["stage"][index] != stage:
+            raise RuntimeError(f"Slot {index} is owned by stage {self._header['stage'][index]}, not {stage}")
+        return FrameSlot(self, index, stage)
+
+    def commit(self, slot: FrameSlot) -> None:
+        """Hand `slot` over to the next stage; the last stage frees it."""
+        next_stage = (slot.stage + 1) % self.num_stages
+        if next_stage == 0:
+            self._header["num_dets"][slot.index] = 0
+        self._header["stage"][slot.index] = next_stage
+        self._ready[next_stage].release()
+
+    def acquire_write(self, timeout: Optional[float] = None) -> Optional[FrameSlot]:
+        return self.acquire(0, timeout)
+
+    def acquire_read(self, timeout: Optional[float] = None) -> Optional[FrameSlot]:
+        return self.acquire(self.num_stages - 1, timeout)
+
+    def close(self) -> None:
+        """Detach from the shared memory. The creating process also unlinks it."""
+        self._header = self._cursors = self._packed = self._frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
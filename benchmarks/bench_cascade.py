@@ -0,0 +1,113 @@
+"""
+    Cheap detector only, strong detector only and the cascade, feeding
+    BYTETracker on a synthetic scene. The two detectors are simulated: the cheap
+    one misses more of the hard (occluded, small) objects, scores them lower and
+    adds false positives; their cost is accounted, not measured.
+    Recall / precision are those of the tracker output against the ground truth
+    at IoU 0.5, fragments the extra track ids received by the objects.
+
+    python benchmarks/bench_cascade.py --objects 30 --frames 900 --scene-weight 0.7 --cheap-ms 5 --strong-ms 25
+"""
+import sys
+sys.path.insert(1, ".")
+
+import argparse
+from omegaconf import OmegaConf
+import numpy as np
+
+from third_parties.byte_track import matching
+from third_parties.byte_track.byte_tracker import BYTETracker
+from VideoAnalyzer.detection.utils.cascade import CascadePolicy, merge_detections
+
+
+def make_scene(num_objects, num_frames, scene_weight=0.7, seed=0):
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(100, 1400, (num_objects, 2))
+    speed = rng.uniform(-3, 3, (num_objects, 2))
+    size = rng.uniform(30, 100, (num_objects, 2))
+    phase = rng.uniform(0, 2 * np.pi, num_objects)
+    period = rng.uniform(60, 300, num_objects)
+    # hard stretches (crowding, lighting) hit the whole scene, occlusion single objects
+    scene = np.clip(np.convolve(rng.normal(0, 1, num_frames + 99), np.ones(100) / 10, "valid") + 0.2, 0, 1)
+    frames = []
+    for f in range(num_frames):
+        xy = start + speed * f
+        visible = (xy > 0).all(1) & (xy < 1800).all(1)
+        occlusion = 0.5 + 0.5 * np.sin(phase + 2 * np.pi * f / period)
+        difficulty = scene_weight * scene[f] + (1 - scene_weight) * occlusion
+        frames.append((np.flatnonzero(visible), np.c_[xy, xy + size][visible], difficulty[visible]))
+    return frames
+
+
+def detector(rng, gt_xyxy, difficulty, miss, score, noise, false_positives):
+    found = rng.random(len(gt_xyxy)) > miss[0] + miss[1] * difficulty
+    xyxy = gt_xyxy[found] + rng.normal(0, noise, (found.sum(), 4))
+    scores = np.clip(score[0] - score[1] * difficulty[found] + rng.normal(0, 0.05, found.sum()), 0.26, 0.99)
+    num_fp = rng.poisson(false_positives)
+    fp_xy = rng.uniform(0, 1800, (num_fp, 2))
+    xyxy = np.concatenate([xyxy, np.c_[fp_xy, fp_xy + 50]])
+    scores = np.concatenate([scores, rng.uniform(0.26, 0.45, num_fp)])
+    return np.c_[xyxy, scores, np.zeros(len(scores))].astype(np.float32)
+
+
+def cheap(rng, xyxy, difficulty):
+    return detector(rng, xyxy, difficulty, miss=(0.05, 0.6), score=(0.85, 0.6), noise=3.0, false_positives=0.5)
+
+
+def strong(rng, xyxy, difficulty):
+    return detector(rng, xyxy, difficulty, miss=(0.02, 0.15), score=(0.92, 0.3), noise=1.0, false_positives=0.1)
+
+
+def run(frames, mode, costs, policy_kwargs):
+    rng = np.random.default_rng(1)
+    args = OmegaConf.create({"track_thresh": 0.25, "track_buffer": 30, "match_thresh": 0.8, "mot20": False})
+    tracker = BYTETracker(args, 30)
+    policy = CascadePolicy(ambiguous_range=(0.25, 0.35), **policy_kwargs)
+    cost = matched = predicted = total = 0
+    ids = {}
+    for gt, xyxy, difficulty in frames:
+        if mode == "strong":
+            dets, cost = strong(rng, xyxy, difficulty), cost + costs[1]
+        else:
+            dets, cost = cheap(rng, xyxy, difficulty), cost + costs[0]
+            if mode == "cascade" and policy.decide(dets[:, 4]) is not None:
+                dets, cost = merge_detections(dets, strong(rng, xyxy, difficulty)), cost + costs[1]
+        tracks = tracker.update(dets)
+        policy.observe(np.array([t.track_id for t in tracks]))
+
+        out = np.array([t.tlbr for t in tracks]).reshape(-1, 4)
+        total, predicted = total + len(gt), predicted + len(out)
+        if len(out) and len(gt):
+            pairs, _, _ = matching.linear_assignment(1 - matching.ious(xyxy, out), 0.5)
+            matched += len(pairs)
+            for i, j in pairs:
+                ids.setdefault(int(gt[i]), set()).add(tracks[j].track_id)
+    return {"recall": matched / total, "precision": matched / max(predicted, 1),
+            "fragments": sum(len(v) - 1 for v in ids.values()), "ms": cost / len(frames),
+            "escalated": policy.rate if mode == "cascade" else float(mode == "strong")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--scene-weight", type=float, default=0.7,
+                        help="share of the difficulty common to the whole frame, 0 for per-object only")
+    parser.add_argument("--cheap-ms", type=float, default=5)
+    parser.add_argument("--strong-ms", type=float, default=25)
+    opts = parser.parse_args()
+
+    frames = make_scene(opts.objects, opts.frames, opts.scene_weight)
+    costs = (opts.cheap_ms, opts.strong_ms)
+    configs = [
+        ("cheap", "cheap", {}),
+        ("strong", "strong", {}),
+        ("periodic", "cascade", {"period": 10, "low_confidence": None, "ambiguous": None, "new_tracks": False}),
+        ("confidence", "cascade", {"period": None, "low_confidence": 0.6, "ambiguous": 0.3, "new_tracks": False}),
+        ("all", "cascade", {"period": 30, "low_confidence": 0.6, "ambiguous": 0.3, "new_tracks": True}),
+    ]
+    print(f"{'mode':>11} {'escalated':>10} {'ms/frame':>9} {'recall':>7} {'precision':>10} {'fragments':>10}")
+    for name, mode, kwargs in configs:
+        r = run(frames, mode, costs, kwargs)
+        print(f"{name:>11} {r['escalated']:>10.0%} {r['ms']:>9.1f} {r['recall']:>7.3f} "
+              f"{r['precision']:>10.3f} {r['fragments']:>10}")
@@ -0,0 +1,84 @@
+"""
+    Aggregate throughput of N worker processes running a CPU-bound per-frame
+    workload (resize + blur of a 1080p frame, a matmul, a conv when torch is
+    installed), for a grid of workers x threads per worker, with the thread
+    pools left at their defaults or capped by `apply_resources`.
+
+    python benchmarks/bench_governor.py --workers 1 2 4 --threads 1 2 4 --seconds 5
+"""
+import sys
+sys.path.insert(1, ".")
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+
+def worker(resources, worker_index, num_workers, seconds, start, results):
+    # BLAS reads its limit when numpy loads, which importing VideoAnalyzer does:
+    # set it in the environment first, like the batch CLI does for its workers
+    if resources is not None:
+        os.environ.update({var: str(resources["blas_threads"]) for var in
+                           ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")})
+    from VideoAnalyzer.utils.governor import apply_resources
+    apply_resources(resources, worker_index, num_workers)
+    import numpy as np
+    import cv2
+    try:
+        import torch
+    except ImportError:
+        torch = None
+
+    rng = np.random.default_rng(worker_index)
+    frame = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    a = rng.standard_normal((256, 256), dtype=np.float32)
+    if torch is not None:
+        conv = torch.nn.Conv2d(3, 16, 3, padding=1).eval()
+        x = torch.randn(1, 3, 320, 320)
+
+    start.wait()
+    frames, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        small = cv2.resize(frame, (960, 540), interpolation=cv2.INTER_LINEAR)
+        cv2.GaussianBlur(small, (7, 7), 0)
+        a @ a
+        if torch is not None:
+            with torch.no_grad():
+                conv(x)
+        frames += 1
+    results.put(frames / (time.perf_counter() - t0))
+
+
+def run(num_workers, resources, seconds):
+    ctx = mp.get_context("spawn")
+    start, results = ctx.Barrier(num_workers), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(resources, i, num_workers, seconds, start, results))
+             for i in range(num_workers)]
+    for p in procs:
+        p.start()
+    fps = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return fps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    opts = parser.parse_args()
+
+    print(f"{len(os.sched_getaffinity(0))} CPUs available")
+    print(f"{'workers':>8} {'threads':>8} {'affinity':>9} {'fps':>9}")
+    for num_workers in opts.workers:
+        fps = run(num_workers, None, opts.seconds)
+        print(f"{num_workers:>8} {'default':>8} {'-':>9} {fps:>9.1f}")
+        for threads in opts.threads:
+            for affinity in (None, "auto"):
+                resources = {"torch_threads": threads, "torch_interop_threads": 1,
+                             "cv2_threads": threads, "blas_threads": threads,
+                             "cpu_affinity": affinity}
+                fps = run(num_workers, resources, opts.seconds)
+                print(f"{num_workers:>8} {threads:>8} {affinity or '-':>9} {fps:>9.1f}")
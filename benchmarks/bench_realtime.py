@@ -0,0 +1,146 @@
+"""
+    Real-time mode on a simulated live source that is faster than the consumer.
+
+    1. latency: a 30 fps camera feeding a consumer needing `--service` ms per
+       frame, through an unbounded queue versus a `RealtimeSource`.
+    2. continuity: trackers fed the same synthetic scene with frames dropped at
+       random, with and without the source timestamps. Fragments counts how many
+       extra track ids the ground truth objects received.
+
+    python benchmarks/bench_realtime.py --service 50 --seconds 10 --drop 0.5
+"""
+import sys
+sys.path.insert(1, ".")
+
+import argparse
+import queue
+import threading
+import time
+from omegaconf import OmegaConf
+import numpy as np
+import cv2
+
+from third_parties.byte_track import matching
+from third_parties.byte_track.byte_tracker import BYTETracker
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.track.utils.light_trackers import IOUTracker, SORTTracker
+from VideoAnalyzer.track.utils.model_zoo import tracker_zoo
+from VideoAnalyzer.utils.realtime import RealtimeSource
+
+
+class Camera:
+    """A live capture delivering a small frame every 1 / fps seconds."""
+
+    def __init__(self, fps, seconds):
+        self.fps, self.num_frames = fps, int(fps * seconds)
+        self.count, self.start = 0, None
+        self.frame = np.zeros((72, 128, 3), dtype=np.uint8)
+
+    def get(self, prop):
+        return self.fps if prop == cv2.CAP_PROP_FPS else 0
+
+    def read(self):
+        if self.start is None:
+            self.start = time.monotonic()
+        if self.count >= self.num_frames:
+            return False, None
+        delay = self.start + self.count / self.fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.count += 1
+        return True, self.frame
+
+
+def consume(rng, service):
+    time.sleep(max(rng.normal(service, service * 0.2), 0) / 1e3)
+
+
+def naive(fps, seconds, service, rng):
+    camera, frames, latencies = Camera(fps, seconds), queue.Queue(), []
+
+    def read():
+        while True:
+            suc, frame = camera.read()
+            frames.put((time.monotonic(), frame) if suc else None)
+            if not suc:
+                return
+    threading.Thread(target=read, daemon=True).start()
+    while (item := frames.get()) is not None:
+        consume(rng, service)
+        latencies.append(time.monotonic() - item[0])
+    latencies = np.asarray(latencies)
+    return {"processed": len(latencies), "dropped": 0, "latency_p50": np.percentile(latencies, 50),
+            "latency_p95": np.percentile(latencies, 95), "latency_max": latencies.max()}
+
+
+def realtime(fps, seconds, service, rng, budget):
+    source = RealtimeSource(Camera(fps, seconds), latency_budget=budget, history=10 ** 6)
+    for _ in source:
+        consume(rng, service)
+    return source.stats()
+
+
+def make_scene(num_objects, num_frames, seed=0):
+    """Ground truth ids and detections of objects moving at constant speed."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(100, 1400, (num_objects, 2))
+    speed = rng.uniform(-8, 8, (num_objects, 2))
+    size = rng.uniform(30, 100, (num_objects, 2))
+    frames = []
+    for f in range(num_frames):
+        xy = start + speed * f
+        xyxy = np.c_[xy, xy + size] + rng.normal(0, 1.0, (num_objects, 4))
+        visible = (xy > 0).all(1) & (xy < 1800).all(1)
+        frames.append((np.flatnonzero(visible), xyxy[visible].astype(np.float32),
+                       rng.uniform(0.5, 0.95, visible.sum()).astype(np.float32)))
+    return frames
+
+
+def fragments(build, frames, keep, fps, with_timestamps):
+    tracker, track = build(), tracker_zoo[build.name]
+    ids = {}
+    for f in np.flatnonzero(keep):
+        gt, xyxy, score = frames[f]
+        metadatas = MetaDatas.from_arrays(xyxy=xyxy, confidence=score, class_id=np.zeros(len(xyxy)))
+        out_xyxy, _, _, track_id = track(tracker, metadatas, timestamp=f / fps if with_timestamps else None)
+        if len(out_xyxy) == 0 or len(xyxy) == 0:
+            continue
+        matches, _, _ = matching.linear_assignment(1 - matching.ious(xyxy, np.asarray(out_xyxy, dtype=np.float32)), 0.5)
+        for i, j in matches:
+            ids.setdefault(int(gt[i]), set()).add(int(track_id[j]))
+    return sum(len(v) - 1 for v in ids.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--service", type=float, default=50, help="consumer ms per frame")
+    parser.add_argument("--budget", type=float, default=0.2, help="latency budget in seconds")
+    parser.add_argument("--objects", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--drop", type=float, nargs="+", default=[0.0, 0.5, 0.75])
+    opts = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'source':>10} {'processed':>10} {'dropped':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, stats in [("queue", naive(opts.fps, opts.seconds, opts.service, rng)),
+                        ("realtime", realtime(opts.fps, opts.seconds, opts.service, rng, opts.budget))]:
+        print(f"{name:>10} {stats['processed']:>10} {stats['dropped']:>8} {stats['latency_p50'] * 1e3:>8.0f} "
+              f"{stats['latency_p95'] * 1e3:>8.0f} {stats['latency_max'] * 1e3:>8.0f}")
+
+    args = OmegaConf.create({"track_thresh": 0.25, "track_buffer": 20, "match_thresh": 0.8, "mot20": False})
+    builds = {"byte_track": lambda: BYTETracker(args, opts.fps),
+              "sort"      : lambda: SORTTracker(args, opts.fps),
+              "iou"       : lambda: IOUTracker(args, opts.fps)}
+    frames = make_scene(opts.objects, opts.frames)
+    print()
+    print(f"{'drop':>6} {'tracker':>12} {'fragments':>10} {'+timestamps':>12}")
+    for drop in opts.drop:
+        keep = np.random.default_rng(1).random(opts.frames) >= drop
+        keep[0] = True
+        for name, build in builds.items():
+            build.name = name
+            plain = fragments(build, frames, keep, opts.fps, False)
+            timed = fragments(build, frames, keep, opts.fps, True)
+            print(f"{drop:>6.2f} {name:>12} {plain:>10} {timed:>12}")
@@ -0,0 +1,88 @@
+"""
+    Fixed 640 input versus `ResolutionController` on a stand-in detector whose
+    cost grows with the input area (letterbox resize + filtering of a 1080p
+    frame), through three phases: small objects, small objects with background
+    CPU load, large objects.
+
+    python benchmarks/bench_resolution.py --frames 200 --target 0.015 --load 2
+"""
+import sys
+sys.path.insert(1, ".")
+
+import argparse
+import multiprocessing as mp
+import time
+import numpy as np
+import cv2
+
+from VideoAnalyzer.detection.utils.resolution import ResolutionController
+
+
+def detect(frame, imgsz):
+    """Letterbox to `imgsz` and run a few convolutions, like a detector's input stage."""
+    h, w = frame.shape[:2]
+    scale = imgsz / max(h, w)
+    x = cv2.resize(frame, (int(w * scale), int(h * scale))).astype(np.float32)
+    kernel = np.ones((5, 5), np.float32) / 25
+    for _ in range(6):
+        x = cv2.filter2D(x, -1, kernel)
+    return x
+
+
+def busy(stop):
+    while not stop.is_set():
+        np.sqrt(np.arange(1e5))
+
+
+def boxes(side, n=20, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 1500, (n, 2))
+    return np.c_[xy, xy + side * rng.uniform(1, 1.5, (n, 2))]
+
+
+def run(frame, phases, controller, num_frames, load):
+    rows = []
+    for name, side, loaded in phases:
+        stop = mp.Event()
+        procs = [mp.Process(target=busy, args=(stop,)) for _ in range(load if loaded else 0)]
+        for p in procs:
+            p.start()
+        latencies, sizes = [], []
+        for _ in range(num_frames):
+            imgsz = controller.select() if controller else 640
+            t0 = time.perf_counter()
+            detect(frame, imgsz)
+            latency = time.perf_counter() - t0
+            if controller:
+                controller.update_latency(latency, frame_size=1920)
+                controller.update_boxes(boxes(side), frame_size=1920)
+            latencies.append(latency)
+            sizes.append(imgsz)
+        stop.set()
+        for p in procs:
+            p.join()
+        rows.append((name, np.asarray(latencies), np.asarray(sizes)))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=200, help="frames per phase")
+    parser.add_argument("--target", type=float, default=0.015, help="target seconds per call")
+    parser.add_argument("--load", type=int, default=2, help="busy processes in the loaded phase")
+    opts = parser.parse_args()
+
+    frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    # object side in source pixels: 60 px is 20 px at 640, 150 px stays >= 25 px at 320
+    phases = [("small", 60, False), ("small+load", 60, True), ("large", 150, False)]
+
+    print(f"{'mode':>9} {'phase':>11} {'mean ms':>8} {'p95 ms':>8} {'>target':>8} {'fps':>6}  sizes")
+    for mode in ("fixed", "adaptive"):
+        controller = ResolutionController(target_latency=opts.target, min_object_size=16) if mode == "adaptive" else None
+        for name, latencies, sizes in run(frame, phases, controller, opts.frames, opts.load):
+            values, counts = np.unique(sizes, return_counts=True)
+            hist = " ".join(f"{v}:{c}" for v, c in zip(values, counts))
+            print(f"{mode:>9} {name:>11} {latencies.mean() * 1e3:>8.1f} {np.percentile(latencies, 95) * 1e3:>8.1f} "
+                  f"{(latencies > opts.target).mean():>8.0%} {1 / latencies.mean():>6.0f}  {hist}")
+        if controller:
+            print(f"{controller.switches} switches")
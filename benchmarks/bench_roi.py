@@ -0,0 +1,64 @@
+"""
+    Detector input of a full 1080p frame versus a `RegionOfInterest` crop:
+    letterbox preprocessing time and input shape at the same `imgsz`, object
+    scale at the detector input, and the `imgsz` the crop needs to keep the
+    object scale of the full frame. Plus the cost of mapping detections back.
+
+    python benchmarks/bench_roi.py --rect 700 300 1300 900 --imgsz 640
+"""
+import sys
+sys.path.insert(1, ".")
+
+import argparse
+import time
+import numpy as np
+import cv2
+
+from VideoAnalyzer.detection.utils.roi import RegionOfInterest
+
+
+def letterbox(frame, imgsz, stride=32):
+    """Resize the long side to `imgsz`, pad to a multiple of `stride` (rectangular inference), to CHW float."""
+    h, w = frame.shape[:2]
+    scale = imgsz / max(h, w)
+    nh, nw = round(h * scale), round(w * scale)
+    ph, pw = -(-nh // stride) * stride, -(-nw // stride) * stride
+    resized = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    padded = cv2.copyMakeBorder(resized, 0, ph - nh, 0, pw - nw, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return np.ascontiguousarray(padded[..., ::-1].transpose(2, 0, 1), dtype=np.float32) / 255, scale
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) / repeat * 1e3, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rect", type=int, nargs=4, default=[700, 300, 1300, 900])
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--dets", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    opts = parser.parse_args()
+
+    frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    roi = RegionOfInterest(rects=[opts.rect])
+    (crop,), origins = roi.crop([frame])
+
+    print(f"{'input':>6} {'source px':>10} {'letterbox ms':>13} {'input shape':>12} {'scale':>6} {'keep_scale':>10} {'input px':>9}")
+    for name, image in [("frame", frame), ("roi", crop)]:
+        ms, (tensor, scale) = timed(lambda: letterbox(image, opts.imgsz), opts.repeat)
+        # imgsz at which objects are as large as in the full frame at --imgsz (keep_scale)
+        equivalent = roi.input_size(opts.imgsz, frame.shape) if image is crop else opts.imgsz
+        small, _ = letterbox(image, equivalent)
+        print(f"{name:>6} {image.shape[0] * image.shape[1]:>10} {ms:>13.2f} {str(tensor.shape[1:]):>12} "
+              f"{scale:>6.3f} {equivalent:>10} {small.shape[1] * small.shape[2]:>9}")
+
+    rng = np.random.default_rng(1)
+    xy = rng.uniform(0, 600, (opts.dets, 2))
+    dets = np.c_[xy, xy + 40, rng.uniform(0.3, 1, opts.dets), np.zeros(opts.dets)].astype(np.float32)
+    offsets = np.array([0, opts.dets])
+    ms, _ = timed(lambda: roi.restore(dets, offsets, origins, [frame.shape]), opts.repeat)
+    print(f"\nrestore {opts.dets} detections: {ms:.3f} ms")
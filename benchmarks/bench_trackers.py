@@ -0,0 +1,65 @@
+"""
+    Per-frame latency of the trackers in `tracker_zoo` on the same synthetic detections.
+
+    python benchmarks/bench_trackers.py --objects 20 --frames 2000
+"""
+import sys
+sys.path.insert(1, ".")
+
+import argparse
+import time
+from omegaconf import OmegaConf
+import numpy as np
+
+from third_parties.byte_track.byte_tracker import BYTETracker
+from VideoAnalyzer.track.utils.light_trackers import IOUTracker, SORTTracker
+
+
+def make_scene(num_objects, num_frames, seed=0):
+    """Boxes moving at constant speed with jitter, missed detections and low-score noise."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, 1500, (num_objects, 2))
+    speed = rng.uniform(-4, 4, (num_objects, 2))
+    size = rng.uniform(30, 120, (num_objects, 2))
+
+    frames = []
+    for f in range(num_frames):
+        xy = (start + speed * f) % 1800
+        xyxy = np.c_[xy, xy + size] + rng.normal(0, 1.5, (num_objects, 4))
+        scores = rng.uniform(0.3, 0.95, num_objects)
+        scores[rng.random(num_objects) < 0.05] = 0.15
+        keep = rng.random(num_objects) > 0.03
+        dets = np.c_[xyxy, scores, rng.integers(0, 3, num_objects) * 0][keep]
+        frames.append(dets.astype(np.float32))
+    return frames
+
+
+def run(tracker, frames):
+    timings = np.empty(len(frames))
+    for i, dets in enumerate(frames):
+        t0 = time.perf_counter()
+        tracker.update(dets.copy())
+        timings[i] = time.perf_counter() - t0
+    return timings * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--frames", type=int, default=1000)
+    opts = parser.parse_args()
+
+    args = OmegaConf.create({"track_thresh": 0.25, "track_buffer": 20, "match_thresh": 0.7, "mot20": False})
+    trackers = {
+        "byte_track": lambda: BYTETracker(args, 30),
+        "sort"      : lambda: SORTTracker(args, 30),
+        "iou"       : lambda: IOUTracker(args, 30),
+    }
+
+    print(f"{'objects':>8} {'tracker':>12} {'mean ms':>9} {'p95 ms':>9} {'fps':>9}")
+    for num_objects in opts.objects:
+        frames = make_scene(num_objects, opts.frames)
+        for name, build in trackers.items():
+            timings = run(build(), frames)
+            print(f"{num_objects:>8} {name:>12} {timings.mean():>9.3f} "
+                  f"{np.percentile(timings, 95):>9.3f} {1e3 / timings.mean():>9.0f}")
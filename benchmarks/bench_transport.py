@@ -0,0 +1,97 @@
+"""
+    Throughput of frames + MetaDatas sent to another process through
+    SharedFrameRing versus a pickling multiprocessing.Queue.
+
+    python benchmarks/bench_transport.py --frames 500 --height 1080 --width 1920
+"""
+import sys
+sys.path.insert(1, ".")
+
+import argparse
+import multiprocessing as mp
+import time
+import numpy as np
+
+from VideoAnalyzer.annotators.base import MetaDatas
+from VideoAnalyzer.utils.transport import SharedFrameRing
+
+
+def make_metadatas(num_dets, seed):
+    rng = np.random.default_rng(seed)
+    return MetaDatas.from_arrays(xyxy=rng.uniform(0, 1000, (num_dets, 4)),
+                                 confidence=rng.uniform(0, 1, num_dets),
+                                 class_id=rng.integers(0, 3, num_dets),
+                                 track_id=np.arange(num_dets))
+
+
+def ring_producer(ring, frame, metadatas, num_frames):
+    for i in range(num_frames):
+        slot = ring.acquire_write()
+        slot.frame[:] = frame
+        slot.frame_id = i
+        slot.metadatas = metadatas
+        ring.commit(slot)
+
+
+def ring_consumer(ring, num_frames, done):
+    checksum = 0
+    for _ in range(num_frames):
+        slot = ring.acquire_read()
+        checksum += int(slot.frame[0, 0, 0]) + len(slot.metadatas)
+        ring.commit(slot)
+    done.put(checksum)
+
+
+def queue_producer(queue, frame, metadatas, num_frames):
+    for i in range(num_frames):
+        queue.put((i, frame, metadatas))
+
+
+def queue_consumer(queue, num_frames, done):
+    checksum = 0
+    for _ in range(num_frames):
+        _, frame, metadatas = queue.get()
+        checksum += int(frame[0, 0, 0]) + len(metadatas)
+    done.put(checksum)
+
+
+def timed(producer, consumer, args_producer, args_consumer):
+    done = mp.Queue()
+    procs = [mp.Process(target=producer, args=args_producer),
+             mp.Process(target=consumer, args=args_consumer + (done,))]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    done.get()
+    elapsed = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--dets", type=int, default=50)
+    parser.add_argument("--slots", type=int, default=8)
+    opts = parser.parse_args()
+
+    shape = (opts.height, opts.width, 3)
+    frame = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    metadatas = make_metadatas(opts.dets, 0)
+    mb = frame.nbytes * opts.frames / 1e6
+
+    ring = SharedFrameRing(shape, num_slots=opts.slots, max_detections=opts.dets)
+    t_ring = timed(ring_producer, ring_consumer,
+                   (ring, frame, metadatas, opts.frames), (ring, opts.frames))
+    ring.close()
+
+    queue = mp.Queue(maxsize=opts.slots)
+    t_queue = timed(queue_producer, queue_consumer,
+                    (queue, frame, metadatas, opts.frames), (queue, opts.frames))
+
+    print(f"{'transport':>12} {'fps':>9} {'MB/s':>9}")
+    for name, elapsed in [("shared ring", t_ring), ("mp.Queue", t_queue)]:
+        print(f"{name:>12} {opts.frames / elapsed:>9.0f} {mb / elapsed:>9.0f}")
@@ -6,6 +6,7 @@ import numpy as np
 import cv2 
 
 from VideoAnalyzer.apis import Analyzer
+from VideoAnalyzer.annotators import AnnotatorChain
 from VideoAnalyzer.annotators.core import BoundingBoxAnnotator, LabelAnnotator
 from VideoAnalyzer.utils import get_pylogger
 logger = get_pylogger()
@@ -18,8 +19,7 @@ if __name__ == "__main__":
     cv2.resizeWindow("Resized_Window", 1200, 650) 
 
     analyzer = Analyzer(config="configs/default.yaml")
-    box_ann = BoundingBoxAnnotator()
-    label_ann = LabelAnnotator()
+    annotator = AnnotatorChain([BoundingBoxAnnotator(), LabelAnnotator()])
 
     while True:
         suc, frame = video.read()
@@ -29,8 +29,8 @@ if __name__ == "__main__":
         result = analyzer.do_detect(frame)[0]
         result = analyzer.do_track(metadata=result)
  
-        f = box_ann.annotate(frame, result)
-        f = label_ann.annotate(frame, result)
+        # frame stays clean, f is drawn into the chain's reusable buffer
+        f = annotator.annotate(frame, result)
 
         cv2.imshow("Resized_Window", f)
         if cv2.waitKey(0) & 0xff == 27:
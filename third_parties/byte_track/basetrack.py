@@ -1,6 +1,24 @@
 import numpy as np
 from collections import OrderedDict
 
+
+def elapsed_frames(timestamp, last_timestamp, frame_rate):
+    """
+    Frames elapsed between two updates of a tracker, as `(dt, step, last_timestamp)`:
+    `dt` is the exact number of frame periods, so frames dropped upstream still
+    age the lost tracks and move the motion predictions by the time that really
+    passed, `step` the whole number of frames `frame_id` advances by and
+    `last_timestamp` the reference for the next call. Without a timestamp, or
+    with one not after the previous, a single frame is assumed.
+    """
+    dt = 1.
+    if timestamp is not None:
+        if last_timestamp is not None and timestamp > last_timestamp:
+            dt = (timestamp - last_timestamp) * frame_rate
+        last_timestamp = timestamp
+    return dt, max(int(round(dt)), 1), last_timestamp
+
+
 class TrackState:
     New = 0
     Tracked = 1
@@ -1,8 +1,9 @@
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 from . import matching
 from .kalman_filter import KalmanFilter
-from .basetrack import BaseTrack, TrackState
+from .basetrack import BaseTrack, TrackState, elapsed_frames
 
 class STrack(BaseTrack):
     shared_kalman = KalmanFilter()
@@ -19,21 +20,21 @@ class STrack(BaseTrack):
         self.class_id = class_id
         self.tracklet_len = 0
 
-    def predict(self):
+    def predict(self, dt=1.):
         mean_state = self.mean.copy()
         if self.state != TrackState.Tracked:
             mean_state[7] = 0
-        self.mean, self.covariance = self.kalman_filter.predict(mean_state, self.covariance)
+        self.mean, self.covariance = self.kalman_filter.predict(mean_state, self.covariance, dt)
 
     @staticmethod
-    def multi_predict(stracks):
+    def multi_predict(stracks, dt=1.):
         if len(stracks) > 0:
             multi_mean = np.asarray([st.mean.copy() for st in stracks])
             multi_covariance = np.asarray([st.covariance for st in stracks])
             for i, st in enumerate(stracks):
                 if st.state != TrackState.Tracked:
                     multi_mean[i][7] = 0
-            multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(multi_mean, multi_covariance)
+            multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(multi_mean, multi_covariance, dt)
             for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
                 stracks[i].mean = mean
                 stracks[i].covariance = cov
@@ -62,6 +63,7 @@ class STrack(BaseTrack):
         if new_id:
             self.track_id = self.next_id()
         self.score = new_track.score
+        self.curr_feature = new_track.curr_feature
 
     def update(self, new_track, frame_id):
         """
@@ -81,6 +83,7 @@ class STrack(BaseTrack):
         self.is_activated = True
 
         self.score = new_track.score
+        self.curr_feature = new_track.curr_feature
 
     @property
     # @jit(nopython=True)
@@ -138,20 +141,83 @@ class STrack(BaseTrack):
 
 
 class BYTETracker(object):
-    def __init__(self, args, frame_rate=30):
+    def __init__(self, args, frame_rate=30, embedder=None, feature_bank=None):
         self.tracked_stracks = []  # type: list[STrack]
         self.lost_stracks = []  # type: list[STrack]
         self.removed_stracks = []  # type: list[STrack]
 
         self.frame_id = 0
+        self.last_timestamp = None
         self.args = args
+        self.frame_rate = frame_rate
         self.det_thresh = args.track_thresh + 0.1
         self.buffer_size = int(frame_rate / 30.0 * args.track_buffer)
         self.max_time_lost = self.buffer_size
         self.kalman_filter = KalmanFilter()
 
-    def update(self, output_results, img=None, img_info=None, img_size=None):
-        self.frame_id += 1
+        # optional appearance stage, only used for ambiguous detections
+        self.embedder = embedder
+        self.feature_bank = feature_bank
+        self.appearance_thresh = getattr(args, "appearance_thresh", 0.25)
+        self.proximity_thresh = getattr(args, "proximity_thresh", 0.5)
+
+        # optionally associate every class_id on its own (smaller cost matrices, no cross-class swaps)
+        self.class_partition = getattr(args, "class_partition", False)
+        self.partition_workers = getattr(args, "partition_workers", 0)
+        self.executor = None  # started on first use, released by close()
+
+    def _partition_executor(self):
+        if self.executor is None and self.partition_workers > 1:
+            self.executor = ThreadPoolExecutor(self.partition_workers)
+        return self.executor
+
+    def close(self):
+        """Release the worker threads of the class-partitioned association."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def _associate(self, tracks, detections, cost_fn, thresh):
+        if self.class_partition:
+            return matching.partitioned_assignment(tracks, detections, cost_fn, thresh,
+                                                   self._partition_executor())
+        return matching.linear_assignment(cost_fn(tracks, detections), thresh=thresh)
+
+    def _score_cost(self, tracks, detections):
+        dists = matching.iou_distance(tracks, detections)
+        if not self.args.mot20:
+            dists = matching.fuse_score(dists, detections)
+        return dists
+
+    def _reid_cost(self, tracks, detections):
+        dists = matching.iou_distance(tracks, detections)
+        if len(tracks) > 0 and len(detections) > 0:
+            emb_dists = self.feature_bank.distance([t.track_id for t in tracks],
+                                                   np.asarray([d.curr_feature for d in detections]))
+            dists = matching.fuse_embedding(dists, emb_dists, self.appearance_thresh, self.proximity_thresh)
+        return dists
+
+    def _appearance_cost(self, tracks, detections):
+        if len(tracks) == 0 or len(detections) == 0:
+            return np.zeros((len(tracks), len(detections)), dtype=np.float32)
+        return self.feature_bank.distance([t.track_id for t in tracks],
+                                          np.asarray([d.curr_feature for d in detections]))
+
+    def _embed(self, scene, detections):
+        """Embed the given detections in one batch and attach their features."""
+        if len(detections) == 0:
+            return
+        feats = self.embedder(scene, np.asarray([det.tlbr for det in detections]))
+        for det, feat in zip(detections, feats):
+            det.curr_feature = feat
+
+    def update(self, output_results, img=None, img_info=None, img_size=None, timestamp=None):
+        """
+        timestamp (seconds) of the frame is optional, without it every call is
+        assumed to follow the previous frame by `1 / frame_rate`.
+        """
+        dt, step, self.last_timestamp = elapsed_frames(timestamp, self.last_timestamp, self.frame_rate)
+        self.frame_id += step
         activated_starcks = []
         refind_stracks = []
         lost_stracks = []
@@ -199,11 +265,9 @@ class BYTETracker(object):
         ''' Step 2: First association, with high score detection boxes'''
         strack_pool = joint_stracks(tracked_stracks, self.lost_stracks)
         # Predict the current location with KF
-        STrack.multi_predict(strack_pool)
-        dists = matching.iou_distance(strack_pool, detections)
-        if not self.args.mot20:
-            dists = matching.fuse_score(dists, detections)
-        matches, u_track, u_detection = matching.linear_assignment(dists, thresh=self.args.match_thresh)
+        STrack.multi_predict(strack_pool, dt)
+        matches, u_track, u_detection = self._associate(strack_pool, detections, self._score_cost,
+                                                        thresh=self.args.match_thresh)
 
         for itracked, idet in matches:
             track = strack_pool[itracked]
@@ -224,8 +288,22 @@ class BYTETracker(object):
         else:
             detections_second = []
         r_tracked_stracks = [strack_pool[i] for i in u_track if strack_pool[i].state == TrackState.Tracked]
-        dists = matching.iou_distance(r_tracked_stracks, detections_second)
-        matches, u_track, u_detection_second = matching.linear_assignment(dists, thresh=0.5)
+
+        use_reid = self.embedder is not None and img is not None
+        if use_reid:
+            # Only detections left ambiguous by IoU matching are embedded, plus the
+            # matched ones whose track feature is missing or stale.
+            lost_pool = [strack_pool[i] for i in u_track if strack_pool[i].state == TrackState.Lost]
+            refresh = [detections[idet] for (itracked, idet), stale in zip(
+                matches, self.feature_bank.stale([strack_pool[i].track_id for i, _ in matches], self.frame_id)) if stale]
+            ambiguous = [detections[i] for i in u_detection]
+            if len(r_tracked_stracks) > 0:
+                ambiguous += detections_second
+            self._embed(img, refresh + ambiguous)
+
+        cost_fn = self._reid_cost if use_reid else matching.iou_distance
+        matches, u_track, u_detection_second = self._associate(r_tracked_stracks, detections_second, cost_fn,
+                                                               thresh=0.5)
         for itracked, idet in matches:
             track = r_tracked_stracks[itracked]
             det = detections_second[idet]
@@ -242,12 +320,19 @@ class BYTETracker(object):
                 track.mark_lost()
                 lost_stracks.append(track)
 
-        '''Deal with unconfirmed tracks, usually tracks with only one beginning frame'''
         detections = [detections[i] for i in u_detection]
-        dists = matching.iou_distance(unconfirmed, detections)
-        if not self.args.mot20:
-            dists = matching.fuse_score(dists, detections)
-        matches, u_unconfirmed, u_detection = matching.linear_assignment(dists, thresh=0.7)
+        if use_reid and len(lost_pool) > 0 and len(detections) > 0:
+            '''Recover lost tracks from appearance only'''
+            matches, _, u_detection = self._associate(lost_pool, detections, self._appearance_cost,
+                                                      thresh=self.appearance_thresh)
+            for itracked, idet in matches:
+                lost_pool[itracked].re_activate(detections[idet], self.frame_id, new_id=False)
+                refind_stracks.append(lost_pool[itracked])
+            detections = [detections[i] for i in u_detection]
+
+        '''Deal with unconfirmed tracks, usually tracks with only one beginning frame'''
+        matches, u_unconfirmed, u_detection = self._associate(unconfirmed, detections, self._score_cost,
+                                                              thresh=0.7)
         for itracked, idet in matches:
             unconfirmed[itracked].update(detections[idet], self.frame_id)
             activated_starcks.append(unconfirmed[itracked])
@@ -278,6 +363,15 @@ class BYTETracker(object):
         self.lost_stracks = sub_stracks(self.lost_stracks, self.removed_stracks)
         self.removed_stracks.extend(removed_stracks)
         self.tracked_stracks, self.lost_stracks = remove_duplicate_stracks(self.tracked_stracks, self.lost_stracks)
+
+        if use_reid:
+            embedded = [t for t in self.tracked_stracks
+                        if t.frame_id == self.frame_id and t.curr_feature is not None]
+            self.feature_bank.update([t.track_id for t in embedded],
+                                     np.asarray([t.curr_feature for t in embedded]),
+                                     self.frame_id)
+            self.feature_bank.retain([t.track_id for t in self.tracked_stracks + self.lost_stracks])
+
         # get scores of lost tracks
         output_stracks = [track for track in self.tracked_stracks if track.is_activated]
 
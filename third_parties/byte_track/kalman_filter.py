@@ -52,6 +52,16 @@ class KalmanFilter(object):
         self._std_weight_position = 1. / 20
         self._std_weight_velocity = 1. / 160
 
+    def motion_mat(self, dt=1.):
+        """Constant velocity transition over `dt` frames."""
+        if dt == 1.:
+            return self._motion_mat
+        ndim = self._update_mat.shape[0]
+        motion_mat = np.eye(2 * ndim, 2 * ndim)
+        for i in range(ndim):
+            motion_mat[i, ndim + i] = dt
+        return motion_mat
+
     def initiate(self, measurement):
         """Create track from unassociated measurement.
 
@@ -85,7 +95,7 @@ class KalmanFilter(object):
         covariance = np.diag(np.square(std))
         return mean, covariance
 
-    def predict(self, mean, covariance):
+    def predict(self, mean, covariance, dt=1.):
         """Run Kalman filter prediction step.
 
         Parameters
@@ -96,6 +106,9 @@ class KalmanFilter(object):
         covariance : ndarray
             The 8x8 dimensional covariance matrix of the object state at the
             previous time step.
+        dt : float
+            Frames elapsed since the previous time step, the process noise
+            grows linearly with it.
 
         Returns
         -------
@@ -114,12 +127,13 @@ class KalmanFilter(object):
             self._std_weight_velocity * mean[3],
             1e-5,
             self._std_weight_velocity * mean[3]]
-        motion_cov = np.diag(np.square(np.r_[std_pos, std_vel]))
+        motion_cov = np.diag(np.square(np.r_[std_pos, std_vel])) * dt
+        motion_mat = self.motion_mat(dt)
 
         #mean = np.dot(self._motion_mat, mean)
-        mean = np.dot(mean, self._motion_mat.T)
+        mean = np.dot(mean, motion_mat.T)
         covariance = np.linalg.multi_dot((
-            self._motion_mat, covariance, self._motion_mat.T)) + motion_cov
+            motion_mat, covariance, motion_mat.T)) + motion_cov
 
         return mean, covariance
 
@@ -152,7 +166,7 @@ class KalmanFilter(object):
             self._update_mat, covariance, self._update_mat.T))
         return mean, covariance + innovation_cov
 
-    def multi_predict(self, mean, covariance):
+    def multi_predict(self, mean, covariance, dt=1.):
         """Run Kalman filter prediction step (Vectorized version).
         Parameters
         ----------
@@ -162,6 +176,8 @@ class KalmanFilter(object):
         covariance : ndarray
             The Nx8x8 dimensional covariance matrics of the object states at the
             previous time step.
+        dt : float
+            Frames elapsed since the previous time step.
         Returns
         -------
         (ndarray, ndarray)
@@ -178,16 +194,17 @@ class KalmanFilter(object):
             self._std_weight_velocity * mean[:, 3],
             1e-5 * np.ones_like(mean[:, 3]),
             self._std_weight_velocity * mean[:, 3]]
-        sqr = np.square(np.r_[std_pos, std_vel]).T
+        sqr = np.square(np.r_[std_pos, std_vel]).T * dt
 
         motion_cov = []
         for i in range(len(mean)):
             motion_cov.append(np.diag(sqr[i]))
         motion_cov = np.asarray(motion_cov)
 
-        mean = np.dot(mean, self._motion_mat.T)
-        left = np.dot(self._motion_mat, covariance).transpose((1, 0, 2))
-        covariance = np.dot(left, self._motion_mat.T) + motion_cov
+        motion_mat = self.motion_mat(dt)
+        mean = np.dot(mean, motion_mat.T)
+        left = np.dot(motion_mat, covariance).transpose((1, 0, 2))
+        covariance = np.dot(left, motion_mat.T) + motion_cov
 
         return mean, covariance
 
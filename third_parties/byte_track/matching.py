@@ -75,6 +75,59 @@ def linear_assignment(cost_matrix, thresh):
     return matches, unmatched_a, unmatched_b
 
 
+def greedy_assignment(cost_matrix, thresh):
+    """
+    Greedy matching: repeatedly take the cheapest remaining pair under `thresh`.
+    Cheaper than `linear_assignment` on small, well separated cost matrices.
+    """
+    if cost_matrix.size == 0:
+        return np.empty((0, 2), dtype=int), tuple(range(cost_matrix.shape[0])), tuple(range(cost_matrix.shape[1]))
+    rows, cols = np.nonzero(cost_matrix <= thresh)
+    order = np.argsort(cost_matrix[rows, cols], kind="stable")
+    used_a = np.zeros(cost_matrix.shape[0], dtype=bool)
+    used_b = np.zeros(cost_matrix.shape[1], dtype=bool)
+    matches = []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if used_a[r] or used_b[c]:
+            continue
+        used_a[r] = used_b[c] = True
+        matches.append((r, c))
+    matches = np.asarray(matches, dtype=int).reshape(-1, 2)
+    return matches, np.where(~used_a)[0], np.where(~used_b)[0]
+
+
+def partitioned_assignment(atracks, btracks, cost_fn, thresh, executor=None, assign=linear_assignment):
+    """
+    Solve the assignment separately for every class_id shared by `atracks` and
+    `btracks`, so the work grows with the sum of squared class sizes instead of
+    the square of the total, and objects of different classes are never matched.
+
+    :param cost_fn: callable(atracks_subset, btracks_subset) -> cost matrix
+    :param executor: optional concurrent.futures executor to solve blocks in parallel
+    :return: matches, unmatched_a, unmatched_b with indices into the full lists
+    """
+    a_cls = np.asarray([t.class_id for t in atracks])
+    b_cls = np.asarray([t.class_id for t in btracks])
+
+    def solve(cls):
+        ia = np.flatnonzero(a_cls == cls)
+        ib = np.flatnonzero(b_cls == cls)
+        cost = cost_fn([atracks[i] for i in ia], [btracks[j] for j in ib])
+        block_matches = np.asarray(assign(cost, thresh=thresh)[0], dtype=int).reshape(-1, 2)
+        return np.stack([ia[block_matches[:, 0]], ib[block_matches[:, 1]]], axis=1)
+
+    classes = np.intersect1d(a_cls, b_cls)
+    if executor is not None and len(classes) > 1:
+        blocks = list(executor.map(solve, classes))
+    else:
+        blocks = [solve(cls) for cls in classes]
+
+    matches = np.concatenate(blocks) if blocks else np.empty((0, 2), dtype=int)
+    unmatched_a = np.setdiff1d(np.arange(len(atracks)), matches[:, 0])
+    unmatched_b = np.setdiff1d(np.arange(len(btracks)), matches[:, 1])
+    return matches, unmatched_a, unmatched_b
+
+
 def ious(atlbrs, btlbrs):
     """
     Compute cost based on IoU
@@ -142,13 +195,13 @@ def embedding_distance(tracks, detections, metric='cosine'):
     :return: cost_matrix np.ndarray
     """
 
-    cost_matrix = np.zeros((len(tracks), len(detections)), dtype=np.float)
+    cost_matrix = np.zeros((len(tracks), len(detections)), dtype=np.float64)
     if cost_matrix.size == 0:
         return cost_matrix
-    det_features = np.asarray([track.curr_feat for track in detections], dtype=np.float)
+    det_features = np.asarray([track.curr_feature for track in detections], dtype=np.float64)
     #for i, track in enumerate(tracks):
         #cost_matrix[i, :] = np.maximum(0.0, cdist(track.smooth_feat.reshape(1,-1), det_features, metric))
-    track_features = np.asarray([track.smooth_feat for track in tracks], dtype=np.float)
+    track_features = np.asarray([track.smooth_feat for track in tracks], dtype=np.float64)
     cost_matrix = np.maximum(0.0, cdist(track_features, det_features, metric))  # Nomalized features
     return cost_matrix
 
@@ -194,6 +247,19 @@ def fuse_iou(cost_matrix, tracks, detections):
     return fuse_cost
 
 
+def fuse_embedding(iou_cost, emb_cost, appearance_thresh=0.25, proximity_thresh=0.5):
+    """
+    Combine IoU and appearance costs: a pair may use its appearance cost only if
+    the features are similar enough and the boxes still overlap.
+    """
+    if iou_cost.size == 0:
+        return iou_cost
+    emb_cost = emb_cost.copy()
+    emb_cost[emb_cost > appearance_thresh] = 1.0
+    emb_cost[iou_cost > proximity_thresh] = 1.0
+    return np.minimum(iou_cost, emb_cost)
+
+
 def fuse_score(cost_matrix, detections):
     if cost_matrix.size == 0:
         return cost_matrix